@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class BidsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.bids'
+    
+    def ready(self):
+        from .cache import (
+            invalidate_on_bid_change, invalidate_on_payout_change, invalidate_on_transaction_change
+        )
+        
+        # Keep cached shopper dashboards in step with their bids and money
+        for signal in (post_save, post_delete):
+            signal.connect(invalidate_on_bid_change, sender='bids.Bid')
+            signal.connect(invalidate_on_transaction_change, sender='transactions.Transaction')
+            signal.connect(invalidate_on_payout_change, sender='transactions.Payout')
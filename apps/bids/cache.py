@@ -0,0 +1,37 @@
+"""
+Per-shopper dashboard snapshots and their invalidation.
+
+A shopper's snapshot (stats and recent bids) only changes when one of their
+bids or transactions is written, so each shopper has their own cache
+namespace, retired after commit by those writes.
+"""
+from django.db import transaction
+
+from shopper.cache import bump_versions
+
+
+def dashboard_namespace(shopper_id):
+    return f'dashboard:{shopper_id}'
+
+
+def invalidate_dashboards(shopper_ids, using=None):
+    """Retire the dashboard snapshots of these shoppers after the current transaction commits"""
+    namespaces = [dashboard_namespace(shopper_id) for shopper_id in set(shopper_ids)]
+    if namespaces:
+        transaction.on_commit(lambda: bump_versions(namespaces), using=using)
+
+
+def invalidate_on_bid_change(sender, instance, using, **kwargs):
+    invalidate_dashboards([instance.shopper_id], using=using)
+
+
+def invalidate_on_transaction_change(sender, instance, using, **kwargs):
+    from .models import Bid
+
+    shopper_id = Bid.objects.filter(pk=instance.bid_id).values_list('shopper_id', flat=True).first()
+    if shopper_id is not None:
+        invalidate_dashboards([shopper_id], using=using)
+
+
+def invalidate_on_payout_change(sender, instance, using, **kwargs):
+    invalidate_dashboards([instance.shopper_id], using=using)
@@ -0,0 +1,68 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from apps.lists.models import ShoppingList
+from .events import list_group
+from .models import Bid
+
+# Application close codes (4000-4999 are free for application use)
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+
+class ListBidsConsumer(AsyncWebsocketConsumer):
+    """
+    WS /ws/lists/{id}/bids/?token={access token}
+    Stream bid events for one shopping list to its owner, or to a
+    shopper who has bid on it
+    """
+
+    async def connect(self):
+        self.user = self.scope['user']
+        self.list_id = self.scope['url_route']['kwargs']['pk']
+        self.group = list_group(self.list_id)
+
+        if not self.user.is_authenticated:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+
+        access = await self.get_access()
+        if access is None:
+            await self.close(code=CLOSE_NOT_FOUND)
+            return
+        if not access:
+            await self.close(code=CLOSE_FORBIDDEN)
+            return
+
+        self.is_owner = access == 'owner'
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        # The stream is one-way; client messages are ignored
+        pass
+
+    async def bid_event(self, message):
+        # Payloads arrive pre-encoded, so fan-out does no per-socket JSON work
+        if self.is_owner or message['shopper'] == self.user.id:
+            await self.send(text_data=message['full'])
+        else:
+            await self.send(text_data=message['public'])
+
+    @database_sync_to_async
+    def get_access(self):
+        """'owner', 'bidder', False if not allowed or None if the list does not exist"""
+        client_id = ShoppingList.objects.filter(
+            id=self.list_id
+        ).values_list('client_id', flat=True).first()
+        if client_id is None:
+            return None
+        if client_id == self.user.id:
+            return 'owner'
+        if Bid.objects.filter(shopping_list_id=self.list_id, shopper=self.user).exists():
+            return 'bidder'
+        return False
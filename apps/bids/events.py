@@ -0,0 +1,71 @@
+"""
+Live bid events pushed to WebSocket subscribers of a shopping list.
+
+Each event is a small delta: the bid that changed and the list's new bid
+aggregates. Payloads are JSON-encoded once here, not once per socket, and
+sent to a single channel-layer group per list after the transaction commits.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+BID_PLACED = 'bid.placed'
+BID_UPDATED = 'bid.updated'
+BID_WITHDRAWN = 'bid.withdrawn'
+BID_WON = 'bid.won'
+
+
+def list_group(shopping_list_id):
+    return f'list-bids.{shopping_list_id}'
+
+
+def _decimal(value):
+    # Same string form as the REST serializers
+    return None if value is None else str(value)
+
+
+def build_event(event, bid):
+    """
+    Channel-layer message for `event` on `bid`. The list owner and the bid's
+    shopper receive the bid details; other subscribed shoppers only see the
+    list aggregates, as in the REST bid listings.
+    """
+    shopping_list = bid.shopping_list
+    aggregates = {
+        'id': shopping_list.id,
+        'status': shopping_list.status,
+        'bid_count': shopping_list.active_bid_count,
+        'lowest_bid_amount': _decimal(shopping_list.lowest_active_bid_amount),
+    }
+    details = {
+        'id': bid.id,
+        'shopper': bid.shopper_id,
+        'amount': _decimal(bid.amount),
+        'estimated_time': bid.estimated_time,
+        'status': bid.status,
+        'updated_at': bid.updated_at,
+    }
+    encode = JSONEncoder(separators=(',', ':')).encode
+    return {
+        'type': 'bid.event',
+        'shopper': bid.shopper_id,
+        'full': encode({'event': event, 'list': aggregates, 'bid': details}),
+        'public': encode({'event': event, 'list': aggregates, 'bid': {'id': bid.id, 'status': bid.status}}),
+    }
+
+
+def publish_bid_event(event, bid):
+    """
+    Push `event` to the bid's list subscribers once the current transaction
+    commits. Call after the list's bid aggregates have been refreshed.
+    """
+    message = build_event(event, bid)
+    group = list_group(bid.shopping_list_id)
+
+    def send():
+        channel_layer = get_channel_layer()
+        if channel_layer is not None:
+            async_to_sync(channel_layer.group_send)(group, message)
+
+    transaction.on_commit(send)
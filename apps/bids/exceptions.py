@@ -0,0 +1,27 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class BidConflict(APIException):
+    """The bid clashes with one that already exists (409)"""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = {'error': 'You have already placed a bid on this list'}
+    default_code = 'bid_conflict'
+
+
+class ListClosedForBids(BidConflict):
+    """The list closed, was assigned or passed its deadline before the bid landed (409)"""
+    default_detail = {'error': 'This shopping list is not open for bids'}
+    default_code = 'list_closed_for_bids'
+
+
+class BidAcceptConflict(BidConflict):
+    """The list already has a different winner or can no longer accept bids (409)"""
+    default_detail = {'error': 'Another bid has already been accepted for this list'}
+    default_code = 'bid_accept_conflict'
+
+
+class BidNotActive(BidConflict):
+    """The bid was accepted, lost or withdrawn while the request ran (409)"""
+    default_detail = {'error': 'This bid is no longer active'}
+    default_code = 'bid_not_active'
@@ -0,0 +1,86 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.bids.models import Bid
+from apps.lists.management.seed import Rollback, build_list, make_user, untracked
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the accept-bid endpoint on lists with increasing numbers of bids "
+        "and report its query count. Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,1000,5000',
+                            help='Comma separated numbers of bids per list')
+        parser.add_argument('--repeat', type=int, default=5, help='Lists accepted per size')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        try:
+            with transaction.atomic(), untracked():
+                self.run(sizes, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, repeat):
+        rng = random.Random(7)
+        client = make_user('bench-accept@example.com', 'client')
+        shoppers = User.objects.bulk_create([
+            User(email=f'bench-accept-{index}@example.com', user_type='shopper', password='!')
+            for index in range(max(sizes))
+        ])
+        if not shoppers[0].pk:
+            # Backends that cannot return ids from a bulk insert
+            shoppers = list(User.objects.filter(email__startswith='bench-accept-').order_by('id'))
+
+        api = APIClient(HTTP_HOST='localhost')
+        api.force_authenticate(client)
+
+        self.stdout.write(f"{'bids':>8} {'queries':>8} {'median ms':>10} {'max ms':>8}")
+        for size in sizes:
+            timings = []
+            query_counts = set()
+            for _ in range(repeat):
+                shopping_list = build_list(client, rng)
+                shopping_list.save()
+                Bid.objects.bulk_create([
+                    Bid(
+                        shopper=shopper, shopping_list=shopping_list,
+                        amount=Decimal(rng.randint(500, 5000)) / 100,
+                        estimated_time=30, distance_to_store=Decimal('1.00'),
+                    )
+                    for shopper in shoppers[:size]
+                ], batch_size=1000)
+                shopping_list.refresh_bid_aggregates()
+                winner = Bid.objects.filter(shopping_list=shopping_list).order_by('amount').first()
+
+                url = f'/api/lists/{shopping_list.id}/accept-bid/{winner.id}/'
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = api.post(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.content
+                query_counts.add(len(queries))
+
+                # Accepting again must change nothing
+                assert api.post(url).status_code == 200
+                assert Bid.objects.filter(shopping_list=shopping_list, status='won').count() == 1
+                assert not Bid.objects.filter(shopping_list=shopping_list, is_active=True).exclude(pk=winner.pk).exists()
+
+            counts = ','.join(str(count) for count in sorted(query_counts))
+            self.stdout.write(
+                f'{size:>8} {counts:>8} {statistics.median(timings):>10.2f} {max(timings):>8.2f}'
+            )
@@ -0,0 +1,72 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.bids.models import Bid
+from apps.lists.management.seed import Rollback, build_list, make_user, untracked
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare placing N bids one request at a time with one batch request. "
+        "Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bids', type=int, default=50, help='Bids placed by each path')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(), untracked():
+                self.run(options['bids'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, count):
+        rng = random.Random(3)
+        client = make_user('bench-batch-client@example.com', 'client')
+        shopper = make_user('bench-batch-shopper@example.com', 'shopper')
+        api = APIClient(HTTP_HOST='localhost')
+        api.force_authenticate(shopper)
+
+        def new_lists():
+            lists = [build_list(client, rng) for _ in range(count)]
+            for shopping_list in lists:
+                shopping_list.save()
+            return lists
+
+        def payload(shopping_list):
+            return {
+                'shopping_list': shopping_list.id,
+                'amount': str(Decimal(rng.randint(500, 5000)) / 100),
+                'estimated_time': 30,
+                'distance_to_store': '1.00',
+            }
+
+        def single(lists):
+            for shopping_list in lists:
+                response = api.post('/api/bids/', payload(shopping_list), format='json')
+                assert response.status_code == 201, response.content
+
+        def batch(lists):
+            response = api.post('/api/bids/batch/', [payload(item) for item in lists], format='json')
+            assert response.status_code == 201, response.content
+
+        self.stdout.write(f"{'path':<10} {'requests':>8} {'queries':>8} {'total ms':>9} {'ms/bid':>7} {'bids/s':>8}")
+        for label, place, requests in (('single', single, count), ('batch', batch, 1)):
+            lists = new_lists()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                place(lists)
+                elapsed = time.perf_counter() - start
+            assert Bid.objects.filter(shopper=shopper, shopping_list__in=lists).count() == count
+            self.stdout.write(
+                f'{label:<10} {requests:>8} {len(queries):>8} {elapsed * 1000:>9.1f} '
+                f'{elapsed * 1000 / count:>7.2f} {count / elapsed:>8.0f}'
+            )
@@ -0,0 +1,76 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from apps.bids.cache import dashboard_namespace
+from apps.bids.models import Bid
+from apps.lists.management.seed import Rollback, build_list, make_user, untracked
+from shopper.cache import bump_versions
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the shopper dashboard for a shopper with many bids, with and "
+        "without the snapshot cache, and report its query count. Seeded rows "
+        "are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bids', type=int, default=10000, help='Bids placed by the shopper')
+        parser.add_argument('--requests', type=int, default=50, help='Dashboard requests per mode')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(), untracked():
+                self.run(options['bids'], options['requests'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, count, requests):
+        rng = random.Random(11)
+        client = make_user('bench-dashboard-client@example.com', 'client')
+        shopper = make_user('bench-dashboard-shopper@example.com', 'shopper')
+
+        lists = [build_list(client, rng) for _ in range(count)]
+        for shopping_list in lists:
+            shopping_list.save()
+        Bid.objects.bulk_create([
+            Bid(
+                shopper=shopper, shopping_list=shopping_list,
+                amount=Decimal(rng.randint(500, 5000)) / 100,
+                estimated_time=30, distance_to_store=Decimal('1.00'),
+                status=rng.choice(['active', 'active', 'won', 'lost']),
+            )
+            for shopping_list in lists
+        ], batch_size=1000)
+
+        api = APIClient(HTTP_HOST='localhost')
+        api.force_authenticate(shopper)
+        connection.queries_log.clear()
+
+        self.stdout.write(f"{'cache':<8} {'queries':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for label, timeout in (('off', 0), ('on', 300)):
+            timings = []
+            query_counts = set()
+            with override_settings(DASHBOARD_CACHE_TIMEOUT=timeout):
+                for _ in range(requests):
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        response = api.get('/api/bids/dashboard/')
+                        timings.append((time.perf_counter() - start) * 1000)
+                    assert response.status_code == 200, response.content
+                    query_counts.add(len(queries))
+            timings.sort()
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            counts = ','.join(str(n) for n in sorted(query_counts))
+            self.stdout.write(f'{label:<8} {counts:>8} {statistics.median(timings):>8.2f} {p99:>8.2f}')
+
+        # Cached snapshots must not outlive the rollback
+        bump_versions([dashboard_namespace(shopper.pk)])
@@ -0,0 +1,61 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.bids.recommendations import compute_recommendations
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute \"lists for you\" recommendations for recently active "
+        "shoppers and cache them. Repeats every --interval seconds, which "
+        "should stay below RECOMMENDATIONS_CACHE_TIMEOUT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single pass and exit')
+        parser.add_argument('--interval', type=float,
+                            default=settings.RECOMMENDATIONS_CACHE_TIMEOUT / 2,
+                            help='Seconds between passes')
+        parser.add_argument('--active-days', type=int, default=7,
+                            help='Only shoppers active or bidding within this many days')
+        parser.add_argument('--shopper', type=int, action='append', dest='shoppers',
+                            help='Only this shopper (repeatable)')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                started = time.monotonic()
+                self.run_pass(options)
+                if options['once']:
+                    return
+                time.sleep(max(options['interval'] - (time.monotonic() - started), 0))
+        except KeyboardInterrupt:
+            self.stdout.write('Recommendations worker stopped.')
+
+    def active_shoppers(self, options):
+        shoppers = User.objects.filter(user_type__in=['shopper', 'both'], is_active=True)
+        if options['shoppers']:
+            return shoppers.filter(pk__in=options['shoppers'])
+        since = timezone.now() - timedelta(days=options['active_days'])
+        return shoppers.filter(Q(last_active__gte=since) | Q(bids__created_at__gte=since)).distinct()
+
+    def run_pass(self, options):
+        # Long-running worker: drop connections the database may have timed out
+        close_old_connections()
+        started = time.perf_counter()
+        count = 0
+        for shopper in self.active_shoppers(options).order_by('id').iterator(chunk_size=500):
+            compute_recommendations(shopper)
+            count += 1
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{timezone.now().isoformat()}: recommendations for {count} shoppers in {elapsed:.2f}s.')
@@ -0,0 +1,155 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.bids.models import Bid
+from apps.lists.management.seed import build_list, make_user
+from apps.lists.models import ShoppingList
+
+User = get_user_model()
+
+EMAIL_PREFIX = 'stress-bids-'
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent bid requests (including duplicates) at a few lists, "
+        "close one list mid-run, then report throughput and check that every "
+        "invariant holds. Run against a development database: concurrent "
+        "requests need committed data, which is deleted again afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lists', type=int, default=5)
+        parser.add_argument('--shoppers', type=int, default=40)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=3,
+                            help='Requests per shopper and list; all but one must conflict')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.cleanup()
+        try:
+            self.run(options)
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        User.objects.filter(email__startswith=EMAIL_PREFIX).delete()
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        client = make_user(f'{EMAIL_PREFIX}client@example.com', 'client')
+        lists = []
+        for _ in range(options['lists']):
+            shopping_list = build_list(client, rng)
+            shopping_list.save()
+            lists.append(shopping_list)
+        shoppers = [
+            make_user(f'{EMAIL_PREFIX}{index}@example.com', 'shopper')
+            for index in range(options['shoppers'])
+        ]
+
+        attempts = [
+            (shopper, shopping_list)
+            for shopper in shoppers
+            for shopping_list in lists
+            for _ in range(options['attempts'])
+        ]
+        rng.shuffle(attempts)
+
+        # Close the last list once a third of the requests have gone out
+        closing = lists[-1]
+        close_after = len(attempts) // 3
+        closed_at = {}
+        sent = Counter()
+        sent_lock = threading.Lock()
+
+        def close_list():
+            with transaction.atomic():
+                ShoppingList.objects.select_for_update().filter(pk=closing.pk).update(
+                    status='bidding_closed', updated_at=timezone.now()
+                )
+                closed_at['at'] = timezone.now()
+            connection.close()
+
+        local = threading.local()
+
+        def place(attempt):
+            shopper, shopping_list = attempt
+            if not hasattr(local, 'api'):
+                local.api = APIClient(HTTP_HOST='localhost')
+            local.api.force_authenticate(shopper)
+            response = local.api.post('/api/bids/', {
+                'shopping_list': shopping_list.id,
+                'amount': str(Decimal(rng.randint(500, 5000)) / 100),
+                'estimated_time': 30,
+                'distance_to_store': '1.00',
+            }, format='json')
+            with sent_lock:
+                sent['n'] += 1
+                if sent['n'] == close_after:
+                    threading.Thread(target=close_list).start()
+            return response.status_code
+
+        def worker(chunk):
+            try:
+                return [place(attempt) for attempt in chunk]
+            finally:
+                connection.close()
+
+        threads = options['threads']
+        chunks = [attempts[index::threads] for index in range(threads)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = [code for codes in pool.map(worker, chunks) for code in codes]
+        elapsed = time.perf_counter() - start
+
+        codes = Counter(results)
+        self.stdout.write(f'{len(results)} requests from {threads} threads in {elapsed:.2f}s '
+                          f'({len(results) / elapsed:.0f} req/s)')
+        self.stdout.write('Responses: ' + ', '.join(f'{code}: {n}' for code, n in sorted(codes.items())))
+
+        self.check_invariants(lists, closing, closed_at.get('at'), codes)
+
+    def check_invariants(self, lists, closing, closed_at, codes):
+        failures = []
+        bids = Bid.objects.filter(shopping_list__in=lists)
+
+        if any(code >= 500 for code in codes):
+            failures.append('server errors were returned')
+        if codes[201] != bids.count():
+            failures.append(f'{codes[201]} bids reported created but {bids.count()} stored')
+        duplicates = bids.values('shopper', 'shopping_list').annotate(n=Count('id')).filter(n__gt=1)
+        if duplicates.exists():
+            failures.append('a shopper has more than one bid on a list')
+        if closed_at and bids.filter(shopping_list=closing, created_at__gt=closed_at).exists():
+            failures.append('bids were accepted after the list closed')
+
+        actual = {
+            row['shopping_list']: row
+            for row in bids.filter(is_active=True).values('shopping_list').annotate(
+                count=Count('id'), lowest=Min('amount')
+            )
+        }
+        for shopping_list in ShoppingList.objects.filter(pk__in=[item.pk for item in lists]):
+            expected = actual.get(shopping_list.pk, {'count': 0, 'lowest': None})
+            if (shopping_list.active_bid_count != expected['count']
+                    or shopping_list.lowest_active_bid_amount != expected['lowest']):
+                failures.append(f'bid aggregates drifted on list {shopping_list.pk}')
+
+        for failure in failures:
+            self.stdout.write(self.style.ERROR(f'FAIL: {failure}'))
+        if failures:
+            raise CommandError(f'{len(failures)} invariants broken under concurrent bidding.')
+        self.stdout.write(self.style.SUCCESS('All invariants hold.'))
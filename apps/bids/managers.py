@@ -0,0 +1,194 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .exceptions import BidConflict, BidNotActive, ListClosedForBids
+
+
+class BidQuerySet(models.QuerySet):
+    """
+    Custom queryset for bids.
+    """
+
+    def dashboard_stats(self):
+        """
+        Bid counts over the queryset (one shopper's bids) in a single
+        conditional-aggregate query.
+        """
+        return self.order_by().aggregate(
+            active_bids=Count('id', filter=Q(is_active=True, status='active')),
+            won_bids=Count('id', filter=Q(status='won')),
+            completed_bids=Count('id', filter=Q(status='won', shopping_list__status='delivered')),
+        )
+
+    def lock_active(self, bid):
+        """
+        Lock `bid`'s list and then the bid, in the order place() and
+        Bid.mark_as_won() take them, and return the bid as stored now. Raises
+        BidNotActive (409) if it has won, lost or been withdrawn since it was
+        loaded, and ValidationError if its list is no longer open. Call inside
+        a transaction.
+        """
+        from apps.lists.models import ShoppingList
+
+        locked = ShoppingList.objects.select_for_update().filter(
+            pk=bid.shopping_list_id
+        ).values('status').get()
+        current = self.select_for_update().get(pk=bid.pk)
+        if current.status != 'active' or not current.is_active:
+            raise BidNotActive()
+        if locked['status'] != 'open':
+            raise ValidationError({'error': 'This shopping list is no longer open'})
+        return current
+
+    def place(self, shopper, shopping_list, **fields):
+        """
+        Place a bid as one atomic operation and return it.
+
+        The list row is locked first, so the open/deadline check cannot race
+        with closing or accepting, and concurrent bidders on a list queue on
+        one lock instead of deadlocking on the foreign-key check followed by
+        the aggregate UPDATE. A duplicate bid raises BidConflict and a list
+        that is no longer open ListClosedForBids (both 409).
+        """
+        from apps.lists.models import ShoppingList
+        from .events import BID_PLACED, publish_bid_event
+        from .models import BidHistory
+
+        with transaction.atomic(using=self.db):
+            locked = ShoppingList.objects.select_for_update().filter(
+                pk=shopping_list.pk
+            ).values('status', 'bidding_deadline').first()
+            if (locked is None or locked['status'] != 'open'
+                    or locked['bidding_deadline'] <= timezone.now()):
+                raise ListClosedForBids()
+
+            try:
+                # Savepoint, so the outer transaction stays usable after a conflict
+                with transaction.atomic(using=self.db):
+                    bid = self.create(shopper=shopper, shopping_list=shopping_list, **fields)
+            except IntegrityError:
+                raise BidConflict()
+
+            BidHistory.objects.create(
+                bid=bid, old_amount=bid.amount, new_amount=bid.amount, changed_by=shopper
+            )
+            shopping_list.refresh_bid_aggregates()
+            publish_bid_event(BID_PLACED, bid)
+        return bid
+
+    def place_many(self, shopper, items):
+        """
+        Place several bids for one shopper in a single transaction.
+
+        `items` are validated bid fields with `shopping_list` given as an id.
+        Returns one (status, bid) pair per item, in order, where status is
+        'created', 'not_found', 'closed' or 'conflict'. Target lists are
+        locked and checked with one query, and bids plus their history rows
+        are written with bulk_create.
+        """
+        from apps.lists.cache import invalidate_lists
+        from apps.lists.models import ShoppingList
+        from .cache import invalidate_dashboards
+        from .events import BID_PLACED, publish_bid_event
+        from .models import BidHistory
+
+        list_ids = {item['shopping_list'] for item in items}
+        with transaction.atomic(using=self.db):
+            # Lock in id order so overlapping batches cannot deadlock
+            lists = {
+                row['id']: row for row in ShoppingList.objects.select_for_update().filter(
+                    pk__in=list_ids
+                ).order_by('pk').values('id', 'status', 'bidding_deadline', 'estimated_total')
+            }
+            taken = set(self.filter(
+                shopper=shopper, shopping_list_id__in=list_ids
+            ).values_list('shopping_list_id', flat=True))
+
+            now = timezone.now()
+            results = []
+            new_bids = []
+            for item in items:
+                list_id = item['shopping_list']
+                target = lists.get(list_id)
+                if target is None:
+                    results.append(('not_found', None))
+                elif target['status'] != 'open' or target['bidding_deadline'] <= now:
+                    results.append(('closed', None))
+                elif list_id in taken:
+                    results.append(('conflict', None))
+                else:
+                    taken.add(list_id)
+                    fields = {key: value for key, value in item.items() if key != 'shopping_list'}
+                    bid = self.model(shopper=shopper, shopping_list_id=list_id, **fields)
+                    bid.refresh_score(estimated_total=target['estimated_total'])
+                    new_bids.append(bid)
+                    results.append(('created', bid))
+            if not new_bids:
+                return results
+
+            try:
+                with transaction.atomic(using=self.db):
+                    self.bulk_create(new_bids)
+            except IntegrityError:
+                raise BidConflict()
+            if new_bids[0].pk is None:
+                # MySQL returns no ids from a multi-row INSERT; the
+                # (shopper, shopping_list) pair identifies each new bid
+                ids = dict(self.filter(
+                    shopper=shopper, shopping_list_id__in=[bid.shopping_list_id for bid in new_bids]
+                ).values_list('shopping_list_id', 'id'))
+                for bid in new_bids:
+                    bid.pk = ids[bid.shopping_list_id]
+
+            BidHistory.objects.bulk_create([
+                BidHistory(bid=bid, old_amount=bid.amount, new_amount=bid.amount, changed_by=shopper)
+                for bid in new_bids
+            ])
+            changed = [bid.shopping_list_id for bid in new_bids]
+            ShoppingList.objects.filter(pk__in=changed).refresh_bid_aggregates()
+
+            # bulk_create sends no signals
+            invalidate_lists(changed, using=self.db)
+            invalidate_dashboards([shopper.pk], using=self.db)
+            refreshed = ShoppingList.objects.in_bulk(changed)
+            for bid in new_bids:
+                bid.shopping_list = refreshed[bid.shopping_list_id]
+                publish_bid_event(BID_PLACED, bid)
+        return results
+
+    def refresh_scores(self, batch_size=500):
+        """
+        Recompute the stored score of every bid in the queryset, e.g. after
+        its shopper's rating changed. Returns the number of bids updated.
+
+        The bids and their lists count as changed: updated_at and the lists'
+        last_bid_at move on, so conditional GETs stop answering 304, and the
+        lists' cached responses are retired.
+        """
+        from apps.lists.cache import invalidate_lists
+        from apps.lists.models import ShoppingList
+
+        with transaction.atomic(using=self.db):
+            list_ids = sorted(set(self.order_by().values_list('shopping_list_id', flat=True)))
+            if not list_ids:
+                return 0
+            # Lists before bids, the order place(), lock_active() and
+            # mark_as_won() lock in. The bids are read under those locks, so
+            # an amount changed meanwhile is not scored from its old value.
+            list(ShoppingList.objects.select_for_update().filter(pk__in=list_ids).order_by('pk').values_list('pk'))
+            bids = list(self.all().select_related('shopper', 'shopping_list').only(
+                'amount', 'distance_to_store', 'estimated_time', 'score',
+                'shopper__average_rating', 'shopper__completed_jobs',
+                'shopping_list__estimated_total',
+            ))
+            now = timezone.now()
+            for bid in bids:
+                bid.refresh_score()
+                bid.updated_at = now
+            self.model.objects.bulk_update(bids, ['score', 'updated_at'], batch_size=batch_size)
+            ShoppingList.objects.filter(pk__in=list_ids).update(last_bid_at=now, updated_at=now)
+            # Queryset updates send no signals
+            invalidate_lists(list_ids, using=self.db)
+        return len(bids)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bids', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['shopper', 'created_at'], name='bids_bid_shopper_dbfdd8_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:54
+
+from django.db import migrations, models
+
+from apps.bids.scoring import bid_score
+
+
+def backfill_scores(apps, schema_editor):
+    Bid = apps.get_model('bids', 'Bid')
+
+    bids = Bid.objects.select_related('shopper', 'shopping_list')
+    batch = []
+    for bid in bids.iterator(chunk_size=2000):
+        bid.score = bid_score(
+            bid.amount, bid.shopping_list.estimated_total,
+            bid.shopper.average_rating, bid.shopper.completed_jobs,
+            bid.distance_to_store, bid.estimated_time,
+        )
+        batch.append(bid)
+        if len(batch) == 2000:
+            Bid.objects.bulk_update(batch, ['score'])
+            batch = []
+    Bid.objects.bulk_update(batch, ['score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bids', '0002_feed_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bid',
+            name='score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['shopping_list', 'score'], name='bids_bid_shoppin_3f735f_idx'),
+        ),
+    ]
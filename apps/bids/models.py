@@ -1,6 +1,15 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator
+from django.db import transaction
+from django.utils import timezone
+from .events import BID_WON, publish_bid_event
+from .managers import BidQuerySet
+from .exceptions import BidAcceptConflict
+from .scoring import bid_score
+
+# List statuses in which the client can still pick a winning bid
+ACCEPTING_STATUSES = ('open', 'bidding_closed')
 
 class Bid(models.Model):
     STATUS_CHOICES = (
@@ -49,36 +58,103 @@ class Bid(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     is_active = models.BooleanField(default=True)
     
+    # Best-value rank among the list's bids, lower is better (see scoring.py)
+    score = models.FloatField(default=0, editable=False)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = BidQuerySet.as_manager()
+    
     class Meta:
         ordering = ['amount']  # Lowest bid first
         unique_together = ['shopper', 'shopping_list']  # Shopper can only bid once per list
         indexes = [
             models.Index(fields=['shopping_list', 'status']),
             models.Index(fields=['shopper', 'status']),
+            models.Index(fields=['shopper', 'created_at']),
+            models.Index(fields=['shopping_list', 'score']),
         ]
     
     def __str__(self):
         return f"${self.amount} - {self.shopper.email} - {self.shopping_list.title}"
     
-    def mark_as_won(self):
-        """Mark this bid as won and all others as lost"""
-        self.status = 'won'
-        self.save()
-        
-        # Mark all other bids on this list as lost
-        self.shopping_list.bids.exclude(id=self.id).update(
-            status='lost',
-            is_active=False
+    def save(self, *args, **kwargs):
+        self.refresh_score()
+        super().save(*args, **kwargs)
+    
+    def refresh_score(self, estimated_total=None):
+        """Recompute `score` from the bid, its shopper and its list (also needed before bulk_create)"""
+        if estimated_total is None:
+            estimated_total = self.shopping_list.estimated_total
+        self.score = bid_score(
+            self.amount, estimated_total,
+            self.shopper.average_rating, self.shopper.completed_jobs,
+            self.distance_to_store, self.estimated_time,
         )
-        
-        # Update the shopping list
-        self.shopping_list.selected_shopper = self.shopper
-        self.shopping_list.status = 'assigned'
-        self.shopping_list.save()
+    
+    def mark_as_won(self):
+        """
+        Accept this bid: it wins, the other active bids lose and the list is
+        assigned to this bid's shopper.
+
+        Runs in one transaction holding the list row lock, so two concurrent
+        accepts cannot both pick a winner, and issues the same few statements
+        however many bids the list has. Accepting the winning bid again is a
+        no-op that returns False. Raises BidAcceptConflict if the list already
+        has another winner or this bid is no longer active.
+        """
+        from apps.lists.cache import invalidate_lists
+        from apps.lists.models import ShoppingList
+        from .cache import invalidate_dashboards
+
+        shopping_list = self.shopping_list
+        with transaction.atomic():
+            locked = ShoppingList.objects.select_for_update().filter(
+                pk=self.shopping_list_id
+            ).values('status', 'selected_shopper_id').get()
+            if locked['status'] == 'assigned' and locked['selected_shopper_id'] == self.shopper_id:
+                return False
+            if locked['status'] not in ACCEPTING_STATUSES:
+                raise BidAcceptConflict()
+            
+            now = timezone.now()
+            won = Bid.objects.filter(pk=self.pk, status='active', is_active=True).update(
+                status='won', updated_at=now
+            )
+            if not won:
+                raise BidAcceptConflict({'error': 'This bid is no longer active'})
+            
+            # Mark all other active bids on this list as lost
+            losing = Bid.objects.filter(
+                shopping_list_id=self.shopping_list_id, status='active'
+            ).exclude(pk=self.pk)
+            losing_shoppers = list(losing.values_list('shopper_id', flat=True))
+            losing.update(status='lost', is_active=False, updated_at=now)
+            
+            # Assign the list. The winner is now its only active bid, so the
+            # bid aggregates are known without recounting the bid rows.
+            list_fields = {
+                'status': 'assigned',
+                'selected_shopper_id': self.shopper_id,
+                'active_bid_count': 1,
+                'lowest_active_bid_amount': self.amount,
+                'last_bid_at': now,
+                'updated_at': now,
+            }
+            ShoppingList.objects.filter(pk=self.shopping_list_id).update(**list_fields)
+            
+            self.status = 'won'
+            self.updated_at = now
+            for field, value in list_fields.items():
+                setattr(shopping_list, field, value)
+            
+            # Queryset updates send no signals
+            invalidate_lists([self.shopping_list_id])
+            invalidate_dashboards([self.shopper_id, *losing_shoppers])
+            publish_bid_event(BID_WON, self)
+        return True
 
 class BidHistory(models.Model):
     """Track bid changes for audit"""
@@ -0,0 +1,181 @@
+"""
+"Lists for you": personalized open lists for a shopper.
+
+Candidates come from a few cheap, indexed sources: lists near the
+shopper's location, lists at stores and in cities they have bid on, and
+lists in the budget range of the bids they win. Each candidate is scored
+on those signals plus competition and deadline, and the top ones are
+cached per shopper for a few minutes as (id, score, distance) tuples.
+
+Serving only reads that cache and re-fetches the ranked lists in one
+query, dropping any that closed or that the shopper has bid on since.
+With nothing cached it falls back to the plain nearby/newest feed, so a
+cold cache never makes a request compute recommendations inline; the
+precompute_recommendations worker keeps active shoppers warm.
+"""
+from django.conf import settings
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from apps.lists.geo import haversine_km
+from apps.lists.models import ShoppingList
+from shopper.cache import get_cache
+
+from .models import Bid
+
+TOP_K = 50
+CANDIDATES_PER_SOURCE = 200
+FAVOURITE_STORES = 5
+FAVOURITE_CITIES = 3
+
+# Widen the won-budget range so lists just outside it still qualify
+BUDGET_MARGIN = 0.25
+
+# Signal weights; higher scores rank first
+PROXIMITY_WEIGHT = 3.0
+STORE_WEIGHT = 2.0
+CITY_WEIGHT = 1.0
+BUDGET_WEIGHT = 1.5
+COMPETITION_WEIGHT = 1.0
+URGENCY_WEIGHT = 0.5
+
+# Bid counts past which a list is as contested as it gets
+CROWDED_BIDS = 10
+# Deadlines further away than this earn no urgency
+URGENT_HOURS = 48
+
+
+def recommendations_key(shopper_id):
+    return f'recommendations:{shopper_id}'
+
+
+def shopper_profile(shopper):
+    """Stores, cities and winning budget range from the shopper's bid history"""
+    bids = Bid.objects.filter(shopper=shopper).order_by()
+    stores = [
+        row['shopping_list__store_name']
+        for row in bids.values('shopping_list__store_name').annotate(
+            n=Count('id')
+        ).order_by('-n')[:FAVOURITE_STORES]
+    ]
+    cities = [
+        row['shopping_list__store_city']
+        for row in bids.values('shopping_list__store_city').annotate(
+            n=Count('id')
+        ).order_by('-n')[:FAVOURITE_CITIES]
+    ]
+    budget = bids.filter(status='won').aggregate(
+        low=Min('shopping_list__estimated_total'), high=Max('shopping_list__estimated_total')
+    )
+    if budget['low'] is not None:
+        budget = (
+            float(budget['low']) * (1 - BUDGET_MARGIN),
+            float(budget['high']) * (1 + BUDGET_MARGIN),
+        )
+    else:
+        budget = None
+    return {'stores': stores, 'cities': cities, 'budget': budget}
+
+
+def candidate_lists(shopper, profile):
+    """Open lists from every source, without duplicates, as value rows"""
+    fields = (
+        'id', 'store_name', 'store_city', 'estimated_total', 'bidding_deadline',
+        'delivery_latitude', 'delivery_longitude', 'active_bid_count',
+    )
+    base = ShoppingList.objects.open_for_bids().exclude(
+        bids__shopper=shopper
+    ).exclude(client=shopper)
+
+    sources = []
+    if shopper.latitude is not None and shopper.longitude is not None:
+        sources.append(base.nearby(shopper.latitude, shopper.longitude, shopper.max_bid_distance))
+    if profile['stores']:
+        sources.append(base.filter(store_name__in=profile['stores']).order_by('bidding_deadline', 'id'))
+    if profile['cities']:
+        sources.append(base.filter(store_city__in=profile['cities']).order_by('bidding_deadline', 'id'))
+    if profile['budget']:
+        low, high = profile['budget']
+        sources.append(base.filter(
+            estimated_total__gte=low, estimated_total__lte=high
+        ).order_by('bidding_deadline', 'id'))
+
+    candidates = {}
+    for source in sources:
+        for row in source.values(*fields)[:CANDIDATES_PER_SOURCE]:
+            candidates.setdefault(row['id'], row)
+    return list(candidates.values())
+
+
+def score_candidate(row, shopper, profile, now):
+    """Score a candidate list and return (score, distance in km or None)"""
+    score = 0.0
+    distance = None
+    if shopper.latitude is not None and shopper.longitude is not None:
+        distance = haversine_km(
+            shopper.latitude, shopper.longitude, row['delivery_latitude'], row['delivery_longitude']
+        )
+        # No proximity credit for a shopper who travels no distance at all
+        if shopper.max_bid_distance > 0 and distance <= shopper.max_bid_distance:
+            score += PROXIMITY_WEIGHT * (1 - distance / shopper.max_bid_distance)
+    if row['store_name'] in profile['stores']:
+        score += STORE_WEIGHT
+    if row['store_city'] in profile['cities']:
+        score += CITY_WEIGHT
+    if profile['budget']:
+        low, high = profile['budget']
+        if low <= float(row['estimated_total']) <= high:
+            score += BUDGET_WEIGHT
+    score += COMPETITION_WEIGHT * (1 - min(row['active_bid_count'], CROWDED_BIDS) / CROWDED_BIDS)
+    hours_left = (row['bidding_deadline'] - now).total_seconds() / 3600
+    score += URGENCY_WEIGHT * (1 - min(max(hours_left, 0), URGENT_HOURS) / URGENT_HOURS)
+    return score, distance
+
+
+def compute_recommendations(shopper):
+    """Rank candidates for the shopper and cache the top ones"""
+    profile = shopper_profile(shopper)
+    now = timezone.now()
+    scored = []
+    for row in candidate_lists(shopper, profile):
+        score, distance = score_candidate(row, shopper, profile, now)
+        scored.append((row['id'], round(score, 4), distance))
+    # Best score first, older lists first on ties
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    ranked = scored[:TOP_K]
+    get_cache().set(recommendations_key(shopper.pk), ranked, settings.RECOMMENDATIONS_CACHE_TIMEOUT)
+    return ranked
+
+
+def recommended_lists(shopper, limit):
+    """
+    The shopper's cached recommendations as ShoppingList instances, best
+    first, or None when nothing is cached.
+    """
+    ranked = get_cache().get(recommendations_key(shopper.pk))
+    if ranked is None:
+        return None
+
+    lists = ShoppingList.objects.open_for_bids().exclude(
+        bids__shopper=shopper
+    ).with_total_bid_count().select_related('client').in_bulk([item[0] for item in ranked])
+
+    results = []
+    for list_id, score, distance in ranked:
+        shopping_list = lists.get(list_id)
+        if shopping_list is None:
+            continue
+        shopping_list.distance = distance
+        shopping_list.recommendation_score = score
+        results.append(shopping_list)
+        if len(results) == limit:
+            break
+    return results
+
+
+def simple_feed(shopper, limit):
+    """The non-personalized feed: nearby lists if the shopper has a location, else the newest"""
+    queryset = ShoppingList.objects.open_for_bids().with_total_bid_count().select_related('client')
+    if shopper.latitude is not None and shopper.longitude is not None:
+        return list(queryset.nearby(shopper.latitude, shopper.longitude, shopper.max_bid_distance)[:limit])
+    return list(queryset.order_by('-created_at', '-id')[:limit])
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/lists/<int:pk>/bids/', consumers.ListBidsConsumer.as_asgi()),
+]
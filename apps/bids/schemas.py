@@ -7,6 +7,8 @@ DASHBOARD_RESPONSE_EXAMPLE = {
         'won_bids': 5,
         'completed_bids': 2,
         'total_earnings': 450.50,
+        'paid_out': 400.00,
+        'pending_payout': 50.50,
         'average_rating': 4.8,
         'completed_jobs': 7
     },
@@ -0,0 +1,45 @@
+"""
+Best-value score for bids. Lower is better.
+
+The score is mostly the price, relative to the list's estimated total, with
+small penalties for a weak or missing rating, little experience, a long
+trip to the store and a slow shop. It only depends on the bid, its list and
+its shopper, so it can be computed once when the bid is written (and again
+when the shopper's rating changes) and stored in an indexed column.
+"""
+from decimal import Decimal
+
+PRICE_WEIGHT = 1.0
+RATING_WEIGHT = 0.3
+EXPERIENCE_WEIGHT = 0.1
+DISTANCE_WEIGHT = 0.1
+TIME_WEIGHT = 0.1
+
+# Caps past which more of something no longer changes the score
+EXPERIENCED_JOBS = 50
+FAR_DISTANCE = 50      # same unit as Bid.distance_to_store
+SLOW_MINUTES = 240
+
+# A shopper without reviews ranks like an average one
+UNRATED_PENALTY = 0.5
+
+
+def _capped(value, cap):
+    return min(max(float(value), 0.0), cap) / cap
+
+
+def bid_score(amount, estimated_total, rating, completed_jobs, distance_to_store, estimated_time):
+    estimated_total = estimated_total or Decimal('1')
+    price = float(Decimal(amount) / Decimal(estimated_total))
+    if rating:
+        # 5 stars -> 0, 1 star -> 1
+        rating_penalty = (5 - min(max(rating, 1.0), 5.0)) / 4
+    else:
+        rating_penalty = UNRATED_PENALTY
+    return (
+        PRICE_WEIGHT * price
+        + RATING_WEIGHT * rating_penalty
+        + EXPERIENCE_WEIGHT * (1 - _capped(completed_jobs, EXPERIENCED_JOBS))
+        + DISTANCE_WEIGHT * _capped(distance_to_store, FAR_DISTANCE)
+        + TIME_WEIGHT * _capped(estimated_time, SLOW_MINUTES)
+    )
@@ -1,10 +1,14 @@
 from rest_framework import serializers
 from django.utils import timezone
 from .models import Bid, BidHistory
+from .exceptions import BidConflict, ListClosedForBids
 from apps.lists.models import ShoppingList
+from apps.lists.serializers import ShoppingListSummarySerializer
 from apps.users.serializers import UserSerializer
+from shopper.dynamic_fields import DynamicFieldsMixin
+from shopper.fastserializers import ValuesPlan
 
-class BidSerializer(serializers.ModelSerializer):
+class BidSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     shopper_details = UserSerializer(source='shopper', read_only=True)
     shopping_list_title = serializers.CharField(source='shopping_list.title', read_only=True)
     
@@ -16,6 +20,9 @@ class BidSerializer(serializers.ModelSerializer):
             'distance_to_store', 'status', 'is_active', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'shopper', 'status', 'created_at', 'updated_at']
+        expandable_fields = {
+            'shopping_list': (ShoppingListSummarySerializer, {'read_only': True}),
+        }
 
 class CreateBidSerializer(serializers.ModelSerializer):
     class Meta:
@@ -28,21 +35,15 @@ class CreateBidSerializer(serializers.ModelSerializer):
         
         # Check if shopping list is open for bids
         if shopping_list.status != 'open':
-            raise serializers.ValidationError(
-                "This shopping list is not open for bids"
-            )
+            raise ListClosedForBids()
         
         # Check if bidding deadline hasn't passed
         if timezone.now() >= shopping_list.bidding_deadline:
-            raise serializers.ValidationError(
-                "Bidding deadline has passed for this list"
-            )
+            raise ListClosedForBids({'error': 'Bidding deadline has passed for this list'})
         
         # Check if user has already bid on this list
         if Bid.objects.filter(shopper=user, shopping_list=shopping_list).exists():
-            raise serializers.ValidationError(
-                "You have already placed a bid on this list"
-            )
+            raise BidConflict()
         
         # Check if user is a shopper
         if user.user_type not in ['shopper', 'both']:
@@ -59,8 +60,25 @@ class CreateBidSerializer(serializers.ModelSerializer):
         return data
     
     def create(self, validated_data):
-        validated_data['shopper'] = self.context['request'].user
-        return super().create(validated_data)
+        # The checks in validate() are a fast path; place() repeats the list
+        # checks under a row lock and maps duplicate inserts to a 409.
+        return Bid.objects.place(self.context['request'].user, **validated_data)
+
+class BatchBidItemSerializer(serializers.ModelSerializer):
+    """
+    One bid of a batch. The target list is a plain id: the lists are
+    looked up and checked together when the batch is placed.
+    """
+    shopping_list = serializers.IntegerField()
+    
+    class Meta:
+        model = Bid
+        fields = ['shopping_list', 'amount', 'message', 'estimated_time', 'distance_to_store']
+    
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Bid amount must be greater than 0")
+        return value
 
 class UpdateBidSerializer(serializers.ModelSerializer):
     class Meta:
@@ -87,7 +105,7 @@ class UpdateBidSerializer(serializers.ModelSerializer):
         
         return data
 
-class ShoppingListForShopperSerializer(serializers.ModelSerializer):
+class ShoppingListForShopperSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Simplified shopping list serializer for shoppers browsing open lists
     """
@@ -96,6 +114,7 @@ class ShoppingListForShopperSerializer(serializers.ModelSerializer):
     client_total_lists = serializers.IntegerField(source='client.total_lists_posted')
     total_count = serializers.IntegerField(read_only=True)
     lowest_bid = serializers.SerializerMethodField()
+    distance = serializers.SerializerMethodField()
     
     class Meta:
         model = ShoppingList
@@ -104,15 +123,65 @@ class ShoppingListForShopperSerializer(serializers.ModelSerializer):
             'store_city', 'estimated_total', 'max_budget', 'preferred_delivery_time',
             'bidding_deadline', 'delivery_latitude', 'delivery_longitude',
             'client_name', 'client_rating', 'client_total_lists',
-            'total_count', 'lowest_bid', 'created_at'
+            'total_count', 'lowest_bid', 'distance', 'created_at'
         ]
+        expandable_fields = {
+            'client': (UserSerializer, {'read_only': True}),
+        }
+        query_sources = {
+            'client_name': ['client.first_name', 'client.last_name'],
+            'lowest_bid': ['lowest_active_bid_amount', 'active_bid_count'],
+            'distance': ['distance'],
+        }
     
     def get_lowest_bid(self, obj):
-        lowest = obj.lowest_bid
+        # Read the denormalized columns so serializing a page costs no extra queries
+        lowest = obj.lowest_active_bid_amount
         return {
-            'amount': float(lowest.amount) if lowest else None,
-            'bidder_count': obj.bid_count
+            'amount': float(lowest) if lowest is not None else None,
+            'bidder_count': obj.active_bid_count
         }
+    
+    def get_distance(self, obj):
+        # Only present when the queryset was ranked by distance (km)
+        distance = getattr(obj, 'distance', None)
+        return round(distance, 2) if distance is not None else None
+
+def _lowest_bid(row, context):
+    lowest = row['lowest_active_bid_amount']
+    return {
+        'amount': float(lowest) if lowest is not None else None,
+        'bidder_count': row['active_bid_count']
+    }
+
+def _distance(row, context):
+    distance = row.get('distance')
+    return round(distance, 2) if distance is not None else None
+
+# Same output as the serializers above, read straight from .values() rows
+BID_PLAN = ValuesPlan(BidSerializer)
+LIST_FOR_SHOPPER_PLAN = ValuesPlan(ShoppingListForShopperSerializer, overrides={
+    'client_name': (
+        ['client__first_name', 'client__last_name'],
+        lambda row, context: f"{row['client__first_name']} {row['client__last_name']}".strip()
+    ),
+    'lowest_bid': (['lowest_active_bid_amount', 'active_bid_count'], _lowest_bid),
+    # Only annotated when ranked by distance, and then part of the cursor ordering
+    'distance': ([], _distance),
+})
+
+class RecommendedListSerializer(ShoppingListForShopperSerializer):
+    """
+    An open list recommended to the shopper, with its ranking score
+    """
+    score = serializers.SerializerMethodField()
+    
+    class Meta(ShoppingListForShopperSerializer.Meta):
+        fields = ShoppingListForShopperSerializer.Meta.fields + ['score']
+    
+    def get_score(self, obj):
+        # Absent when the list came from the fallback feed
+        return getattr(obj, 'recommendation_score', None)
 
 class BidHistorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,3 +1,462 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.bids.cache import dashboard_namespace
+from apps.bids.consumers import CLOSE_FORBIDDEN, CLOSE_UNAUTHENTICATED
+from apps.bids.events import BID_PLACED
+from apps.bids.models import Bid
+from apps.bids.serializers import (
+    BID_PLAN, LIST_FOR_SHOPPER_PLAN, BidSerializer, CreateBidSerializer, ShoppingListForShopperSerializer,
+)
+from apps.lists.models import ShoppingList
+from apps.transactions.ledger import rebuild_ledger
+from apps.transactions.models import Payout, Transaction
+from apps.users.models import User
+from shopper.asgi import application
+from shopper.dynamic_fields import parse_spec
+from shopper.optimizer import optimize
+
+pytestmark = pytest.mark.django_db
+
+# The consumer reads the database from a worker thread, which must see
+# committed rows; bid events are also only sent on commit.
+websocket = pytest.mark.django_db(transaction=True)
+
+
+def bid_stream(shopping_list, token=None):
+    path = f'/ws/lists/{shopping_list.pk}/bids/'
+    if token:
+        path += f'?token={token}'
+    # AllowedHostsOriginValidator refuses handshakes without an allowed Origin
+    return WebsocketCommunicator(application, path, headers=[(b'origin', b'http://localhost')])
+
+
+@websocket
+def test_unauthenticated_connection_is_refused(shopping_list):
+    async def run():
+        connected, code = await bid_stream(shopping_list).connect()
+        assert not connected
+        assert code == CLOSE_UNAUTHENTICATED
+
+    async_to_sync(run)()
+
+
+@websocket
+def test_invalid_token_is_refused(shopping_list):
+    async def run():
+        connected, code = await bid_stream(shopping_list, token='not-a-token').connect()
+        assert not connected
+        assert code == CLOSE_UNAUTHENTICATED
+
+    async_to_sync(run)()
+
+
+@websocket
+def test_other_users_are_refused(shopping_list, other_shopper, access_token):
+    token = access_token(other_shopper)
+
+    async def run():
+        connected, code = await bid_stream(shopping_list, token).connect()
+        assert not connected
+        assert code == CLOSE_FORBIDDEN
+
+    async_to_sync(run)()
+
+
+@websocket
+def test_owner_receives_bid_placed(shopping_list, client_user, shopper_user, access_token, auth_client):
+    shopper_api = auth_client(shopper_user)
+    token = access_token(client_user)
+
+    async def run():
+        stream = bid_stream(shopping_list, token)
+        connected, _ = await stream.connect()
+        assert connected
+
+        response = await sync_to_async(shopper_api.post)('/api/bids/', {
+            'shopping_list': shopping_list.pk,
+            'amount': '12.50',
+            'estimated_time': 45,
+            'distance_to_store': '1.20',
+        }, format='json')
+        assert response.status_code == 201
+
+        message = json.loads(await stream.receive_from())
+        assert message['event'] == BID_PLACED
+        assert message['list'] == {
+            'id': shopping_list.pk, 'status': 'open', 'bid_count': 1, 'lowest_bid_amount': '12.50',
+        }
+        # The owner gets the bid details, not just the public summary
+        assert message['bid']['shopper'] == shopper_user.pk
+        assert message['bid']['amount'] == '12.50'
+        await stream.disconnect()
+
+    async_to_sync(run)()
+
+
+@pytest.fixture
+def bids(shopping_list, shopper_user, other_shopper):
+    Bid.objects.create(
+        shopper=shopper_user, shopping_list=shopping_list, amount=Decimal('9.99'), message='On my way',
+        estimated_time=30, distance_to_store=Decimal('1.50'),
+    )
+    Bid.objects.create(
+        shopper=other_shopper, shopping_list=shopping_list, amount=Decimal('11.00'),
+        estimated_time=60, distance_to_store=Decimal('4.25'), status='withdrawn', is_active=False,
+    )
+    ShoppingList.objects.filter(pk=shopping_list.pk).refresh_bid_aggregates()
+    return Bid.objects.order_by('id')
+
+
+@pytest.mark.parametrize('fields,expand', [
+    ('', ''),
+    ('id,amount,shopper_details.email,shopper_details.avatar', ''),
+    ('shopping_list_title,status,is_active', ''),
+    ('', 'shopping_list'),
+    ('id,shopping_list.title', 'shopping_list'),
+])
+def test_bid_plan_matches_serializer(bids, assert_plan_parity, fields, expand):
+    assert_plan_parity(BID_PLAN, bids, fields, expand)
+
+
+@pytest.mark.parametrize('fields,expand', [
+    ('', ''),
+    ('id,client_name,client_rating,lowest_bid', ''),
+    ('id,total_count,distance', ''),
+    ('', 'client'),
+    ('id,client.email', 'client'),
+])
+def test_list_for_shopper_plan_matches_serializer(bids, assert_plan_parity, fields, expand):
+    lists = ShoppingList.objects.with_total_bid_count().order_by('id')
+    assert_plan_parity(LIST_FOR_SHOPPER_PLAN, lists, fields, expand)
+
+
+@pytest.mark.parametrize('fields,expand,queries', [
+    ('', '', 1),
+    ('id,amount', '', 1),
+    ('id,shopper_details.email', 'shopping_list', 1),
+])
+def test_bid_serializer_queryset_is_optimized(bids, django_assert_num_queries, fields, expand, queries):
+    fields = parse_spec(fields) if fields else None
+    expand = parse_spec(expand) if expand else {}
+    plan = BID_PLAN.variant(fields, expand)
+    queryset = Bid.objects.order_by('id')
+    # As SparseFieldsMixin shapes it: the full serializer, or the variant it asks for
+    queryset = optimize(queryset, BidSerializer) if plan is BID_PLAN else plan.restrict(queryset)
+    with django_assert_num_queries(queries):
+        BidSerializer(queryset, many=True, fields=fields, expand=expand).data
+
+
+def test_list_for_shopper_serializer_queryset_is_optimized(bids, django_assert_num_queries):
+    queryset = optimize(ShoppingList.objects.with_total_bid_count().order_by('id'), ShoppingListForShopperSerializer)
+    with django_assert_num_queries(1):
+        ShoppingListForShopperSerializer(queryset, many=True).data
+
+
+def at(latitude, longitude):
+    return {'delivery_latitude': Decimal(latitude), 'delivery_longitude': Decimal(longitude)}
+
+
+@pytest.fixture
+def feed_lists(make_list):
+    # The shopper is at (40, -100); a degree of latitude is about 111 km
+    return {
+        'near': make_list(**at('40.050000', '-100.000000'), bidding_deadline=timezone.now() + timedelta(hours=5)),
+        'mid': make_list(**at('40.500000', '-100.000000'), bidding_deadline=timezone.now() + timedelta(hours=2)),
+        'far': make_list(**at('43.000000', '-100.000000'), bidding_deadline=timezone.now() + timedelta(hours=1)),
+    }
+
+
+def feed_titles(response, feed_lists):
+    names = {row.pk: name for name, row in feed_lists.items()}
+    assert response.status_code == 200, response.content
+    return [names[row['id']] for row in response.json()['results']]
+
+
+def test_available_lists_within_the_stored_bid_distance(feed_lists, shopper_user, auth_client):
+    response = auth_client(shopper_user).get('/api/bids/available-lists/')
+    assert feed_titles(response, feed_lists) == ['near']
+
+
+def test_available_lists_without_a_bid_distance_is_the_deadline_feed(feed_lists, shopper_user, auth_client):
+    User.objects.filter(pk=shopper_user.pk).update(max_bid_distance=0)
+    response = auth_client(shopper_user).get('/api/bids/available-lists/')
+    assert feed_titles(response, feed_lists) == ['far', 'mid', 'near']
+    assert response.json()['results'][0]['distance'] is None
+
+
+def test_available_lists_caps_max_distance(feed_lists, shopper_user, auth_client):
+    api = auth_client(shopper_user)
+    assert feed_titles(api.get('/api/bids/available-lists/?max_distance=100'), feed_lists) == ['near', 'mid']
+    # 'far' is about 333 km away, beyond MAX_SEARCH_RADIUS_KM
+    assert feed_titles(api.get('/api/bids/available-lists/?max_distance=100000'), feed_lists) == ['near', 'mid']
+
+
+@pytest.mark.parametrize('value', ['0', '-5', 'nan', 'far'])
+def test_available_lists_rejects_bad_max_distance(shopper_user, auth_client, value):
+    response = auth_client(shopper_user).get('/api/bids/available-lists/', {'max_distance': value})
+    assert response.status_code == 400
+
+
+def test_shopper_writes_retire_only_their_dashboard(bumped, make_list, shopper_user, other_shopper, auth_client):
+    namespaces = [dashboard_namespace(shopper_user.pk), dashboard_namespace(other_shopper.pk)]
+    mine = {namespaces[0]}
+    shopping_list = make_list(expires_at=timezone.now() + timedelta(days=2))
+
+    def place_bid():
+        response = auth_client(shopper_user).post('/api/bids/', {
+            'shopping_list': shopping_list.pk, 'amount': '12.00', 'estimated_time': 30, 'distance_to_store': '1.00',
+        }, format='json')
+        assert response.status_code == 201
+
+    def pay():
+        bid = Bid.objects.get()
+        txn = Transaction.objects.create(
+            shopping_list=shopping_list, bid=bid, bid_amount=bid.amount, platform_fee=Decimal('1.20'),
+            shopper_payout=Decimal('10.80'), total_charged=bid.amount, payment_method='stripe',
+            status='completed',
+        )
+        Payout.objects.create(shopper=shopper_user, transaction=txn, amount=Decimal('10.80'))
+
+    writes = [
+        ('place bid', place_bid),
+        ('expire the list and its bids', lambda: ShoppingList.objects.expire_due(timezone.now() + timedelta(days=3))),
+        ('transaction and payout', pay),
+        ('rebuild ledger', lambda: rebuild_ledger([shopper_user.pk])),
+    ]
+    for label, write in writes:
+        assert bumped(namespaces, write) == mine, label
+
+
+def place(api, shopping_list, amount='12.00'):
+    return api.post('/api/bids/', {
+        'shopping_list': shopping_list.pk, 'amount': amount, 'estimated_time': 30, 'distance_to_store': '1.00',
+    }, format='json')
+
+
+def test_second_bid_on_a_list_is_a_conflict(shopping_list, shopper_user, auth_client):
+    api = auth_client(shopper_user)
+    assert place(api, shopping_list).status_code == 201
+    response = place(api, shopping_list, '9.00')
+    assert response.status_code == 409
+    assert response.json() == {'error': 'You have already placed a bid on this list'}
+    shopping_list.refresh_from_db()
+    assert (Bid.objects.count(), shopping_list.active_bid_count, shopping_list.lowest_active_bid_amount) == (
+        1, 1, Decimal('12.00'),
+    )
+
+
+@pytest.mark.parametrize('fields,error', [
+    ({'status': 'bidding_closed'}, 'This shopping list is not open for bids'),
+    ({'status': 'assigned'}, 'This shopping list is not open for bids'),
+    ({'bidding_deadline': timezone.now() - timedelta(minutes=1)}, 'Bidding deadline has passed for this list'),
+])
+def test_bid_on_a_closed_list_is_a_conflict(make_list, shopper_user, auth_client, fields, error):
+    response = place(auth_client(shopper_user), make_list(**fields))
+    assert response.status_code == 409
+    assert response.json() == {'error': error}
+    assert not Bid.objects.exists()
+
+
+def test_list_closing_after_validation_is_a_conflict(monkeypatch, shopping_list, shopper_user, auth_client):
+    # Closed between the serializer's check and the locked one in place()
+    validate = CreateBidSerializer.validate
+
+    def validate_then_close(self, data):
+        data = validate(self, data)
+        ShoppingList.objects.filter(pk=shopping_list.pk).update(status='bidding_closed')
+        return data
+
+    monkeypatch.setattr(CreateBidSerializer, 'validate', validate_then_close)
+    response = place(auth_client(shopper_user), shopping_list)
+    assert response.status_code == 409
+    assert response.json() == {'error': 'This shopping list is not open for bids'}
+    assert not Bid.objects.exists()
+
+
+def test_duplicate_insert_after_validation_is_a_conflict(monkeypatch, shopping_list, shopper_user, auth_client):
+    # Another request's bid lands between the serializer's check and the INSERT
+    validate = CreateBidSerializer.validate
+
+    def validate_then_race(self, data):
+        data = validate(self, data)
+        Bid.objects.create(
+            shopper=shopper_user, shopping_list=shopping_list, amount=Decimal('11.00'),
+            estimated_time=30, distance_to_store=Decimal('1.00'),
+        )
+        return data
+
+    monkeypatch.setattr(CreateBidSerializer, 'validate', validate_then_race)
+    response = place(auth_client(shopper_user), shopping_list)
+    assert response.status_code == 409
+    assert Bid.objects.get().amount == Decimal('11.00')
+
+
+def accept(api, shopping_list, bid):
+    return api.post(f'/api/lists/{shopping_list.pk}/accept-bid/{bid.pk}/')
+
+
+@pytest.fixture
+def competing_bids(shopping_list, shopper_user, other_shopper):
+    return [
+        Bid.objects.create(
+            shopper=shopper, shopping_list=shopping_list, amount=Decimal(amount),
+            estimated_time=30, distance_to_store=Decimal('1.00'),
+        )
+        for shopper, amount in ((shopper_user, '12.00'), (other_shopper, '10.00'))
+    ]
+
+
+def test_accepting_the_winning_bid_again_changes_nothing(shopping_list, competing_bids, client_user, auth_client):
+    api = auth_client(client_user)
+    winner, loser = competing_bids
+    first = accept(api, shopping_list, winner)
+    assert first.status_code == 200
+    assert first.json()['status'] == 'assigned'
+    updated_at = Bid.objects.get(pk=winner.pk).updated_at
+
+    again = accept(api, shopping_list, winner)
+    assert again.status_code == 200
+    assert again.json()['status'] == 'assigned'
+    assert Bid.objects.get(pk=winner.pk).updated_at == updated_at
+    assert dict(Bid.objects.values_list('pk', 'status')) == {winner.pk: 'won', loser.pk: 'lost'}
+
+
+def test_accepting_another_bid_after_a_winner_is_a_conflict(shopping_list, competing_bids, client_user, auth_client):
+    api = auth_client(client_user)
+    winner, loser = competing_bids
+    assert accept(api, shopping_list, winner).status_code == 200
+
+    response = accept(api, shopping_list, loser)
+    assert response.status_code == 409
+    assert response.json() == {'error': 'Another bid has already been accepted for this list'}
+    shopping_list.refresh_from_db()
+    assert (shopping_list.status, shopping_list.selected_shopper_id) == ('assigned', winner.shopper_id)
+    assert dict(Bid.objects.values_list('pk', 'status')) == {winner.pk: 'won', loser.pk: 'lost'}
+
+
+def test_accepting_a_withdrawn_bid_is_a_conflict(shopping_list, competing_bids, client_user, auth_client):
+    withdrawn = competing_bids[1]
+    Bid.objects.filter(pk=withdrawn.pk).update(status='withdrawn', is_active=False)
+    response = accept(auth_client(client_user), shopping_list, withdrawn)
+    assert response.status_code == 409
+    assert response.json() == {'error': 'This bid is no longer active'}
+    shopping_list.refresh_from_db()
+    assert shopping_list.status == 'open'
+
+
+def test_accept_issues_the_same_queries_however_many_bids(make_list, client_user, auth_client):
+    api = auth_client(client_user)
+    counts = []
+    for bid_count in (1, 6):
+        shopping_list = make_list()
+        shoppers = [
+            User.objects.create_user(email=f'bidder-{shopping_list.pk}-{n}@example.com', password='x', user_type='shopper')
+            for n in range(bid_count)
+        ]
+        Bid.objects.bulk_create(
+            Bid(shopper=shopper, shopping_list=shopping_list, amount=Decimal('10.00') + n,
+                estimated_time=30, distance_to_store=Decimal('1.00'))
+            for n, shopper in enumerate(shoppers)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            assert accept(api, shopping_list, Bid.objects.filter(shopping_list=shopping_list).first()).status_code == 200
+        counts.append(len(queries))
+        assert Bid.objects.filter(shopping_list=shopping_list, status='lost').count() == bid_count - 1
+    assert counts[0] == counts[1]
+
+
+def batch_item(shopping_list_id, amount='12.00', **fields):
+    return {
+        'shopping_list': shopping_list_id, 'amount': amount, 'estimated_time': 30, 'distance_to_store': '1.00',
+        **fields,
+    }
+
+
+def post_batch(api, rows):
+    return api.post('/api/bids/batch/', rows, format='json')
+
+
+def test_batch_reports_each_bid(make_list, shopper_user, auth_client):
+    first, second, closed, already = make_list(), make_list(), make_list(status='bidding_closed'), make_list()
+    past_deadline = make_list(bidding_deadline=timezone.now() - timedelta(minutes=1))
+    api = auth_client(shopper_user)
+    assert place(api, already).status_code == 201
+
+    response = post_batch(api, [
+        batch_item(first.pk, '10.00'),
+        batch_item(second.pk, '-1.00'),
+        'not a bid',
+        batch_item(closed.pk),
+        batch_item(past_deadline.pk),
+        batch_item(already.pk),
+        batch_item(first.pk, '9.00'),
+        batch_item(999999),
+        batch_item(second.pk, '11.00'),
+    ])
+    assert response.status_code == 207
+    body = response.json()
+    assert (body['created'], body['failed']) == (2, 7)
+    results = body['results']
+    assert [entry['item'] for entry in results] == list(range(9))
+    assert [entry['status'] for entry in results] == [
+        'created', 'invalid', 'invalid', 'closed', 'closed', 'conflict', 'conflict', 'not_found', 'created',
+    ]
+    assert set(results[1]['errors']) == {'amount'}
+    assert set(results[2]['errors']) == {'shopping_list', 'amount', 'estimated_time', 'distance_to_store'}
+
+    placed = Bid.objects.filter(shopper=shopper_user)
+    assert results[0]['id'] == placed.get(shopping_list=first).pk
+    assert results[8]['id'] == placed.get(shopping_list=second).pk
+    assert all('id' not in entry for entry in results[1:8])
+    for shopping_list, amount in ((first, '10.00'), (second, '11.00')):
+        shopping_list.refresh_from_db()
+        assert (shopping_list.active_bid_count, shopping_list.lowest_active_bid_amount) == (1, Decimal(amount))
+        assert placed.get(shopping_list=shopping_list).history.count() == 1
+
+
+def test_batch_of_placed_bids_is_created(make_list, shopper_user, auth_client):
+    lists = [make_list(), make_list()]
+    response = post_batch(auth_client(shopper_user), [batch_item(row.pk) for row in lists])
+    assert response.status_code == 201
+    assert response.json()['created'] == 2
+    ids = dict(Bid.objects.values_list('shopping_list_id', 'id'))
+    assert [entry['id'] for entry in response.json()['results']] == [ids[row.pk] for row in lists]
+
+
+def test_batch_without_a_placed_bid_is_a_bad_request(make_list, shopper_user, auth_client):
+    response = post_batch(auth_client(shopper_user), [
+        batch_item(make_list(status='assigned').pk), batch_item(999999),
+    ])
+    assert response.status_code == 400
+    assert [entry['status'] for entry in response.json()['results']] == ['closed', 'not_found']
+    assert not Bid.objects.exists()
+
+
+@pytest.mark.parametrize('body,error', [
+    ({'shopping_list': 1}, 'Expected a non-empty list of bids'),
+    ([], 'Expected a non-empty list of bids'),
+    ([{}] * 101, 'At most 100 bids can be placed per request'),
+])
+def test_batch_body_must_be_a_bounded_list(shopper_user, auth_client, body, error):
+    response = post_batch(auth_client(shopper_user), body)
+    assert response.status_code == 400
+    assert response.json() == {'error': error}
+
+
+def test_batch_recovers_ids_without_returning_inserts(monkeypatch, make_list, shopper_user, auth_client):
+    # As on MySQL, where a multi-row INSERT returns no primary keys
+    monkeypatch.setattr(type(connection.features), 'can_return_rows_from_bulk_insert', False)
+    lists = [make_list(), make_list()]
+    response = post_batch(auth_client(shopper_user), [batch_item(row.pk) for row in lists])
+    assert response.status_code == 201
+    ids = dict(Bid.objects.values_list('shopping_list_id', 'id'))
+    assert [entry['id'] for entry in response.json()['results']] == [ids[row.pk] for row in lists]
@@ -7,10 +7,12 @@ urlpatterns = [
     
     # Available lists to bid on
     path('available-lists/', views.AvailableListsView.as_view(), name='available-lists'),
+    path('for-you/', views.RecommendedListsView.as_view(), name='recommended-lists'),
     path('lists/<int:pk>/', views.ListDetailForShopperView.as_view(), name='list-detail-shopper'),
     
     # Bid management
     path('', views.PlaceBidView.as_view(), name='place-bid'),
+    path('batch/', views.PlaceBidsBatchView.as_view(), name='place-bids-batch'),
     path('my-bids/', views.MyBidsView.as_view(), name='my-bids'),
     path('lists/<int:pk>/bids/', views.ListBidsView.as_view(), name='list-bids'),
     path('won/', views.MyWonBidsView.as_view(), name='my-won-bids'),
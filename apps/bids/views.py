@@ -1,19 +1,41 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Q, Count
 from django.shortcuts import get_object_or_404
 from .models import Bid, BidHistory
+from .events import BID_UPDATED, BID_WITHDRAWN, publish_bid_event
 from apps.lists.models import ShoppingList
+from apps.lists.cache import FEED_NAMESPACE
+from apps.lists.conditional import ConditionalGetMixin
+from apps.lists.geo import MAX_SEARCH_RADIUS_KM
+from apps.transactions.models import ShopperBalance
+from shopper.cache import CachedResponseMixin, get_cache, get_versions
+from shopper.dynamic_fields import SPARSE_FIELDS_PARAMETERS, SparseFieldsMixin
+from shopper.fastserializers import ValuesListMixin
+from shopper.optimizer import OptimizedQuerysetMixin
+from .cache import dashboard_namespace
+from .recommendations import TOP_K, recommended_lists, simple_feed
 from .serializers import (
-    BidSerializer, CreateBidSerializer, UpdateBidSerializer,
-    ShoppingListForShopperSerializer, BidHistorySerializer
+    BidSerializer, CreateBidSerializer, UpdateBidSerializer, BatchBidItemSerializer,
+    ShoppingListForShopperSerializer, RecommendedListSerializer, BidHistorySerializer,
+    BID_PLAN, LIST_FOR_SHOPPER_PLAN
 )
 from .permissions import IsShopper, IsBidOwner, IsBidActive
+from shopper.pagination import (
+    DeadlineCursorPagination, NewestFirstCursorPagination, RecentlyUpdatedCursorPagination
+)
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample, extend_schema_view
 from drf_spectacular.types import OpenApiTypes
 
+BATCH_BID_MAX_ITEMS = 100
+DASHBOARD_LISTS = 10
+FEED_DEFAULT_LIMIT = 20
+
 @extend_schema_view(
     get=extend_schema(
         tags=['Dashboard'],
@@ -29,124 +51,200 @@ class ShopperDashboardView(generics.GenericAPIView):
     Get shopper dashboard with stats and recent activity
     """
     permission_classes = [permissions.IsAuthenticated, IsShopper]
+    query_budget = 5
     
     def get(self, request):
         user = request.user
-        now = timezone.now()
-        
-        # Get counts
-        active_bids = Bid.objects.filter(
-            shopper=user, 
-            is_active=True, 
-            status='active'
-        ).count()
-        
-        won_bids = Bid.objects.filter(
-            shopper=user, 
-            status='won'
-        ).count()
+        data = self.get_snapshot(user)
+        data['nearby_lists'] = RecommendedListSerializer(
+            self.get_nearby_lists(user), many=True
+        ).data
+        return Response(data)
+    
+    def get_snapshot(self, user):
+        """Stats and recent bids, cached per shopper until one of their bids or transactions changes"""
+        timeout = settings.DASHBOARD_CACHE_TIMEOUT
+        if not timeout:
+            return self.build_snapshot(user)
         
-        completed_bids = Bid.objects.filter(
-            shopper=user,
-            shopping_list__status='delivered'
-        ).count()
+        cache = get_cache()
+        namespace = dashboard_namespace(user.pk)
+        version, = get_versions([namespace])
+        key = f'{namespace}:v{version}'
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = self.build_snapshot(user)
+            cache.set(key, snapshot, timeout)
+        return snapshot
+    
+    def build_snapshot(self, user):
+        stats = Bid.objects.filter(shopper=user).dashboard_stats()
+        # Money comes from the ledger's running totals, not the transaction rows
+        balance = ShopperBalance.objects.filter(shopper=user).first() or ShopperBalance(shopper=user)
+        stats['total_earnings'] = balance.total_earned
+        stats['paid_out'] = balance.total_paid_out
+        stats['pending_payout'] = balance.balance
+        stats['average_rating'] = user.average_rating
+        stats['completed_jobs'] = user.completed_jobs
         
-        # Get recent bids
         recent_bids = Bid.objects.filter(
             shopper=user
-        ).select_related('shopping_list').order_by('-created_at')[:5]
+        ).select_related('shopping_list', 'shopper').order_by('-created_at', '-id')[:5]
         
-        # Get open lists nearby (simplified - you'd use PostGIS for real distance)
-        nearby_lists = ShoppingList.objects.filter(
-            status='open',
-            bidding_deadline__gt=now
-        ).annotate(
-            total_count=Count('bids')
-        ).order_by('-created_at')[:10]
-        
-        data = {
-            'stats': {
-                'active_bids': active_bids,
-                'won_bids': won_bids,
-                'completed_bids': completed_bids,
-                'total_earnings': 0,  # Calculate from completed transactions
-                'average_rating': user.average_rating,
-                'completed_jobs': user.completed_jobs,
-            },
+        return {
+            'stats': stats,
             'recent_bids': BidSerializer(recent_bids, many=True).data,
-            'nearby_lists': ShoppingListForShopperSerializer(nearby_lists, many=True).data
         }
-        
-        return Response(data)
+    
+    def get_nearby_lists(self, user):
+        # Precomputed recommendations when cached, the plain feed otherwise
+        lists = recommended_lists(user, DASHBOARD_LISTS)
+        if lists is None:
+            lists = simple_feed(user, DASHBOARD_LISTS)
+        return lists
     
 @extend_schema_view(
     get=extend_schema(
         tags=['Bids'],
         summary="Get available lists",
-        description="Get all shopping lists available for bidding.",
+        description="Get all shopping lists available for bidding. For shoppers with a stored location and a bid distance, lists are limited to that distance and sorted closest first.",
         parameters=[
             OpenApiParameter(name='city', description='Filter by city', required=False, type=str),
-            OpenApiParameter(name='max_distance', description='Maximum distance in miles/km', required=False, type=float),
+            OpenApiParameter(name='max_distance', description=f"Maximum distance in km from the shopper's location (defaults to their max_bid_distance; at most {MAX_SEARCH_RADIUS_KM})", required=False, type=float),
+            *SPARSE_FIELDS_PARAMETERS,
         ],
         responses={200: ShoppingListForShopperSerializer(many=True)},
     )
 )
 
-class AvailableListsView(generics.ListAPIView):
+class AvailableListsView(CachedResponseMixin, SparseFieldsMixin, ValuesListMixin, generics.ListAPIView):
     """
     GET /api/bids/available-lists/
-    Get all shopping lists available for bidding
+    Get all shopping lists available for bidding.
+    Shoppers with a stored location only see lists within their bid
+    distance, closest first.
     """
     serializer_class = ShoppingListForShopperSerializer
+    values_plan = LIST_FOR_SHOPPER_PLAN
     permission_classes = [permissions.AllowAny]
+    query_budget = 4
+    pagination_class = DeadlineCursorPagination
+    cache_name = 'available-lists'
+    cache_timeout = 60
+    
+    def get_cache_namespaces(self):
+        return [FEED_NAMESPACE]
+    
+    def get_cache_variant(self):
+        # Results depend on the shopper's stored location and bid distance
+        user = self.request.user
+        if user.is_authenticated and user.latitude is not None and user.longitude is not None:
+            return f'{user.latitude},{user.longitude},{user.max_bid_distance}'
+        return ''
     
     def get_queryset(self):
-        now = timezone.now()
-        queryset = ShoppingList.objects.filter(
-            status='open',
-            bidding_deadline__gt=now
-        ).annotate(
-            total_count=Count('bids')
-        ).select_related('client').order_by('bidding_deadline')
+        queryset = ShoppingList.objects.open_for_bids().with_total_bid_count()
         
         # Filter by city if provided
         city = self.request.query_params.get('city')
         if city:
             queryset = queryset.filter(store_city__icontains=city)
         
-        # Filter by max distance (simplified)
-        max_distance = self.request.query_params.get('max_distance')
-        if max_distance:
-            # In production, you'd filter by actual distance using PostGIS
-            pass
+        # Filter and rank by distance from the shopper's stored location
+        user = self.request.user
+        if (user.is_authenticated and
+                user.latitude is not None and user.longitude is not None):
+            max_distance = self.request.query_params.get('max_distance')
+            if max_distance:
+                try:
+                    max_distance = float(max_distance)
+                except ValueError:
+                    raise ValidationError({'error': 'max_distance must be a number'})
+                if not max_distance > 0:
+                    raise ValidationError({'error': 'max_distance must be greater than 0'})
+            else:
+                # A stored distance of 0 means no proximity preference
+                max_distance = user.max_bid_distance if user.max_bid_distance > 0 else None
+            
+            if max_distance is not None:
+                # Page through the distance ranking instead of the deadline
+                self.cursor_ordering = ('distance', 'id')
+                return queryset.nearby(
+                    user.latitude, user.longitude, min(max_distance, MAX_SEARCH_RADIUS_KM)
+                )
         
-        return queryset
+        return queryset.order_by('bidding_deadline', 'id')
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=['Bids'],
+        summary="Lists for you",
+        description=(
+            "Open lists recommended to the shopper from their location, the stores, cities "
+            "and budgets they bid on and win, best first. Falls back to nearby (or newest) "
+            "lists while no recommendations are precomputed; `source` tells which."
+        ),
+        parameters=[
+            OpenApiParameter(name='limit', description=f'Number of lists (1-{TOP_K}, default {FEED_DEFAULT_LIMIT})', required=False, type=int),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+)
+
+class RecommendedListsView(generics.GenericAPIView):
+    """
+    GET /api/bids/for-you/
+    Get open lists recommended to the shopper
+    """
+    permission_classes = [permissions.IsAuthenticated, IsShopper]
+    query_budget = 3
+    
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', FEED_DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({'error': 'limit must be an integer'})
+        if not 1 <= limit <= TOP_K:
+            raise ValidationError({'error': f'limit must be between 1 and {TOP_K}'})
+        
+        lists = recommended_lists(request.user, limit)
+        source = 'personalized'
+        if lists is None:
+            lists = simple_feed(request.user, limit)
+            source = 'fallback'
+        return Response({
+            'source': source,
+            'results': RecommendedListSerializer(lists, many=True).data,
+        })
 
 @extend_schema_view(
     get=extend_schema(
         tags=['Bids'],
         summary="Get list details for shoppers",
         description="Get detailed information about a specific list for bidding.",
+        parameters=SPARSE_FIELDS_PARAMETERS,
         responses={200: ShoppingListForShopperSerializer},
     )
 )
 
-class ListDetailForShopperView(generics.RetrieveAPIView):
+class ListDetailForShopperView(SparseFieldsMixin, generics.RetrieveAPIView):
     """
     GET /api/bids/lists/{id}/
     Get detailed information about a specific list for bidding
     """
     serializer_class = ShoppingListForShopperSerializer
+    values_plan = LIST_FOR_SHOPPER_PLAN
     permission_classes = [permissions.IsAuthenticated, IsShopper]
+    query_budget = 2
     queryset = ShoppingList.objects.filter(status='open')
 
 @extend_schema_view(
     post=extend_schema(
         tags=['Bids'],
         summary="Place a bid",
-        description="Place a new bid on a shopping list.",
+        description="Place a new bid on a shopping list. Returns 409 if the shopper already has a bid on the list or the list is no longer open for bids.",
         request=CreateBidSerializer,
-        responses={201: BidSerializer},
+        responses={201: BidSerializer, 409: OpenApiTypes.OBJECT},
     )
 )
 
@@ -161,6 +259,72 @@ class PlaceBidView(generics.CreateAPIView):
     def perform_create(self, serializer):
         serializer.save()
 
+@extend_schema(
+    tags=['Bids'],
+    summary="Place bids in batch",
+    description=(
+        "Place up to 100 bids in one request, as a JSON array of bids. Each bid is "
+        "reported as `created` (with its id), `invalid`, `not_found`, `closed` or "
+        "`conflict` (already bid on that list). Returns 201 when every bid was placed "
+        "and 207 when some were rejected."
+    ),
+    request=BatchBidItemSerializer(many=True),
+    responses={201: OpenApiTypes.OBJECT, 207: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+)
+
+class PlaceBidsBatchView(APIView):
+    """
+    POST /api/bids/batch/
+    Place many bids at once
+    """
+    permission_classes = [permissions.IsAuthenticated, IsShopper]
+    
+    def post(self, request):
+        rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {'error': 'Expected a non-empty list of bids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > BATCH_BID_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {BATCH_BID_MAX_ITEMS} bids can be placed per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        report = []
+        valid = []
+        for index, row in enumerate(rows):
+            serializer = BatchBidItemSerializer(data=row if isinstance(row, dict) else {})
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+                report.append({'item': index})
+            else:
+                report.append({'item': index, 'status': 'invalid', 'errors': serializer.errors})
+        
+        placed = iter(Bid.objects.place_many(request.user, valid) if valid else [])
+        for entry in report:
+            if 'status' in entry:
+                continue
+            outcome, bid = next(placed)
+            entry['status'] = outcome
+            if bid is not None:
+                entry['id'] = bid.id
+        
+        created = sum(1 for entry in report if entry['status'] == 'created')
+        if not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif created < len(rows):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        
+        return Response({
+            'created': created,
+            'failed': len(rows) - created,
+            'results': report,
+        }, status=response_status)
+
 @extend_schema_view(
     get=extend_schema(
         tags=['Bids'],
@@ -168,28 +332,28 @@ class PlaceBidView(generics.CreateAPIView):
         description="Get all bids placed by the authenticated shopper.",
         parameters=[
             OpenApiParameter(name='status', description='Filter by status (active, won, lost, withdrawn)', required=False, type=str),
+            *SPARSE_FIELDS_PARAMETERS,
         ],
         responses={200: BidSerializer(many=True)},
     )
 )
 
-class MyBidsView(generics.ListAPIView):
+class MyBidsView(SparseFieldsMixin, ValuesListMixin, generics.ListAPIView):
     """
     GET /api/bids/my-bids/
     Get all bids placed by the authenticated shopper
     """
     serializer_class = BidSerializer
+    values_plan = BID_PLAN
     permission_classes = [permissions.IsAuthenticated, IsShopper]
+    query_budget = 2
+    pagination_class = NewestFirstCursorPagination
     
     def get_queryset(self):
         user = self.request.user
         status_filter = self.request.query_params.get('status')
         
-        queryset = Bid.objects.filter(
-            shopper=user
-        ).select_related(
-            'shopping_list', 'shopper'
-        ).order_by('-created_at')
+        queryset = Bid.objects.filter(shopper=user).order_by('-created_at', '-id')
         
         if status_filter:
             queryset = queryset.filter(status=status_filter)
@@ -202,17 +366,23 @@ class MyBidsView(generics.ListAPIView):
         tags=['Bids'],
         summary="Get bid details",
         description="Get detailed information about a specific bid.",
+        parameters=SPARSE_FIELDS_PARAMETERS,
         responses={200: BidSerializer},
     )
 )
 
-class ListBidsView(generics.ListAPIView):
+class ListBidsView(ConditionalGetMixin, SparseFieldsMixin, generics.ListAPIView):
     """
     GET /api/lists/{id}/bids/
     Get all bids for a specific shopping list
     """
     serializer_class = BidSerializer
+    values_plan = BID_PLAN
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 6
+    
+    def get_validator_queryset(self):
+        return ShoppingList.objects.filter(pk=self.kwargs['pk'])
     
     def get_queryset(self):
         list_id = self.kwargs['pk']
@@ -224,33 +394,35 @@ class ListBidsView(generics.ListAPIView):
             # Client can see all bids on their list
             return Bid.objects.filter(
                 shopping_list_id=list_id
-            ).select_related('shopper').order_by('-amount')
+            ).order_by('-amount')
         elif user.user_type in ['shopper', 'both']:
             # Shoppers can only see their own bids on this list
             return Bid.objects.filter(
                 shopping_list_id=list_id,
                 shopper=user
-            ).select_related('shopper')
+            )
         else:
             # No access for others
             return Bid.objects.none()
 
-class BidDetailView(generics.RetrieveAPIView):
+class BidDetailView(SparseFieldsMixin, generics.RetrieveAPIView):
     """
     GET /api/bids/{id}/
     Get detailed information about a specific bid
     """
     serializer_class = BidSerializer
+    values_plan = BID_PLAN
     permission_classes = [permissions.IsAuthenticated, IsShopper, IsBidOwner]
+    query_budget = 2
     queryset = Bid.objects.all()
 
 @extend_schema_view(
     patch=extend_schema(
         tags=['Bids'],
         summary="Update a bid",
-        description="Update an existing bid. Only active bids can be updated.",
+        description="Update an existing bid. Only active bids can be updated; a bid accepted, lost or withdrawn meanwhile returns 409.",
         request=UpdateBidSerializer,
-        responses={200: BidSerializer},
+        responses={200: BidSerializer, 409: OpenApiTypes.OBJECT},
     )
 )
 
@@ -264,25 +436,31 @@ class UpdateBidView(generics.UpdateAPIView):
     queryset = Bid.objects.all()
     
     def perform_update(self, serializer):
-        # Save old amount for history
-        old_amount = self.get_object().amount
-        
-        # Update the bid
-        serializer.save()
-        
-        # Create history entry
-        BidHistory.objects.create(
-            bid=self.get_object(),
-            old_amount=old_amount,
-            new_amount=serializer.validated_data.get('amount', old_amount),
-            changed_by=self.request.user
-        )
+        with transaction.atomic():
+            # Re-read under the list and bid locks: the bid may have been
+            # accepted, lost or withdrawn since it was loaded
+            serializer.instance = Bid.objects.lock_active(serializer.instance)
+            # Save old amount for history
+            old_amount = serializer.instance.amount
+            
+            # Update the bid
+            bid = serializer.save()
+            
+            # Create history entry
+            BidHistory.objects.create(
+                bid=bid,
+                old_amount=old_amount,
+                new_amount=serializer.validated_data.get('amount', old_amount),
+                changed_by=self.request.user
+            )
+            bid.shopping_list.refresh_bid_aggregates()
+            publish_bid_event(BID_UPDATED, bid)
 
 @extend_schema(
     tags=['Bids'],
     summary="Withdraw a bid",
-    description="Withdraw an active bid.",
-    responses={200: OpenApiTypes.OBJECT},
+    description="Withdraw an active bid. A bid accepted or lost meanwhile returns 409.",
+    responses={200: OpenApiTypes.OBJECT, 409: OpenApiTypes.OBJECT},
 )
 
 class WithdrawBidView(APIView):
@@ -302,9 +480,14 @@ class WithdrawBidView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        bid.status = 'withdrawn'
-        bid.is_active = False
-        bid.save()
+        with transaction.atomic():
+            # Under the locks: a concurrent accept must not be undone
+            bid = Bid.objects.lock_active(bid)
+            bid.status = 'withdrawn'
+            bid.is_active = False
+            bid.save()
+            bid.shopping_list.refresh_bid_aggregates()
+            publish_bid_event(BID_WITHDRAWN, bid)
         
         return Response({'message': 'Bid withdrawn successfully'})
     
@@ -317,13 +500,14 @@ class WithdrawBidView(APIView):
     )
 )
 
-class BidHistoryView(generics.ListAPIView):
+class BidHistoryView(OptimizedQuerysetMixin, generics.ListAPIView):
     """
     GET /api/bids/{id}/history/
     Get history of changes to a bid
     """
     serializer_class = BidHistorySerializer
     permission_classes = [permissions.IsAuthenticated, IsShopper, IsBidOwner]
+    query_budget = 3
     
     def get_queryset(self):
         return BidHistory.objects.filter(bid_id=self.kwargs['pk']).order_by('-changed_at')
@@ -333,20 +517,24 @@ class BidHistoryView(generics.ListAPIView):
         tags=['Bids'],
         summary="Get won bids",
         description="Get all bids that the shopper has won.",
+        parameters=SPARSE_FIELDS_PARAMETERS,
         responses={200: BidSerializer(many=True)},
     )
 )
 
-class MyWonBidsView(generics.ListAPIView):
+class MyWonBidsView(SparseFieldsMixin, generics.ListAPIView):
     """
     GET /api/bids/won/
     Get all bids that the shopper has won
     """
     serializer_class = BidSerializer
+    values_plan = BID_PLAN
     permission_classes = [permissions.IsAuthenticated, IsShopper]
+    query_budget = 2
+    pagination_class = RecentlyUpdatedCursorPagination
     
     def get_queryset(self):
         return Bid.objects.filter(
             shopper=self.request.user,
             status='won'
-        ).select_related('shopping_list').order_by('-updated_at')
\ No newline at end of file
+        ).order_by('-updated_at', '-id')
\ No newline at end of file
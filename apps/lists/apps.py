@@ -1,6 +1,46 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+
+def restore_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .models import ShoppingList
+    from .search import ensure_search_index
+
+    connection = connections[using]
+    table = ShoppingList._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return
+        columns = {
+            column.name for column in connection.introspection.get_table_description(cursor, table)
+        }
+    # Skip when migrated back past the migration that adds search_text
+    if 'search_text' in columns:
+        ensure_search_index(connection, table)
+
+
+def refresh_search_text(sender, instance, using, **kwargs):
+    """Structured item names are part of their list's search_text"""
+    from .models import ShoppingList
+
+    shopping_list = ShoppingList.objects.using(using).filter(pk=instance.shopping_list_id).first()
+    if shopping_list is not None:
+        shopping_list.save(update_fields=['search_text'])
 
 
 class ListsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.lists'
+    
+    def ready(self):
+        from .cache import invalidate_on_list_change, invalidate_on_related_change
+
+        post_migrate.connect(restore_search_index, sender=self)
+        
+        # Keep cached public responses in step with list and bid writes
+        for signal in (post_save, post_delete):
+            signal.connect(invalidate_on_list_change, sender='lists.ShoppingList')
+            signal.connect(invalidate_on_related_change, sender='lists.ShoppingListItem')
+            signal.connect(invalidate_on_related_change, sender='bids.Bid')
+            signal.connect(refresh_search_text, sender='lists.ShoppingListItem')
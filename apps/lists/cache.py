@@ -0,0 +1,34 @@
+"""
+Cache namespaces for the public shopping-list endpoints and their invalidation.
+
+Feeds (open lists, available lists) share one namespace; each list detail
+has its own. Any write to a list, its items or its bids retires the feed
+namespace and that list's namespace once the transaction commits.
+"""
+from django.db import transaction
+
+from shopper.cache import bump_versions
+
+FEED_NAMESPACE = 'lists:feed'
+
+
+def list_namespace(pk):
+    return f'lists:detail:{pk}'
+
+
+def invalidate_lists(ids=(), using=None):
+    """
+    Retire cached feeds and the detail of each list in `ids` after the
+    current transaction commits (immediately outside a transaction).
+    """
+    namespaces = [FEED_NAMESPACE, *(list_namespace(pk) for pk in ids)]
+    transaction.on_commit(lambda: bump_versions(namespaces), using=using)
+
+
+def invalidate_on_list_change(sender, instance, using, **kwargs):
+    invalidate_lists([instance.pk], using=using)
+
+
+def invalidate_on_related_change(sender, instance, using, **kwargs):
+    """For models pointing at a list (items, bids)"""
+    invalidate_lists([instance.shopping_list_id], using=using)
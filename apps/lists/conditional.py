@@ -0,0 +1,97 @@
+"""
+Conditional GETs (ETag / Last-Modified) for views whose responses are
+derived from shopping lists and their bids.
+
+The validators come from one aggregate query over the lists a response
+depends on: their updated_at, the denormalized last_bid_at (bumped on every
+bid write) and the row count. A request whose If-None-Match or
+If-Modified-Since still matches gets 304 before the view's own queryset is
+evaluated or anything is serialized.
+"""
+import hashlib
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import ShoppingList
+
+
+def list_validators(queryset):
+    """
+    (last_modified, version, count) for the lists in `queryset`, where
+    `version` changes whenever any of them or their bids change.
+    """
+    state = queryset.order_by().aggregate(
+        updated=Max('updated_at'), last_bid=Max('last_bid_at'), count=Count('id'),
+    )
+    timestamps = [value for value in (state['updated'], state['last_bid']) if value is not None]
+    last_modified = max(timestamps) if timestamps else None
+    version = (
+        state['updated'] and state['updated'].isoformat(),
+        state['last_bid'] and state['last_bid'].isoformat(),
+        state['count'],
+    )
+    return last_modified, version, state['count']
+
+
+class ConditionalGetMixin:
+    """
+    Add strong ETag and Last-Modified validators to a DRF GET view.
+
+    `get_validator_queryset()` returns the ShoppingList rows the response is
+    built from (or None to skip validation). It defaults to the view's own
+    queryset, narrowed to the looked-up row on detail views; views serving
+    other models override it. Detail views skip validation when no row
+    matches, so 404s keep coming from the view itself; collections set
+    `validate_empty = True`.
+    """
+    validate_empty = False
+
+    def get_validator_queryset(self):
+        queryset = self.get_queryset()
+        if queryset.model is not ShoppingList:
+            raise ImproperlyConfigured(
+                f'{self.__class__.__name__} serves {queryset.model.__name__} rows; '
+                'override get_validator_queryset() to return the ShoppingList rows '
+                'its responses are built from.'
+            )
+        lookup_url_kwarg = getattr(self, 'lookup_url_kwarg', None) or getattr(self, 'lookup_field', None)
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_etag(self, request, version):
+        # The same URL renders differently per viewer and media type
+        parts = [
+            request.get_full_path(),
+            request.accepted_media_type,
+            request.user.pk,
+            *version,
+        ]
+        return quote_etag(hashlib.md5('|'.join(map(str, parts)).encode('utf-8')).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_validator_queryset()
+        if queryset is None:
+            return super().get(request, *args, **kwargs)
+
+        last_modified, version, count = list_validators(queryset)
+        if not count and not self.validate_empty:
+            return super().get(request, *args, **kwargs)
+
+        etag = self.get_etag(request, version)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # Clients must revalidate rather than reuse a cached copy blindly
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,171 @@
+"""
+Geospatial helpers for distance searches without PostGIS.
+
+Lists store a geohash of their delivery point. A radius search first narrows
+candidates to the handful of geohash cells covering the search area (an
+indexed range scan), then to a lat/lng bounding box, and only then runs the
+exact haversine check in SQL.
+"""
+import math
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+# Same sphere as haversine_km, so the prefilter box never cuts into the circle
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+GEOHASH_PRECISION = 12
+# Largest radius a distance search may ask for
+MAX_SEARCH_RADIUS_KM = 200
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Approximate (height, width) in km of a geohash cell at the equator, by precision
+_CELL_SIZE_KM = {
+    1: (5000.0, 5000.0),
+    2: (625.0, 1250.0),
+    3: (156.0, 156.0),
+    4: (19.5, 39.1),
+    5: (4.89, 4.89),
+    6: (0.61, 1.22),
+    7: (0.153, 0.153),
+    8: (0.019, 0.038),
+}
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a lat/lng pair as a geohash string of the given precision"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude = float(latitude)
+    longitude = float(longitude)
+
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, min_lng, max_lng) enclosing the search circle"""
+    latitude = float(latitude)
+    longitude = float(longitude)
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    # Widest longitude the circle reaches (it bulges poleward of the
+    # centre's parallel, so radius / cos(lat) alone falls short)
+    sin_radius = math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi / 2))
+    cos_lat = math.cos(math.radians(latitude))
+    if sin_radius >= cos_lat:
+        lng_delta = 180.0
+    else:
+        lng_delta = math.degrees(math.asin(sin_radius / cos_lat))
+    return (
+        max(-90.0, latitude - lat_delta),
+        min(90.0, latitude + lat_delta),
+        max(-180.0, longitude - lng_delta),
+        min(180.0, longitude + lng_delta),
+    )
+
+
+def _precision_for_radius(radius_km, latitude):
+    """Finest precision whose cells are at least as large as the search radius"""
+    cos_lat = max(math.cos(math.radians(float(latitude))), 0.01)
+    for precision in sorted(_CELL_SIZE_KM, reverse=True):
+        height, width = _CELL_SIZE_KM[precision]
+        if height >= radius_km and width * cos_lat >= radius_km:
+            return precision
+    return 1
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """
+    Return the geohash prefixes covering the bounding box of the search circle.
+
+    Cells are chosen at least as large as the radius, so a box is covered by
+    at most a 3x3 block of cells.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    precision = _precision_for_radius(radius_km, latitude)
+    if precision <= 1 and (max_lng - min_lng) >= 90:
+        return []  # The search area is effectively the whole map
+
+    height_km, width_km = _CELL_SIZE_KM[precision]
+    lat_step = height_km / KM_PER_DEGREE_LAT / 2
+    lng_step = width_km / KM_PER_DEGREE_LAT / 2
+
+    cells = set()
+    lat = min_lat
+    while True:
+        lng = min_lng
+        while True:
+            cells.add(encode_geohash(lat, lng, precision))
+            if lng >= max_lng:
+                break
+            lng = min(lng + lng_step, max_lng)
+        if lat >= max_lat:
+            break
+        lat = min(lat + lat_step, max_lat)
+    return sorted(cells)
+
+
+def covering_ranges(latitude, longitude, radius_km):
+    """
+    Return (low, high) geohash ranges covering the search area.
+
+    Cells adjacent in geohash order are merged so the database sees as few
+    range scans as possible.
+    """
+    ranges = []
+    for cell in covering_cells(latitude, longitude, radius_km):
+        if ranges:
+            low, last = ranges[-1]
+            if (last[:-1] == cell[:-1] and
+                    _BASE32.index(cell[-1]) == _BASE32.index(last[-1]) + 1):
+                ranges[-1] = (low, cell)
+                continue
+        ranges.append((cell, cell))
+    # '~' sorts after every base32 character, closing each prefix range
+    return [(low, high + '~') for low, high in ranges]
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km between two points"""
+    lat1, lng1, lat2, lng2 = map(math.radians, map(float, (lat1, lng1, lat2, lng2)))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_expression(latitude, longitude, lat_field, lng_field):
+    """
+    Database expression for the haversine distance in km from a fixed point.
+
+    Uses only functions Django supports on both MySQL and SQLite.
+    """
+    lat = math.radians(float(latitude))
+    lng = math.radians(float(longitude))
+    field_lat = Radians(F(lat_field), output_field=FloatField())
+    field_lng = Radians(F(lng_field), output_field=FloatField())
+
+    a = (
+        Power(Sin((field_lat - Value(lat)) / 2), 2) +
+        Value(math.cos(lat)) * Cos(field_lat) *
+        Power(Sin((field_lng - Value(lng)) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
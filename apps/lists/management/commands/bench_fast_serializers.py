@@ -0,0 +1,143 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.bids.models import Bid
+from apps.bids.serializers import (
+    BID_PLAN, LIST_FOR_SHOPPER_PLAN, BidSerializer, ShoppingListForShopperSerializer
+)
+from apps.lists.cache import FEED_NAMESPACE
+from apps.lists.management.seed import Rollback, make_user, random_point, seed_lists, untracked
+from apps.lists.models import ShoppingList, ShoppingListItem
+from apps.lists.serializers import SHOPPING_LIST_PLAN, ShoppingListSerializer
+from shopper.cache import bump_versions
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the .values() read paths of the open-lists, available-lists "
+        "and my-bids endpoints return byte-identical JSON to their serializers, "
+        "then time both at --rows rows. Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(), untracked():
+                failures = self.run(options['rows'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+        if failures:
+            raise CommandError(f'{failures} responses differ between the serializer and values paths.')
+
+    def run(self, rows, repeat):
+        rng = random.Random(5)
+        client = make_user('bench-fast-client@example.com', 'client', first_name='Ada', last_name='Client')
+        client.avatar = 'avatars/ada.png'
+        client.save(update_fields=['avatar'])
+        latitude, longitude = random_point(rng)
+        shopper = make_user(
+            'bench-fast-shopper@example.com', 'shopper',
+            latitude=latitude, longitude=longitude, max_bid_distance=50,
+        )
+
+        seed_lists(client, rows, seed=5)
+        lists = list(ShoppingList.objects.filter(client=client).order_by('id'))
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(shopping_list=shopping_list, name=f'item {index}', quantity=index + 1,
+                             estimated_price=Decimal('1.25') * (index + 1))
+            for shopping_list in lists
+            for index in range(rng.randint(0, 3))
+        ])
+        Bid.objects.bulk_create([
+            Bid(shopper=shopper, shopping_list=shopping_list,
+                amount=Decimal(rng.randint(500, 5000)) / 100, estimated_time=30,
+                distance_to_store=Decimal('1.00'), message='On my way')
+            for shopping_list in lists
+        ], batch_size=1000)
+        ShoppingList.objects.filter(client=client).refresh_bid_aggregates()
+
+        failures = self.check_parity(shopper)
+        self.benchmark(shopper, repeat)
+        return failures
+
+    def check_parity(self, shopper):
+        anonymous = APIClient(HTTP_HOST='localhost')
+        authenticated = APIClient(HTTP_HOST='localhost')
+        authenticated.force_authenticate(shopper)
+        requests = [
+            (anonymous, '/api/lists/open/?page_size=100'),
+            (anonymous, '/api/bids/available-lists/?page_size=100'),
+            (authenticated, '/api/bids/available-lists/?page_size=100'),
+            (authenticated, '/api/bids/my-bids/?page_size=100'),
+            (authenticated, '/api/bids/my-bids/?page_size=100&status=active'),
+        ]
+
+        failures = 0
+        for api, url in requests:
+            # Follow one cursor too, so the next links are compared as well
+            for page in range(2):
+                bodies = []
+                for fast in (False, True):
+                    bump_versions([FEED_NAMESPACE])
+                    with override_settings(FAST_READ_PATHS=fast):
+                        response = api.get(url)
+                    assert response.status_code == 200, response.content
+                    bodies.append(response.content)
+                same = bodies[0] == bodies[1]
+                failures += not same
+                label = 'same' if same else self.style.ERROR('DIFFERENT')
+                self.stdout.write(f'{label:<9} {url}')
+                url = response.json().get('next')
+                if not url:
+                    break
+        return failures
+
+    def benchmark(self, shopper, repeat):
+        request = Request(APIRequestFactory().get('/', HTTP_HOST='localhost'))
+        context = {'request': request}
+        renderer = JSONRenderer()
+        open_lists = ShoppingList.objects.open_for_bids().order_by('-created_at', '-id')
+        cases = [
+            ('open lists', ShoppingListSerializer, SHOPPING_LIST_PLAN,
+             open_lists.select_related('client').prefetch_related('items_structured')),
+            ('available lists', ShoppingListForShopperSerializer, LIST_FOR_SHOPPER_PLAN,
+             open_lists.with_total_bid_count().select_related('client')),
+            ('my bids', BidSerializer, BID_PLAN,
+             Bid.objects.filter(shopper=shopper).select_related('shopping_list', 'shopper')
+             .order_by('-created_at', '-id')),
+        ]
+
+        self.stdout.write(f"\n{'endpoint':<16} {'rows':>6} {'serializer ms':>14} {'values ms':>10} {'speedup':>8}")
+        for label, serializer_class, plan, queryset in cases:
+            def serialize():
+                return renderer.render(serializer_class(queryset.all(), many=True, context=context).data)
+
+            def values():
+                return renderer.render(plan.render(plan.values(queryset.all()), context))
+
+            assert serialize() == values(), f'{label}: outputs differ'
+            timings = {}
+            for name, function in (('serializer', serialize), ('values', values)):
+                runs = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    function()
+                    runs.append((time.perf_counter() - start) * 1000)
+                timings[name] = statistics.median(runs)
+            self.stdout.write(
+                f"{label:<16} {queryset.count():>6} {timings['serializer']:>14.1f} "
+                f"{timings['values']:>10.1f} {timings['serializer'] / timings['values']:>7.1f}x"
+            )
@@ -0,0 +1,63 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.lists.management.seed import (
+    Rollback, analyze_lists_table, make_user, random_point, require_throwaway_database, seed_lists
+)
+from apps.lists.models import ShoppingList
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the nearby-lists radius search at increasing table sizes. "
+        "All seeded rows are rolled back when the benchmark finishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma separated numbers of open lists to benchmark')
+        parser.add_argument('--radius', type=float, default=10.0, help='Search radius in km')
+        parser.add_argument('--queries', type=int, default=50, help='Queries per size')
+
+    def handle(self, *args, **options):
+        require_throwaway_database()
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        try:
+            with transaction.atomic():
+                self.run(sizes, options['radius'], options['queries'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, radius, query_count):
+        client = make_user('bench-nearby@example.com', 'client')
+        rng = random.Random(42)
+        seeded = 0
+
+        self.stdout.write(f"{'lists':>10} {'median ms':>10} {'p95 ms':>10} {'avg hits':>9}")
+        for size in sizes:
+            seed_lists(client, size - seeded, seed=size)
+            seeded = size
+            analyze_lists_table()
+
+            timings = []
+            hits = 0
+            for _ in range(query_count):
+                lat, lng = random_point(rng)
+                start = time.perf_counter()
+                results = list(
+                    ShoppingList.objects.open_for_bids().nearby(lat, lng, radius)[:20]
+                )
+                timings.append((time.perf_counter() - start) * 1000)
+                hits += len(results)
+
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f'{size:>10} {statistics.median(timings):>10.2f} {p95:>10.2f} '
+                f'{hits / query_count:>9.1f}'
+            )
@@ -0,0 +1,82 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.lists.management.seed import (
+    Rollback, analyze_lists_table, make_user, require_throwaway_database, seed_lists
+)
+from apps.lists.models import ShoppingList
+from shopper.pagination import NewestFirstCursorPagination
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare page-number and keyset pagination on the open lists feed at "
+        "page 1 and a deep page. Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=5000, help='Deep page number to fetch')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        require_throwaway_database()
+        try:
+            with transaction.atomic():
+                self.run(options['page'], options['page_size'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, deep_page, page_size, repeat):
+        client = make_user('bench-pagination@example.com', 'client')
+        total = deep_page * page_size + page_size
+        self.stdout.write(f'Seeding {total} open lists...')
+        seed_lists(client, total)
+        analyze_lists_table()
+
+        factory = APIRequestFactory(HTTP_HOST='localhost')
+        queryset = ShoppingList.objects.open_for_bids().order_by('-created_at', '-id')
+
+        def page_number(page):
+            paginator = PageNumberPagination()
+            paginator.page_size = page_size
+            request = Request(factory.get('/', {'page': page}))
+            return lambda: paginator.paginate_queryset(queryset, request)
+
+        def keyset(cursor):
+            def fetch():
+                paginator = NewestFirstCursorPagination()
+                paginator.page_size = page_size
+                params = {'cursor': cursor} if cursor else {}
+                return paginator.paginate_queryset(queryset, Request(factory.get('/', params)))
+            return fetch
+
+        # The cursor a client would hold after walking to the deep page
+        boundary = queryset[(deep_page - 1) * page_size - 1]
+        paginator = NewestFirstCursorPagination()
+        paginator.paginate_queryset(queryset, Request(factory.get('/')))
+        deep_link = paginator.encode_cursor(paginator._position(boundary), reverse=False)
+        deep_cursor = deep_link.split('cursor=')[1]
+
+        cases = [
+            ('page number, page 1', page_number(1)),
+            (f'page number, page {deep_page}', page_number(deep_page)),
+            ('keyset, page 1', keyset(None)),
+            (f'keyset, page {deep_page}', keyset(deep_cursor)),
+        ]
+        self.stdout.write(f"{'case':<28} {'median ms':>10}")
+        for label, fetch in cases:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = fetch()
+                timings.append((time.perf_counter() - start) * 1000)
+            assert len(rows) == page_size
+            self.stdout.write(f'{label:<28} {statistics.median(timings):>10.2f}')
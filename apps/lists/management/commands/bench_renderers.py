@@ -0,0 +1,121 @@
+import io
+import json
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.bids.models import Bid
+from apps.bids.serializers import BID_PLAN
+from apps.lists.management.seed import Rollback, make_user, seed_lists
+from apps.lists.models import ShoppingList
+from apps.lists.serializers import SHOPPING_LIST_PLAN
+from shopper.parsers import MessagePackParser, ORJSONParser
+from shopper.renderers import MessagePackRenderer, ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that ORJSONRenderer writes the same bytes as DRF's JSONRenderer "
+        "and that MessagePack round-trips to the same data, then time encoding "
+        "and decoding of list and bid pages. Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page payload')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per codec')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                payloads = self.build_payloads(options['rows'])
+                raise Rollback
+        except Rollback:
+            pass
+        failures = self.compare(payloads)
+        self.benchmark(payloads, options['repeat'])
+        if failures:
+            raise CommandError(f'{failures} payloads encode differently.')
+
+    def build_payloads(self, rows):
+        rng = random.Random(9)
+        client = make_user('bench-render-client@example.com', 'client', first_name='Zoë', last_name='Ünal')
+        shopper = make_user('bench-render-shopper@example.com', 'shopper')
+        seed_lists(client, rows, seed=9)
+        lists = list(ShoppingList.objects.filter(client=client))
+        Bid.objects.bulk_create([
+            Bid(shopper=shopper, shopping_list=shopping_list,
+                amount=Decimal(rng.randint(500, 5000)) / 100, estimated_time=30,
+                distance_to_store=Decimal('1.25'), message='Can do it today\u2028promise')
+            for shopping_list in lists
+        ])
+
+        context = {'request': Request(APIRequestFactory().get('/', HTTP_HOST='localhost'))}
+        open_lists = ShoppingList.objects.filter(client=client).order_by('-created_at', '-id')
+        bids = Bid.objects.filter(shopper=shopper).order_by('-created_at', '-id')
+        now = timezone.now()
+        return {
+            'list page': {
+                'next': None, 'previous': None,
+                'results': SHOPPING_LIST_PLAN.render(SHOPPING_LIST_PLAN.values(open_lists), context),
+            },
+            'bid page': {
+                'next': None, 'previous': None,
+                'results': BID_PLAN.render(BID_PLAN.values(bids), context),
+            },
+            # Built by hand, so Decimals and datetimes reach the encoder raw
+            'raw values': [
+                {
+                    'amount': bid.amount, 'distance_to_store': bid.distance_to_store,
+                    'created_at': bid.created_at, 'deadline': now, 'day': now.date(),
+                    'score': bid.score, 'id': bid.id,
+                }
+                for bid in bids
+            ],
+        }
+
+    def compare(self, payloads):
+        failures = 0
+        json_renderer, orjson_renderer = JSONRenderer(), ORJSONRenderer()
+        for label, data in payloads.items():
+            expected = json_renderer.render(data)
+            same = orjson_renderer.render(data) == expected
+            decoded = MessagePackParser().parse(io.BytesIO(MessagePackRenderer().render(data)))
+            round_trip = decoded == json.loads(expected)
+            failures += not (same and round_trip)
+            self.stdout.write(
+                f"{label:<12} orjson bytes {'same' if same else self.style.ERROR('DIFFERENT')}, "
+                f"msgpack round trip {'same' if round_trip else self.style.ERROR('DIFFERENT')}"
+            )
+        return failures
+
+    def benchmark(self, payloads, repeat):
+        codecs = (
+            ('json', JSONRenderer(), JSONParser()),
+            ('orjson', ORJSONRenderer(), ORJSONParser()),
+            ('msgpack', MessagePackRenderer(), MessagePackParser()),
+        )
+
+        def median_ms(function):
+            runs = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function()
+                runs.append((time.perf_counter() - start) * 1000)
+            return statistics.median(runs)
+
+        self.stdout.write(f"\n{'payload':<12} {'codec':<8} {'bytes':>8} {'encode ms':>10} {'decode ms':>10}")
+        for label, data in payloads.items():
+            for name, renderer, parser in codecs:
+                body = renderer.render(data)
+                encode = median_ms(lambda: renderer.render(data))
+                decode = median_ms(lambda: parser.parse(io.BytesIO(body)))
+                self.stdout.write(f'{label:<12} {name:<8} {len(body):>8} {encode:>10.3f} {decode:>10.3f}')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from shopper.cache import get_stats, reset_stats
+
+CACHED_ENDPOINTS = ('open-lists', 'public-list-detail', 'available-lists')
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the cached public list endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'endpoint':<20} {'hits':>10} {'misses':>10} {'hit ratio':>10}")
+        for name in CACHED_ENDPOINTS:
+            stats = get_stats(name)
+            ratio = '-' if stats['hit_ratio'] is None else f"{stats['hit_ratio']:.1%}"
+            self.stdout.write(f"{name:<20} {stats['hits']:>10} {stats['misses']:>10} {ratio:>10}")
+            if options['reset']:
+                reset_stats(name)
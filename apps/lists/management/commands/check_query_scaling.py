@@ -0,0 +1,182 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from rest_framework.test import APIClient
+
+from apps.bids.cache import dashboard_namespace
+from apps.bids.models import Bid, BidHistory
+from apps.lists.cache import FEED_NAMESPACE, list_namespace
+from apps.lists.management.seed import Rollback, make_user, random_point, seed_lists, untracked
+from apps.lists.models import ShoppingList, ShoppingListItem
+from apps.transactions.models import LedgerEntry
+from apps.users.revocation import revoked
+from apps.users.serializers import CustomTokenObtainPairSerializer
+from shopper.cache import bump_versions
+from shopper.querybudget import QueryBudgetExceeded, read_views, view_budget
+
+# (label, caller, url); urls are formatted with the seeded ids. Every GET
+# view under /api/ in shopper/urls.py must be requested by at least one.
+ENDPOINTS = [
+    ('open lists', 'anonymous', '/api/lists/open/'),
+    ('nearby lists', 'anonymous', '/api/lists/nearby/?lat={lat}&lng={lng}&radius=200'),
+    ('search lists', 'anonymous', '/api/lists/search/?q={store}'),
+    ('public list detail', 'anonymous', '/api/lists/public/{list}/'),
+    ('my lists', 'client', '/api/lists/my-lists/'),
+    ('my list detail', 'client', '/api/lists/{list}/'),
+    ('bids on my list', 'client', '/api/lists/{list}/bids/'),
+    ('bids on my list (top)', 'client', '/api/lists/{list}/bids/?top=50&sort=score'),
+    ('list bids', 'client', '/api/bids/lists/{list}/bids/'),
+    ('available lists', 'anonymous', '/api/bids/available-lists/'),
+    ('available lists (located)', 'shopper', '/api/bids/available-lists/'),
+    ('lists for you', 'shopper', '/api/bids/for-you/'),
+    ('dashboard', 'shopper', '/api/bids/dashboard/'),
+    ('list detail for shopper', 'shopper', '/api/bids/lists/{list}/'),
+    ('my bids', 'shopper', '/api/bids/my-bids/'),
+    ('won bids', 'shopper', '/api/bids/won/'),
+    ('bid detail', 'shopper', '/api/bids/{bid}/'),
+    ('bid history', 'shopper', '/api/bids/{bid}/history/'),
+    ('ledger', 'shopper', '/api/transactions/ledger/'),
+    ('balance', 'shopper', '/api/transactions/balance/'),
+    ('profile', 'shopper', '/api/users/profile/'),
+]
+
+
+def uncovered_views():
+    """Read views that no entry in ENDPOINTS requests"""
+    return read_views() - {resolve(url.split('?')[0].format(list=1, bid=1)).func.view_class
+                           for _, _, url in ENDPOINTS}
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every read endpoint with --small and then --large rows behind "
+        "it (lists, items per list, bids per list, bids, history and ledger "
+        "entries) and fail if any endpoint's query count grows with the data "
+        "or exceeds its view's query_budget. Runs with FAST_READ_PATHS on and "
+        "off. Seeded rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--small', type=int, default=3)
+        parser.add_argument('--large', type=int, default=12, help='Keep within one page (20 rows)')
+
+    def handle(self, *args, **options):
+        missing = uncovered_views()
+        if missing:
+            raise CommandError(f"Not covered: {', '.join(sorted(view.__name__ for view in missing))}")
+
+        self.stdout.write(f"{'endpoint':<44} {'small':>6} {'large':>6} {'budget':>6}")
+        failures = 0
+        for label, fast, count, large_count, budget, problem in self.compare(options['small'], options['large']):
+            failures += bool(problem)
+            label = f'{label} (fast paths {"on" if fast else "off"})'
+            flag = self.style.ERROR(f'  {problem}') if problem else ''
+            self.stdout.write(f"{label:<44} {count:>6} {large_count:>6} {budget or '-':>6}{flag}")
+        if failures:
+            raise CommandError(f'{failures} endpoints grow with the data or break their query budget.')
+
+    def compare(self, small, large):
+        """
+        (label, fast, small count, large count, budget, problem) for every
+        endpoint with fast paths on and off; `problem` is empty when the
+        endpoint neither grows with the data nor breaks its budget.
+        """
+        counts = {}
+        for size in (small, large):
+            try:
+                with transaction.atomic(), untracked():
+                    counts[size] = self.measure(size)
+                    raise Rollback
+            except Rollback:
+                pass
+
+        rows = []
+        for (label, fast), (count, budget, error) in counts[small].items():
+            large_count, _, large_error = counts[large][label, fast]
+            problem = error or large_error or ('grows' if large_count > count else '')
+            rows.append((label, fast, count, large_count, budget, problem))
+        return rows
+
+    def seed(self, size):
+        rng = random.Random(21)
+        client = make_user('scaling-client@example.com', 'client', first_name='Ada', last_name='Client')
+        latitude, longitude = random_point(rng)
+        shopper = make_user(
+            'scaling-shopper@example.com', 'shopper',
+            latitude=latitude, longitude=longitude, max_bid_distance=5000,
+        )
+        others = [make_user(f'scaling-shopper-{index}@example.com', 'shopper') for index in range(size)]
+
+        seed_lists(client, size, seed=21)
+        lists = list(ShoppingList.objects.filter(client=client).order_by('id'))
+        target = lists[0]
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(shopping_list=shopping_list, name=f'item {index}', quantity=1)
+            for shopping_list in lists
+            for index in range(size)
+        ])
+        Bid.objects.bulk_create(
+            [
+                Bid(shopper=shopper, shopping_list=shopping_list, amount=Decimal('10.00') + index,
+                    estimated_time=30, distance_to_store=Decimal('1.00'),
+                    status='won' if index % 2 else 'active')
+                for index, shopping_list in enumerate(lists)
+            ] + [
+                Bid(shopper=other, shopping_list=target, amount=Decimal('20.00') + index,
+                    estimated_time=30, distance_to_store=Decimal('1.00'))
+                for index, other in enumerate(others)
+            ]
+        )
+        bid = Bid.objects.get(shopper=shopper, shopping_list=target)
+        BidHistory.objects.bulk_create([
+            BidHistory(bid=bid, old_amount=Decimal('12.00'), new_amount=Decimal('10.00'), changed_by=shopper)
+            for _ in range(size)
+        ])
+        LedgerEntry.objects.bulk_create([
+            LedgerEntry(shopper=shopper, kind='earning', amount=Decimal('5.00'), gmv=Decimal('10.00'),
+                        balance=Decimal('5.00') * (index + 1), total_earned=Decimal('5.00') * (index + 1),
+                        total_paid_out=Decimal('0.00'), total_gmv=Decimal('10.00') * (index + 1))
+            for index in range(size)
+        ])
+        ShoppingList.objects.filter(client=client).refresh_bid_aggregates()
+
+        callers = {'anonymous': APIClient(HTTP_HOST='localhost')}
+        for name, user in (('client', client), ('shopper', shopper)):
+            # A token as issued at login, so authentication's own queries are counted too
+            token = CustomTokenObtainPairSerializer.get_token(user).access_token
+            callers[name] = APIClient(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {token}')
+        ids = {
+            'list': target.pk, 'bid': bid.pk, 'store': target.store_name.split()[0],
+            'lat': target.delivery_latitude, 'lng': target.delivery_longitude,
+        }
+        namespaces = [FEED_NAMESPACE, list_namespace(target.pk), dashboard_namespace(shopper.pk)]
+        # Loaded once per process, not per request
+        revoked.sync()
+        return callers, ids, namespaces
+
+    def measure(self, size):
+        callers, ids, namespaces = self.seed(size)
+        counts = {}
+        for fast in (True, False):
+            for label, caller, url in ENDPOINTS:
+                url = url.format(**ids)
+                # Measure the uncached response
+                bump_versions(namespaces)
+                error = ''
+                with override_settings(FAST_READ_PATHS=fast, QUERY_BUDGET_RAISE=True), \
+                        CaptureQueriesContext(connection) as queries:
+                    try:
+                        response = callers[caller].get(url)
+                    except QueryBudgetExceeded as exc:
+                        error = str(exc)
+                    else:
+                        if response.status_code != 200:
+                            raise CommandError(f'{label}: {response.status_code} {response.content[:200]!r}')
+                budget = view_budget(resolve(url.split('?')[0]).func.view_class)
+                counts[label, fast] = (len(queries), budget, error)
+        return counts
+
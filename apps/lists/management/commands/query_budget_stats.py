@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from shopper.querybudget import get_overruns, read_views, reset_overruns, view_budget
+
+
+class Command(BaseCommand):
+    help = "Show how many requests to each API view broke its query budget or ran an N+1."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing')
+
+    def handle(self, *args, **options):
+        budgets = {view.__name__: view_budget(view) for view in read_views()}
+        names = sorted(budgets)
+        overruns = get_overruns(names)
+        self.stdout.write(f"{'view':<32} {'budget':>8} {'overruns':>10}")
+        for name in names:
+            self.stdout.write(f"{name:<32} {budgets[name] or '-':>8} {overruns[name]:>10}")
+        if options['reset']:
+            reset_overruns(names)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from apps.lists.cache import invalidate_lists
+from apps.lists.models import ShoppingList
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the denormalized bid columns (active_bid_count, "
+        "lowest_active_bid_amount, last_bid_at) on shopping lists from the bid rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of list ids updated per statement')
+        parser.add_argument('--status', action='append', dest='statuses',
+                            help='Only rebuild lists in this status (repeatable)')
+
+    def handle(self, *args, **options):
+        queryset = ShoppingList.objects.order_by()
+        if options['statuses']:
+            queryset = queryset.filter(status__in=options['statuses'])
+
+        bounds = queryset.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            self.stdout.write('No shopping lists to reconcile.')
+            return
+
+        batch_size = options['batch_size']
+        updated = 0
+        # Walk the id range in slices so each UPDATE holds its locks briefly
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            with transaction.atomic():
+                batch = queryset.filter(id__gte=start, id__lt=start + batch_size)
+                updated += batch.refresh_bid_aggregates()
+                invalidate_lists(batch.values_list('id', flat=True))
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled bid aggregates on {updated} lists.'))
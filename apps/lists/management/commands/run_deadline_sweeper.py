@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from apps.lists.models import ShoppingList
+
+
+class Command(BaseCommand):
+    help = (
+        "Close bidding on lists past their bidding deadline and expire lists "
+        "past expires_at. Sleeps until the next deadline between sweeps. "
+        "Safe to run on several nodes at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single sweep and exit')
+        parser.add_argument('--max-sleep', type=float, default=60,
+                            help='Upper bound in seconds between sweeps, so lists '
+                                 'posted with an earlier deadline are picked up')
+        parser.add_argument('--min-sleep', type=float, default=1,
+                            help='Lower bound in seconds between sweeps')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of lists updated per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                self.sweep(options['batch_size'])
+                if options['once']:
+                    return
+                time.sleep(self.seconds_until_next_deadline(
+                    options['min_sleep'], options['max_sleep']
+                ))
+        except KeyboardInterrupt:
+            self.stdout.write('Sweeper stopped.')
+
+    def sweep(self, batch_size):
+        # Long-running worker: drop connections the database may have timed out
+        close_old_connections()
+        now = timezone.now()
+        closed = ShoppingList.objects.close_due_bidding(now, batch_size)
+        expired = ShoppingList.objects.expire_due(now, batch_size)
+        if closed or expired:
+            self.stdout.write(f'{now.isoformat()}: closed bidding on {closed} lists, expired {expired}.')
+
+    def seconds_until_next_deadline(self, min_sleep, max_sleep):
+        deadline = ShoppingList.objects.next_deadline()
+        if deadline is None:
+            return max_sleep
+        # Rows still due here are held by another sweeper; back off briefly
+        seconds = (deadline - timezone.now()).total_seconds()
+        return min(max(seconds, min_sleep), max_sleep)
@@ -0,0 +1,129 @@
+"""
+Synthetic data helpers shared by the benchmark management commands.
+
+Benchmarks run inside a transaction that is rolled back, so nothing seeded
+here is left behind.
+"""
+import os
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from apps.lists.models import ShoppingList
+
+User = get_user_model()
+
+# Rough bounding box of the continental US
+REGION = (30.0, 48.0, -122.0, -72.0)
+
+STORES = [
+    ('Costco', 'Seattle'), ('Walmart', 'Denver'), ('Target', 'Chicago'),
+    ('Whole Foods', 'Austin'), ('Kroger', 'Atlanta'), ('Safeway', 'Portland'),
+]
+
+ITEMS = ['milk', 'eggs', 'bread', 'apples', 'coffee', 'rice', 'chicken', 'cheese']
+
+
+class Rollback(Exception):
+    """Raised at the end of a benchmark to discard everything it seeded"""
+
+
+def untracked():
+    """
+    Settings for the requests a benchmark makes: their users are rolled
+    back, so the activity buffer must not record them.
+    """
+    return override_settings(ACTIVITY_TRACKING_ENABLED=False)
+
+
+def require_throwaway_database():
+    """
+    Refuse to seed unless the default database is a test database or the
+    one named by settings.BENCHMARK_DATABASE. The rollback is all that keeps
+    the seeded open lists out of live feeds, so never bet production on it.
+    """
+    name = str(connection.settings_dict['NAME'])
+    if os.path.basename(name).startswith('test_') or name == settings.BENCHMARK_DATABASE:
+        return
+    raise CommandError(
+        f"Refusing to seed benchmark rows into database {name!r}. Point the command "
+        f"at a throwaway database and set BENCHMARK_DATABASE to its name."
+    )
+
+
+def make_user(email, user_type, **extra):
+    return User.objects.create_user(
+        email=email, password='bench-pass-123', user_type=user_type, **extra
+    )
+
+
+def random_point(rng, region=REGION):
+    min_lat, max_lat, min_lng, max_lng = region
+    return (
+        Decimal(f'{rng.uniform(min_lat, max_lat):.6f}'),
+        Decimal(f'{rng.uniform(min_lng, max_lng):.6f}'),
+    )
+
+
+def build_list(client, rng, status='open', now=None):
+    now = now or timezone.now()
+    store_name, store_city = rng.choice(STORES)
+    latitude, longitude = random_point(rng)
+    items = [
+        {'name': name, 'quantity': rng.randint(1, 4)}
+        for name in rng.sample(ITEMS, 3)
+    ]
+    shopping_list = ShoppingList(
+        client=client,
+        title=f"{items[0]['name'].title()} run at {store_name}",
+        description=', '.join(item['name'] for item in items),
+        store_name=store_name,
+        store_address='1 Main St',
+        store_city=store_city,
+        items=items,
+        estimated_total=Decimal(rng.randint(20, 400)),
+        preferred_delivery_time=now + timedelta(days=2),
+        bidding_deadline=now + timedelta(hours=rng.randint(1, 48)),
+        delivery_latitude=latitude,
+        delivery_longitude=longitude,
+        status=status,
+    )
+    shopping_list.populate_derived_fields()
+    return shopping_list
+
+
+def seed_lists(client, count, seed=0, batch_size=5000):
+    """Bulk insert `count` open lists spread across REGION"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    remaining = count
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        ShoppingList.objects.bulk_create(
+            [build_list(client, rng, now=now) for _ in range(size)],
+            batch_size=batch_size,
+        )
+        remaining -= size
+
+
+def analyze_lists_table():
+    """Refresh planner statistics after a bulk seed, as production databases keep them"""
+    table = ShoppingList._meta.db_table
+    if connection.vendor == 'mysql' and connection.in_atomic_block:
+        # ANALYZE TABLE commits implicitly, which would keep the seeded rows.
+        # InnoDB recalculates persistent statistics on its own once over 10%
+        # of the table has changed.
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f'ANALYZE TABLE {table}')
+            cursor.fetchall()
+        else:
+            cursor.execute(f'ANALYZE {table}')
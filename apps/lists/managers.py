@@ -0,0 +1,149 @@
+from django.db import models, transaction
+from django.db.models import Count, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import invalidate_lists
+from .geo import covering_ranges, bounding_box, haversine_expression
+
+
+# Statuses a list can still expire from; later stages belong to a shopper
+EXPIRABLE_STATUSES = ('open', 'bidding_closed')
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    """
+    Custom queryset for shopping lists with marketplace-specific filters.
+    """
+
+    def open_for_bids(self):
+        """Lists still accepting bids"""
+        return self.filter(status='open', bidding_deadline__gt=timezone.now())
+
+    def with_total_bid_count(self):
+        """
+        Annotate `total_count`, the number of bids of any status. A correlated
+        subquery only runs for the rows returned, where Count('bids') would
+        group the whole filtered table before ORDER BY ... LIMIT.
+        """
+        from apps.bids.models import Bid
+
+        return self.annotate(total_count=Coalesce(Subquery(
+            Bid.objects.filter(shopping_list=OuterRef('pk')).order_by()
+            .values('shopping_list').annotate(count=Count('id')).values('count')
+        ), 0))
+
+    def with_distance(self, latitude, longitude):
+        """Annotate each list with its distance in km from the given point"""
+        return self.annotate(distance=haversine_expression(
+            latitude, longitude, 'delivery_latitude', 'delivery_longitude'
+        ))
+
+    def nearby(self, latitude, longitude, radius_km):
+        """
+        Lists within radius_km of the given point, closest first.
+
+        Candidates are narrowed with an indexed geohash range scan and a
+        bounding box before the exact haversine distance is computed.
+        """
+        cell_filter = Q()
+        for low, high in covering_ranges(latitude, longitude, radius_km):
+            # Range scans keep the geohash index usable on every backend,
+            # unlike LIKE 'prefix%' which SQLite will not index.
+            cell_filter |= Q(geohash__gte=low, geohash__lt=high)
+
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+        return self.filter(
+            cell_filter,
+            delivery_latitude__gte=min_lat,
+            delivery_latitude__lte=max_lat,
+            delivery_longitude__gte=min_lng,
+            delivery_longitude__lte=max_lng,
+        ).with_distance(latitude, longitude).filter(
+            distance__lte=radius_km
+        ).order_by('distance', 'id')
+
+    def refresh_bid_aggregates(self):
+        """
+        Recompute the denormalized bid columns for every list in the queryset
+        with a single set-based UPDATE. Call inside the transaction that
+        changed the bids so the columns never drift from the bid rows.
+        """
+        from apps.bids.models import Bid
+
+        bids = Bid.objects.filter(shopping_list=OuterRef('pk')).order_by()
+        active_bids = bids.filter(is_active=True)
+        return self.update(
+            active_bid_count=Coalesce(Subquery(
+                active_bids.values('shopping_list').annotate(count=Count('id')).values('count')
+            ), 0),
+            lowest_active_bid_amount=Subquery(
+                active_bids.order_by('amount').values('amount')[:1]
+            ),
+            last_bid_at=Subquery(
+                bids.order_by('-updated_at').values('updated_at')[:1]
+            ),
+        )
+
+    def due_for_closing(self, now=None):
+        """Open lists whose bidding deadline has passed"""
+        return self.filter(status='open', bidding_deadline__lte=now or timezone.now())
+
+    def due_for_expiry(self, now=None):
+        """Unassigned lists past their expires_at"""
+        return self.filter(status__in=EXPIRABLE_STATUSES, expires_at__lte=now or timezone.now())
+
+    def next_deadline(self):
+        """
+        The earliest bidding_deadline or expires_at the sweeper still has to
+        act on (possibly already in the past), or None if nothing is pending.
+        """
+        deadlines = [
+            self.filter(status='open').aggregate(at=Min('bidding_deadline'))['at'],
+            self.filter(status__in=EXPIRABLE_STATUSES).aggregate(at=Min('expires_at'))['at'],
+        ]
+        deadlines = [deadline for deadline in deadlines if deadline is not None]
+        return min(deadlines) if deadlines else None
+
+    def close_due_bidding(self, now=None, batch_size=1000):
+        """Move open lists past their bidding deadline to bidding_closed"""
+        now = now or timezone.now()
+        return self._sweep(self.due_for_closing(now), 'bidding_closed', now, batch_size)
+
+    def expire_due(self, now=None, batch_size=1000):
+        """
+        Move unassigned lists past expires_at to expired. Their active bids
+        are marked lost and the bid aggregates refreshed in the same transaction.
+        """
+        from apps.bids.cache import invalidate_dashboards
+        from apps.bids.models import Bid
+
+        def expire_bids(ids):
+            active_bids = Bid.objects.filter(shopping_list_id__in=ids, status='active')
+            invalidate_dashboards(active_bids.values_list('shopper_id', flat=True), using=self.db)
+            active_bids.update(status='lost', is_active=False, updated_at=now)
+            self.model.objects.filter(id__in=ids).refresh_bid_aggregates()
+
+        now = now or timezone.now()
+        return self._sweep(self.due_for_expiry(now), 'expired', now, batch_size, expire_bids)
+
+    def _sweep(self, due, new_status, now, batch_size, on_batch=None):
+        """
+        Update `due` to `new_status` in batches. Each batch locks its rows with
+        SKIP LOCKED so several sweepers can run at once without waiting on or
+        double-processing each other, and the UPDATE re-checks the due filter.
+        """
+        total = 0
+        while True:
+            with transaction.atomic(using=self.db):
+                ids = list(
+                    due.select_for_update(skip_locked=True)
+                    .order_by('id').values_list('id', flat=True)[:batch_size]
+                )
+                if not ids:
+                    return total
+                updated = due.filter(id__in=ids).update(status=new_status, updated_at=now)
+                if on_batch is not None:
+                    on_batch(ids)
+                invalidate_lists(ids, using=self.db)
+            total += updated
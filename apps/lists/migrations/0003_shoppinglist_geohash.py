@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:28
+
+from django.db import migrations, models
+
+
+def backfill_geohash(apps, schema_editor):
+    from apps.lists.geo import encode_geohash
+
+    ShoppingList = apps.get_model('lists', 'ShoppingList')
+    batch = []
+    for shopping_list in ShoppingList.objects.only(
+        'id', 'delivery_latitude', 'delivery_longitude'
+    ).iterator(chunk_size=2000):
+        shopping_list.geohash = encode_geohash(
+            shopping_list.delivery_latitude, shopping_list.delivery_longitude
+        )
+        batch.append(shopping_list)
+        if len(batch) >= 2000:
+            ShoppingList.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    if batch:
+        ShoppingList.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0002_alter_shoppinglist_expires_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['status', 'geohash'], name='lists_shopp_status_7383cd_idx'),
+        ),
+    ]
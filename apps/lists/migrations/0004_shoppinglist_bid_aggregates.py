@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:36
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_bid_aggregates(apps, schema_editor):
+    ShoppingList = apps.get_model('lists', 'ShoppingList')
+    Bid = apps.get_model('bids', 'Bid')
+
+    bids = Bid.objects.filter(shopping_list=OuterRef('pk')).order_by()
+    active_bids = bids.filter(is_active=True)
+    ShoppingList.objects.update(
+        active_bid_count=Coalesce(Subquery(
+            active_bids.values('shopping_list').annotate(count=Count('id')).values('count')
+        ), 0),
+        lowest_active_bid_amount=Subquery(active_bids.order_by('amount').values('amount')[:1]),
+        last_bid_at=Subquery(bids.order_by('-updated_at').values('updated_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0003_shoppinglist_geohash'),
+        ('bids', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='active_bid_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='last_bid_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='lowest_active_bid_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_bid_aggregates, migrations.RunPython.noop),
+    ]
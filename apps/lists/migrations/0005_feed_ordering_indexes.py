@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0004_shoppinglist_bid_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['status', 'created_at'], name='lists_shopp_status_0c7af7_idx'),
+        ),
+    ]
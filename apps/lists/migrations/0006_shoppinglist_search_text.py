@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:41
+
+from django.db import migrations, models
+
+
+def backfill_search_text(apps, schema_editor):
+    from apps.lists.search import build_search_text
+
+    ShoppingList = apps.get_model('lists', 'ShoppingList')
+    batch = []
+    for shopping_list in ShoppingList.objects.only(
+        'id', 'title', 'description', 'store_name', 'store_city', 'items'
+    ).iterator(chunk_size=2000):
+        shopping_list.search_text = build_search_text(shopping_list)
+        batch.append(shopping_list)
+        if len(batch) >= 2000:
+            ShoppingList.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        ShoppingList.objects.bulk_update(batch, ['search_text'])
+
+
+def create_search_index(apps, schema_editor):
+    from apps.lists.search import ensure_search_index
+
+    ensure_search_index(schema_editor.connection, 'lists_shoppinglist')
+
+
+def drop_search_index(apps, schema_editor):
+    from apps.lists.search import drop_search_index
+
+    drop_search_index(schema_editor.connection, 'lists_shoppinglist')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0005_feed_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0006_shoppinglist_search_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['status', 'bidding_deadline'], name='lists_shopp_status_552fda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['status', 'expires_at'], name='lists_shopp_status_b97a10_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:12
+
+from django.db import migrations
+
+
+def backfill_item_names(apps, schema_editor):
+    from apps.lists.search import build_search_text
+
+    ShoppingList = apps.get_model('lists', 'ShoppingList')
+    lists = ShoppingList.objects.filter(items_structured__isnull=False).distinct().only(
+        'id', 'title', 'description', 'store_name', 'store_city', 'items'
+    ).prefetch_related('items_structured')
+    batch = []
+    for shopping_list in lists.iterator(chunk_size=2000):
+        item_names = [item.name for item in sorted(shopping_list.items_structured.all(), key=lambda item: item.id)]
+        shopping_list.search_text = build_search_text(shopping_list, item_names)
+        batch.append(shopping_list)
+        if len(batch) >= 2000:
+            ShoppingList.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        ShoppingList.objects.bulk_update(batch, ['search_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0007_deadline_sweep_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_item_names, migrations.RunPython.noop),
+    ]
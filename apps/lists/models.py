@@ -2,6 +2,12 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
+from .geo import encode_geohash
+from .search import build_search_text
+from .managers import ShoppingListQuerySet
+
+# Written only by refresh_bid_aggregates() and Bid.mark_as_won(), never by save()
+BID_AGGREGATE_FIELDS = ('active_bid_count', 'lowest_active_bid_amount', 'last_bid_at')
 
 class ShoppingList(models.Model):
     STATUS_CHOICES = (
@@ -34,6 +40,9 @@ class ShoppingList(models.Model):
     # Shopping list items (stored as JSON for flexibility)
     items = models.JSONField()  # [{"name": "Milk", "quantity": 2, "estimated_price": 3.99}, ...]
     
+    # Denormalized text for full-text search (see search.py)
+    search_text = models.TextField(blank=True, editable=False)
+    
     # Budget and pricing
     estimated_total = models.DecimalField(max_digits=10, decimal_places=2)
     max_budget = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -49,6 +58,7 @@ class ShoppingList(models.Model):
     # Location for distance calculation
     delivery_latitude = models.DecimalField(max_digits=9, decimal_places=6)
     delivery_longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)  # Derived from delivery lat/lng
     
     # Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
@@ -63,10 +73,19 @@ class ShoppingList(models.Model):
         limit_choices_to={'user_type__in': ['shopper', 'both']}
     )
     
+    # Bid aggregates (denormalized, maintained with every bid write)
+    active_bid_count = models.PositiveIntegerField(default=0, editable=False)
+    lowest_active_bid_amount = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, editable=False
+    )
+    last_bid_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ShoppingListQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -74,16 +93,45 @@ class ShoppingList(models.Model):
             models.Index(fields=['client', 'status']),
             models.Index(fields=['bidding_deadline']),
             models.Index(fields=['store_city']),
+            models.Index(fields=['status', 'geohash']),
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'bidding_deadline']),
+            models.Index(fields=['status', 'expires_at']),
         ]
     
     def __str__(self):
         return f"{self.title} - {self.client.email}"
     
     def save(self, *args, **kwargs):
-    # Auto-set expires_at to 30 days after bidding_deadline if not provided
+        self.populate_derived_fields()
+        if (not self._state.adding and self.pk is not None and not args
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert')):
+            # The loaded bid aggregates may be older than the row: bids
+            # update them concurrently under the list lock
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+                and field.name not in BID_AGGREGATE_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    def populate_derived_fields(self, item_names=None):
+        """
+        Fill in fields computed from other fields (also needed before bulk_create).
+        `item_names` are the structured items' names, read from the database
+        unless given; a list being created has none saved yet.
+        """
+        # Auto-set expires_at to 30 days after bidding_deadline if not provided
         if not self.expires_at and self.bidding_deadline:
             self.expires_at = self.bidding_deadline + timedelta(days=30)
-        super().save(*args, **kwargs)
+        if self.delivery_latitude is not None and self.delivery_longitude is not None:
+            self.geohash = encode_geohash(self.delivery_latitude, self.delivery_longitude)
+        if item_names is None:
+            item_names = () if self._state.adding or self.pk is None else (
+                self.items_structured.order_by('id').values_list('name', flat=True)
+            )
+        self.search_text = build_search_text(self, item_names)
     
     @property
     def bid_count(self):
@@ -93,11 +141,15 @@ class ShoppingList(models.Model):
     def lowest_bid(self):
         return self.bids.filter(is_active=True).order_by('amount').first()
     
+    def refresh_bid_aggregates(self):
+        """Recompute the denormalized bid columns from the bid rows"""
+        ShoppingList.objects.filter(pk=self.pk).refresh_bid_aggregates()
+        self.refresh_from_db(fields=['active_bid_count', 'lowest_active_bid_amount', 'last_bid_at'])
+    
     def close_bidding(self):
         """Close bidding when deadline passes"""
-        if timezone.now() >= self.bidding_deadline and self.status == 'open':
-            self.status = 'bidding_closed'
-            self.save()
+        if ShoppingList.objects.filter(pk=self.pk).close_due_bidding():
+            self.refresh_from_db(fields=['status', 'updated_at'])
 
 class ShoppingListItem(models.Model):
     """Optional: If you want more structured items instead of JSON"""
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+# CSV cells holding JSON rather than plain text
+JSON_COLUMNS = ('items', 'items_data')
+
+
+def decode(data, encoding):
+    try:
+        return data.decode(encoding)
+    except UnicodeDecodeError as exc:
+        raise ParseError(f'Upload is not valid {encoding} text: {exc}')
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON: one object per line, blank lines ignored.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        return parse_ndjson(decode(stream.read(), encoding))
+
+
+class CSVParser(BaseParser):
+    """
+    Parses CSV with a header row into a list of dicts.
+    The `items` and `items_data` columns may hold JSON arrays.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        return parse_csv(decode(stream.read(), encoding))
+
+
+def parse_ndjson(text):
+    rows = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError as exc:
+            raise ParseError(f'NDJSON parse error on line {line_number}: {exc}')
+    return rows
+
+
+def parse_csv(text):
+    rows = []
+    reader = csv.DictReader(io.StringIO(text))
+    for line_number, row in enumerate(reader, start=2):
+        # Drop empty cells so optional fields fall back to their defaults
+        row = {key: value for key, value in row.items() if key and value not in (None, '')}
+        for column in JSON_COLUMNS:
+            if column in row:
+                try:
+                    row[column] = json.loads(row[column])
+                except ValueError as exc:
+                    raise ParseError(f"CSV parse error in '{column}' on line {line_number}: {exc}")
+        rows.append(row)
+    return rows
+
+
+def parse_upload(upload):
+    """Parse an uploaded file by its extension (.csv, .ndjson/.jsonl or .json)"""
+    name = upload.name.lower()
+    text = decode(upload.read(), settings.DEFAULT_CHARSET)
+    if name.endswith('.csv'):
+        return parse_csv(text)
+    if name.endswith(('.ndjson', '.jsonl')):
+        return parse_ndjson(text)
+    if name.endswith('.json'):
+        try:
+            return json.loads(text)
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error: {exc}')
+    raise ParseError('Unsupported file type. Upload a .csv, .ndjson, .jsonl or .json file.')
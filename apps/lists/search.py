@@ -0,0 +1,172 @@
+"""
+Full-text search over shopping lists.
+
+Each list keeps a denormalized `search_text` (title, description, store,
+and the names of its JSON and structured items). It is indexed with a
+FULLTEXT index on MySQL and an external content FTS5 table on SQLite; other
+backends fall back to a LIKE scan.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'lists_shoppinglist_fts'
+MYSQL_FULLTEXT_INDEX = 'lists_shoppinglist_search_ft'
+MAX_TERMS = 10
+
+# InnoDB leaves stopwords and words shorter than innodb_ft_min_token_size
+# out of a FULLTEXT index (these are the server defaults)
+MYSQL_FT_MIN_TOKEN_SIZE = 3
+MYSQL_FT_STOPWORDS = frozenset({
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for',
+    'from', 'how', 'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the',
+    'this', 'to', 'was', 'what', 'when', 'where', 'who', 'will', 'with', 'und', 'www',
+})
+
+_SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': (
+        "AFTER INSERT ON {table} BEGIN "
+        "INSERT INTO {fts}(rowid, search_text) VALUES (new.id, new.search_text); END"
+    ),
+    f'{FTS_TABLE}_ad': (
+        "AFTER DELETE ON {table} BEGIN "
+        "INSERT INTO {fts}({fts}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END"
+    ),
+    f'{FTS_TABLE}_au': (
+        "AFTER UPDATE OF search_text ON {table} BEGIN "
+        "INSERT INTO {fts}({fts}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+        "INSERT INTO {fts}(rowid, search_text) VALUES (new.id, new.search_text); END"
+    ),
+}
+
+
+def build_search_text(shopping_list, item_names=()):
+    """
+    Text indexed for a list: title, description, store, the names in its
+    `items` JSON and `item_names` (those of its structured items)
+    """
+    parts = [
+        shopping_list.title, shopping_list.description,
+        shopping_list.store_name, shopping_list.store_city,
+    ]
+    items = shopping_list.items if isinstance(shopping_list.items, list) else []
+    parts.extend(
+        str(item.get('name', '')) for item in items if isinstance(item, dict)
+    )
+    parts.extend(item_names)
+    return ' '.join(part for part in parts if part)
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def mysql_indexes(term):
+    return len(term) >= MYSQL_FT_MIN_TOKEN_SIZE and term not in MYSQL_FT_STOPWORDS
+
+
+def contains_all(queryset, terms):
+    condition = Q()
+    for term in terms:
+        condition &= Q(search_text__icontains=term)
+    return queryset.filter(condition)
+
+
+def ensure_search_index(connection, table):
+    """
+    Create the text index if it is missing. Idempotent.
+
+    SQLite rebuilds a table (dropping its triggers) on many schema changes,
+    so this also runs after every migrate to restore the FTS triggers.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT COUNT(*) FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+                [table, MYSQL_FULLTEXT_INDEX],
+            )
+            if not cursor.fetchone()[0]:
+                cursor.execute(
+                    f'ALTER TABLE {table} ADD FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} (search_text)'
+                )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"search_text, content='{table}', content_rowid='id', "
+                f"tokenize='porter unicode61')"
+            )
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+                [table],
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = [name for name in _SQLITE_TRIGGERS if name not in existing]
+            for name in missing:
+                body = _SQLITE_TRIGGERS[name].format(table=table, fts=FTS_TABLE)
+                cursor.execute(f'CREATE TRIGGER {name} {body}')
+            if missing:
+                # Rows may have changed while the triggers were gone
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(connection, table):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f'ALTER TABLE {table} DROP INDEX {MYSQL_FULLTEXT_INDEX}')
+        elif connection.vendor == 'sqlite':
+            for name in _SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def search_lists(queryset, query):
+    """
+    Filter `queryset` to lists matching every term of `query` and annotate a
+    `rank` (higher is more relevant). Terms match as prefixes.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+
+    vendor = connections[queryset.db].vendor
+    table = queryset.model._meta.db_table
+
+    if vendor == 'mysql':
+        # A required term missing from the index would match nothing, so
+        # terms InnoDB does not index are checked on the rows it returns
+        indexed = [term for term in terms if mysql_indexes(term)]
+        queryset = contains_all(queryset, [term for term in terms if not mysql_indexes(term)])
+        if not indexed:
+            return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+        boolean_query = ' '.join(f'+{term}*' for term in indexed)
+        return queryset.alias(
+            matched=RawSQL(
+                f'MATCH ({table}.search_text) AGAINST (%s IN BOOLEAN MODE)',
+                [boolean_query], output_field=FloatField(),
+            )
+        ).filter(matched__gt=0).annotate(
+            rank=RawSQL(
+                f'MATCH ({table}.search_text) AGAINST (%s IN NATURAL LANGUAGE MODE)',
+                [' '.join(indexed)], output_field=FloatField(),
+            )
+        )
+
+    if vendor == 'sqlite':
+        fts_query = ' AND '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(
+            id__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [fts_query]
+            )
+        ).annotate(
+            # bm25() is lower for better matches; negate so higher ranks first
+            rank=RawSQL(
+                f'(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id)',
+                [fts_query], output_field=FloatField(),
+            )
+        )
+
+    return contains_all(queryset, terms).annotate(rank=Value(0.0, output_field=FloatField()))
@@ -1,17 +1,53 @@
 from rest_framework import serializers
+from django.db import transaction
+from django.db.models import Max
 from django.utils import timezone
 from .models import ShoppingList, ShoppingListItem
+from .cache import invalidate_lists
+from apps.users.models import User
 from apps.users.serializers import UserSerializer
+from shopper.dynamic_fields import DynamicFieldsMixin
+from shopper.fastserializers import ValuesPlan
+
+BULK_CREATE_BATCH_SIZE = 500
+ITEM_FIELDS = ('name', 'quantity', 'unit', 'estimated_price', 'notes')
+
+def build_items(shopping_list, items_data):
+    """Unsaved ShoppingListItem rows for a list, ignoring unknown keys"""
+    return [
+        ShoppingListItem(
+            shopping_list=shopping_list,
+            **{key: value for key, value in item_data.items() if key in ITEM_FIELDS}
+        )
+        for item_data in items_data
+    ]
+
+def lock_client(client):
+    """
+    Lock the client's row until the transaction ends. Every list insert
+    takes it, so an import can tell its own new rows from anyone else's.
+    """
+    User.objects.select_for_update().filter(pk=client.pk).exists()
 
 class ShoppingListItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShoppingListItem
         fields = ['id', 'name', 'quantity', 'unit', 'estimated_price', 'notes']
+        extra_kwargs = {'quantity': {'min_value': 1}}
+
+class ShoppingListSummarySerializer(serializers.ModelSerializer):
+    """The few list fields other resources embed when expanded"""
+    class Meta:
+        model = ShoppingList
+        fields = [
+            'id', 'title', 'store_name', 'store_city', 'status',
+            'estimated_total', 'bidding_deadline'
+        ]
 
-class ShoppingListSerializer(serializers.ModelSerializer):
+class ShoppingListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items_structured = ShoppingListItemSerializer(many=True, read_only=True)
     client_details = UserSerializer(source='client', read_only=True)
-    bid_count = serializers.IntegerField(read_only=True)
+    bid_count = serializers.IntegerField(source='active_bid_count', read_only=True)
     lowest_bid_amount = serializers.SerializerMethodField()
     
     class Meta:
@@ -25,10 +61,15 @@ class ShoppingListSerializer(serializers.ModelSerializer):
             'lowest_bid_amount', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'client', 'status', 'created_at', 'updated_at']
+        expandable_fields = {
+            'selected_shopper': (UserSerializer, {'read_only': True}),
+        }
+        query_sources = {
+            'lowest_bid_amount': ['lowest_active_bid_amount'],
+        }
     
     def get_lowest_bid_amount(self, obj):
-        lowest_bid = obj.lowest_bid
-        return lowest_bid.amount if lowest_bid else None
+        return obj.lowest_active_bid_amount
     
     def validate(self, data):
         # Validate that bidding_deadline is in the future
@@ -46,6 +87,13 @@ class ShoppingListSerializer(serializers.ModelSerializer):
         
         return data
 
+# Same output as ShoppingListSerializer, read straight from .values() rows
+SHOPPING_LIST_PLAN = ValuesPlan(ShoppingListSerializer, overrides={
+    'lowest_bid_amount': (
+        ['lowest_active_bid_amount'], lambda row, context: row['lowest_active_bid_amount']
+    ),
+})
+
 class CreateShoppingListSerializer(serializers.ModelSerializer):
     items_data = serializers.ListField(
         child=serializers.DictField(),
@@ -64,19 +112,19 @@ class CreateShoppingListSerializer(serializers.ModelSerializer):
     
     def validate_items_data(self, value):
         """Validate the structured items data"""
-        if not isinstance(value, list):
-            raise serializers.ValidationError("Items must be a list")
-        
-        for item in value:
-            required_fields = ['name', 'quantity']
-            for field in required_fields:
-                if field not in item:
-                    raise serializers.ValidationError(f"Each item must have a '{field}' field")
-            
-            if not isinstance(item.get('quantity', 0), (int, float)) or item.get('quantity', 0) <= 0:
-                raise serializers.ValidationError("Quantity must be a positive number")
-        
-        return value
+        # Check every column against the item model, so a bad price, unit or
+        # over-long name is a validation error and not a failed INSERT
+        items = []
+        errors = {}
+        for index, item in enumerate(value):
+            item_serializer = ShoppingListItemSerializer(data=item)
+            if item_serializer.is_valid():
+                items.append(item_serializer.validated_data)
+            else:
+                errors[index] = item_serializer.errors
+        if errors:
+            raise serializers.ValidationError(errors)
+        return items
     
     def validate(self, data):
         # Validate that bidding_deadline is in the future
@@ -96,20 +144,62 @@ class CreateShoppingListSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         items_data = validated_data.pop('items_data', [])
         
-        # Create the shopping list
-        shopping_list = ShoppingList.objects.create(
-            client=self.context['request'].user,
-            **validated_data
-        )
-        
-        # Create structured items if provided
-        for item_data in items_data:
-            ShoppingListItem.objects.create(
-                shopping_list=shopping_list,
-                **item_data
+        with transaction.atomic():
+            lock_client(self.context['request'].user)
+            # Create the shopping list
+            shopping_list = ShoppingList.objects.create(
+                client=self.context['request'].user,
+                **validated_data
+            )
+            
+            # Create structured items if provided, in one INSERT
+            ShoppingListItem.objects.bulk_create(
+                build_items(shopping_list, items_data)
             )
+            if items_data:
+                # Their names are searchable too
+                shopping_list.save(update_fields=['search_text'])
         
         return shopping_list
+    
+    @staticmethod
+    def bulk_create(client, rows, batch_size=BULK_CREATE_BATCH_SIZE):
+        """
+        Create many lists from already validated rows.
+        Lists and their structured items are written with bulk_create in
+        chunks; returns the created lists in input order.
+        """
+        shopping_lists = []
+        items_per_list = []
+        for validated_data in rows:
+            validated_data = dict(validated_data)
+            items_per_list.append(validated_data.pop('items_data', []))
+            shopping_list = ShoppingList(client=client, **validated_data)
+            shopping_list.populate_derived_fields([item['name'] for item in items_per_list[-1]])
+            shopping_lists.append(shopping_list)
+        
+        with transaction.atomic():
+            lock_client(client)
+            last_id = ShoppingList.objects.filter(client=client).aggregate(last_id=Max('id'))['last_id'] or 0
+            ShoppingList.objects.bulk_create(shopping_lists, batch_size=batch_size)
+            if shopping_lists and shopping_lists[0].pk is None:
+                # MySQL returns no ids from a multi-row INSERT. Auto-increment
+                # ids rise in insert order, and with the client locked the
+                # client's lists past last_id are exactly this import's
+                ids = ShoppingList.objects.filter(
+                    client=client, id__gt=last_id
+                ).order_by('id').values_list('id', flat=True)
+                for shopping_list, pk in zip(shopping_lists, ids):
+                    shopping_list.pk = pk
+            
+            items = []
+            for shopping_list, items_data in zip(shopping_lists, items_per_list):
+                items.extend(build_items(shopping_list, items_data))
+            ShoppingListItem.objects.bulk_create(items, batch_size=batch_size)
+            # bulk_create sends no post_save signals
+            invalidate_lists()
+        
+        return shopping_lists
 
 class ShoppingListStatusUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -133,4 +223,10 @@ class BidOnShoppingListSerializer(serializers.Serializer):
     message = serializers.CharField()
     estimated_time = serializers.IntegerField()
     distance_to_store = serializers.DecimalField(max_digits=6, decimal_places=2)
-    created_at = serializers.DateTimeField()
\ No newline at end of file
+    score = serializers.FloatField()
+    created_at = serializers.DateTimeField()
+    
+    class Meta:
+        query_sources = {
+            'shopper_name': ['shopper.first_name', 'shopper.last_name'],
+        }
\ No newline at end of file
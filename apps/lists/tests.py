@@ -1,3 +1,672 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import math
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.bids.models import Bid
+from apps.lists.cache import FEED_NAMESPACE, list_namespace
+from apps.lists.geo import (
+    EARTH_RADIUS_KM, KM_PER_DEGREE_LAT, bounding_box, covering_ranges, encode_geohash,
+)
+from apps.lists.management.commands.check_query_scaling import Command, uncovered_views
+from apps.lists.models import ShoppingList, ShoppingListItem
+from apps.lists.search import mysql_indexes, search_lists
+from apps.lists.serializers import SHOPPING_LIST_PLAN, ShoppingListSerializer
+from shopper.dynamic_fields import parse_spec
+from shopper.optimizer import optimize
+
+
+def test_every_read_view_is_measured():
+    missing = uncovered_views()
+    assert not missing, f"Add to ENDPOINTS: {', '.join(sorted(view.__name__ for view in missing))}"
+
+
+@pytest.mark.django_db
+def test_read_endpoints_do_not_scale_with_data():
+    # Same sizes as the check_query_scaling defaults; the large one stays within a page
+    problems = [
+        f'{label} (fast paths {"on" if fast else "off"}): {count} -> {large_count} queries, {problem}'
+        for label, fast, count, large_count, _, problem in Command().compare(small=3, large=12)
+        if problem
+    ]
+    assert not problems, '\n'.join(problems)
+
+
+@pytest.fixture
+def lists(shopping_list, client_user, shopper_user):
+    """Lists with and without structured items, bids and a selected shopper"""
+    ShoppingListItem.objects.create(
+        shopping_list=shopping_list, name='milk', quantity=2, unit='l', estimated_price=Decimal('2.49'),
+    )
+    ShoppingListItem.objects.create(shopping_list=shopping_list, name='eggs', quantity=12, notes='free range')
+    Bid.objects.create(
+        shopper=shopper_user, shopping_list=shopping_list, amount=Decimal('9.99'),
+        estimated_time=30, distance_to_store=Decimal('1.50'),
+    )
+    assigned = ShoppingList.objects.create(
+        client=client_user, title='Weekly shop', description='', store_name='Target',
+        store_address='2 Main St', store_city='Chicago', items=[], estimated_total=Decimal('120.00'),
+        max_budget=Decimal('150.00'), preferred_delivery_time=shopping_list.preferred_delivery_time,
+        bidding_deadline=shopping_list.bidding_deadline, delivery_latitude=Decimal('41.880000'),
+        delivery_longitude=Decimal('-87.630000'), status='assigned', selected_shopper=shopper_user,
+    )
+    ShoppingList.objects.filter(client=client_user).refresh_bid_aggregates()
+    return ShoppingList.objects.filter(pk__in=[shopping_list.pk, assigned.pk]).order_by('id')
+
+
+@pytest.mark.parametrize('fields,expand', [
+    ('', ''),
+    ('id,title,client_details.email,client_details.user_type_display', ''),
+    ('id,items_structured.name,items_structured.estimated_price', ''),
+    ('bid_count,lowest_bid_amount', ''),
+    ('', 'selected_shopper'),
+    ('id,status', 'selected_shopper'),
+])
+def test_shopping_list_plan_matches_serializer(lists, assert_plan_parity, fields, expand):
+    assert_plan_parity(SHOPPING_LIST_PLAN, lists, fields, expand)
+
+
+@pytest.mark.parametrize('fields,queries', [
+    # The list, then its structured items in one prefetch
+    ('', 2),
+    ('id,items_structured.name', 2),
+    # No many=True relation left to prefetch
+    ('id,title,client_details.email', 1),
+])
+def test_shopping_list_serializer_queryset_is_optimized(lists, django_assert_num_queries, fields, queries):
+    fields = parse_spec(fields) if fields else None
+    plan = SHOPPING_LIST_PLAN.variant(fields)
+    queryset = optimize(lists, ShoppingListSerializer) if plan is SHOPPING_LIST_PLAN else plan.restrict(lists)
+    with django_assert_num_queries(queries):
+        ShoppingListSerializer(queryset, many=True, fields=fields).data
+
+
+def destination(latitude, longitude, bearing, distance_km):
+    """The point `distance_km` from a start point along `bearing` (degrees), on the haversine sphere"""
+    lat, lng, theta = math.radians(latitude), math.radians(longitude), math.radians(bearing)
+    delta = distance_km / EARTH_RADIUS_KM
+    end_lat = math.asin(math.sin(lat) * math.cos(delta) + math.cos(lat) * math.sin(delta) * math.cos(theta))
+    end_lng = lng + math.atan2(
+        math.sin(theta) * math.sin(delta) * math.cos(lat),
+        math.cos(delta) - math.sin(lat) * math.sin(end_lat),
+    )
+    return math.degrees(end_lat), math.degrees(end_lng)
+
+
+def edge_points(count, seed=1):
+    """
+    (centre, radius, point exactly on the circle) for circles that do not
+    cross the antimeridian, where the box is clamped instead
+    """
+    rng = random.Random(seed)
+    produced = 0
+    while produced < count:
+        latitude, longitude = rng.uniform(-80, 80), rng.uniform(-170, 170)
+        radius = rng.choice([0.5, 5, 25, 100, 500])
+        min_lng, max_lng = bounding_box(latitude, longitude, radius)[2:]
+        if min_lng <= -180 or max_lng >= 180:
+            continue
+        produced += 1
+        yield (latitude, longitude), radius, destination(latitude, longitude, rng.uniform(0, 360), radius)
+
+
+def test_bounding_box_contains_every_point_on_the_circle():
+    misses = 0
+    for (latitude, longitude), radius, (lat, lng) in edge_points(200_000):
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius)
+        # The points are computed in floating point, so allow a micro-degree
+        misses += not (min_lat - 1e-9 <= lat <= max_lat + 1e-9 and min_lng - 1e-9 <= lng <= max_lng + 1e-9)
+    assert misses == 0
+
+
+def test_bounding_box_is_tight():
+    # The circle touches all four sides of its box
+    min_lat, max_lat, min_lng, max_lng = bounding_box(45.0, 10.0, 100)
+    assert max_lat - 45.0 == pytest.approx(100 / KM_PER_DEGREE_LAT)
+    widest = max(destination(45.0, 10.0, bearing / 10, 100)[1] for bearing in range(0, 1800))
+    assert max_lng == pytest.approx(widest, abs=1e-4)
+
+
+def test_bounding_box_clamps_at_the_antimeridian_and_poles():
+    min_lat, max_lat, min_lng, max_lng = bounding_box(10.0, 179.9, 50)
+    assert max_lng == 180.0
+    assert min_lng < 179.9
+    min_lat, max_lat, min_lng, max_lng = bounding_box(-10.0, -179.95, 50)
+    assert min_lng == -180.0
+    # A circle reaching over the pole spans every longitude
+    assert bounding_box(89.9, 0.0, 50) == (pytest.approx(89.9 - 50 / KM_PER_DEGREE_LAT), 90.0, -180.0, 180.0)
+
+
+def test_covering_ranges_contain_every_point_in_the_circle():
+    rng = random.Random(2)
+    for (latitude, longitude), radius, _ in edge_points(2000, seed=3):
+        ranges = covering_ranges(latitude, longitude, radius)
+        # On the edge and anywhere inside
+        lat, lng = destination(latitude, longitude, rng.uniform(0, 360), radius * rng.choice([0.999, rng.random()]))
+        geohash = encode_geohash(lat, lng)
+        assert any(low <= geohash < high for low, high in ranges), (latitude, longitude, radius, lat, lng)
+
+
+def test_covering_ranges_are_empty_for_the_whole_map():
+    assert covering_ranges(0.0, 0.0, 10000) == []
+
+
+def at(latitude, longitude):
+    return {'delivery_latitude': Decimal(f'{latitude:.6f}'), 'delivery_longitude': Decimal(f'{longitude:.6f}')}
+
+
+@pytest.mark.django_db
+def test_nearby_returns_lists_within_the_radius_closest_first(make_list):
+    centre = (40.0, -100.0)
+    distances = {'inside': 9.99, 'near': 2.0, 'outside': 10.01, 'far': 300.0}
+    names = {make_list(**at(*destination(*centre, 135, km))).pk: name for name, km in distances.items()}
+
+    results = list(ShoppingList.objects.nearby(*centre, 10))
+    assert [names[row.pk] for row in results] == ['near', 'inside']
+    assert results[1].distance == pytest.approx(9.99, abs=0.01)
+
+
+@pytest.mark.django_db
+def test_nearby_searches_up_to_the_antimeridian(make_list):
+    west = make_list(**at(*destination(10.0, 179.9, 270, 20)))
+    make_list(**at(*destination(10.0, 179.9, 270, 60)))
+    assert list(ShoppingList.objects.nearby(10.0, 179.9, 50)) == [west]
+
+
+def cursor(payload):
+    return urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@pytest.fixture
+def feed(make_list, client_user, auth_client):
+    """Seven lists, five of them created at the same instant"""
+    lists = [make_list(title=f'List {index}') for index in range(7)]
+    tie = timezone.now() - timedelta(hours=1)
+    ShoppingList.objects.filter(pk__in=[row.pk for row in lists[1:6]]).update(created_at=tie)
+    expected = list(ShoppingList.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+    return auth_client(client_user), expected
+
+
+def walk(api, url, link):
+    pages = []
+    while url:
+        body = api.get(url).json()
+        pages.append([row['id'] for row in body['results']])
+        url = body[link]
+    return pages
+
+
+@pytest.mark.django_db
+def test_cursor_pages_forward_and_back_through_ties(feed):
+    api, expected = feed
+    pages = walk(api, '/api/lists/my-lists/?page_size=2', 'next')
+    assert [row for page in pages for row in page] == expected
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+
+    # From the last page back to the first
+    last = api.get('/api/lists/my-lists/?page_size=2')
+    for _ in range(3):
+        last = api.get(last.json()['next'])
+    back = walk(api, last.json()['previous'], 'previous')
+    assert back == pages[-2::-1]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('value', [
+    cursor({'p': ['garbage', 1]}),
+    cursor({'p': ['2024-01-01T00:00:00+00:00', 'one']}),
+    cursor({'p': [{'created_at': 1}, 1]}),
+    cursor({'p': [None, 1]}),
+    cursor({'p': ['2024-01-01T00:00:00+00:00']}),
+    cursor(['2024-01-01T00:00:00+00:00', 1]),
+    'not base64!',
+])
+def test_tampered_cursor_is_not_found(feed, value):
+    api, _ = feed
+    response = api.get('/api/lists/my-lists/', {'cursor': value})
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
+def import_row(title, **fields):
+    now = timezone.now()
+    return {
+        'title': title, 'description': 'Weekly shop', 'store_name': 'Costco', 'store_address': '1 Main St',
+        'store_city': 'Denver', 'items': [], 'estimated_total': '50.00',
+        'preferred_delivery_time': (now + timedelta(days=2)).isoformat(),
+        'bidding_deadline': (now + timedelta(days=1)).isoformat(),
+        'delivery_latitude': '40.010000', 'delivery_longitude': '-100.010000',
+        'items_data': [{'name': f'{title} milk', 'quantity': 2}, {'name': f'{title} eggs', 'quantity': 12}],
+        **fields,
+    }
+
+
+IMPORT_ROWS = [
+    import_row('First'),
+    # Rejected by the item serializer, so neither it nor its items are written
+    import_row('Bad', items_data=[{'name': 'milk', 'quantity': 0}]),
+    import_row('Third'),
+]
+
+
+def as_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({
+            key: json.dumps(value) if isinstance(value, list) else value for key, value in row.items()
+        })
+    return buffer.getvalue()
+
+
+def as_ndjson(rows):
+    return '\n'.join(json.dumps(row) for row in rows) + '\n'
+
+
+def post_import(api, fmt):
+    if fmt == 'json':
+        return api.post('/api/lists/bulk/', IMPORT_ROWS, format='json')
+    if fmt == 'ndjson':
+        return api.post('/api/lists/bulk/', as_ndjson(IMPORT_ROWS), content_type='application/x-ndjson')
+    if fmt == 'csv':
+        return api.post('/api/lists/bulk/', as_csv(IMPORT_ROWS), content_type='text/csv')
+    name, body = {'multipart-csv': ('lists.csv', as_csv), 'multipart-ndjson': ('lists.ndjson', as_ndjson)}[fmt]
+    upload = SimpleUploadedFile(name, body(IMPORT_ROWS).encode())
+    return api.post('/api/lists/bulk/', {'file': upload}, format='multipart')
+
+
+def assert_imported(response):
+    assert response.status_code == 207, response.content
+    body = response.json()
+    assert (body['created'], body['failed']) == (2, 1)
+    first, bad, third = body['results']
+    assert bad == {'row': 1, 'status': 'invalid', 'errors': {'items_data': {'0': {'quantity': [
+        'Ensure this value is greater than or equal to 1.',
+    ]}}}}
+
+    created = {row.title: row for row in ShoppingList.objects.prefetch_related('items_structured')}
+    assert sorted(created) == ['First', 'Third']
+    assert (first['id'], third['id']) == (created['First'].pk, created['Third'].pk)
+    for title, shopping_list in created.items():
+        assert sorted(item.name for item in shopping_list.items_structured.all()) == [
+            f'{title} eggs', f'{title} milk',
+        ]
+    assert ShoppingListItem.objects.count() == 4
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('fmt', ['json', 'ndjson', 'csv', 'multipart-csv', 'multipart-ndjson'])
+def test_import_creates_valid_rows_and_reports_each_row(client_user, auth_client, fmt):
+    assert_imported(post_import(auth_client(client_user), fmt))
+
+
+@pytest.mark.django_db
+def test_import_recovers_ids_when_the_database_returns_none(monkeypatch, client_user, auth_client):
+    # As on MySQL: one INSERT for the lists and one for their items, not one per list
+    monkeypatch.setattr(type(connection.features), 'can_return_rows_from_bulk_insert', False)
+    with CaptureQueriesContext(connection) as queries:
+        response = post_import(auth_client(client_user), 'json')
+    assert_imported(response)
+    inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT')]
+    assert len(inserts) == 2
+
+
+@pytest.mark.django_db
+def test_import_with_no_valid_rows_creates_nothing(client_user, auth_client):
+    response = auth_client(client_user).post('/api/lists/bulk/', IMPORT_ROWS[1:2], format='json')
+    assert response.status_code == 400
+    assert response.json()['results'][0]['status'] == 'invalid'
+    assert not ShoppingList.objects.exists()
+
+
+def search(query):
+    return list(search_lists(ShoppingList.objects.all(), query).order_by('-rank', 'id'))
+
+
+@pytest.mark.django_db
+def test_search_matches_every_term_as_a_prefix(make_list):
+    milk = make_list(title='Milk and bread', description='', items=[{'name': 'sourdough'}])
+    eggs = make_list(title='Eggs', description='free range', store_name='Whole Foods', items=[])
+
+    assert search('milk') == [milk]
+    assert search('sour') == [milk]
+    assert search('EGG whole') == [eggs]
+    assert search('milk eggs') == []
+    assert search('!!') == []
+
+
+@pytest.mark.django_db
+def test_search_endpoint_ranks_open_lists(make_list, api_client):
+    make_list(title='Milk run')
+    make_list(title='Milk for the week', status='cancelled')
+    response = api_client.get('/api/lists/search/', {'q': 'milk'})
+    assert [row['title'] for row in response.json()['results']] == ['Milk run']
+    # No searchable terms
+    assert api_client.get('/api/lists/search/', {'q': '!!'}).json()['results'] == []
+
+
+@pytest.mark.django_db
+def test_search_ranks_more_relevant_lists_first(make_list):
+    once = make_list(title='Groceries', description='apples for the week and bread', items=[])
+    often = make_list(title='Apples', description='apples apples', items=[{'name': 'apples'}])
+    assert search('apples') == [often, once]
+    assert search('apples')[0].rank > search('apples')[1].rank
+
+
+@pytest.mark.django_db
+def test_search_follows_edits(make_list):
+    shopping_list = make_list(title='Milk run', description='')
+    shopping_list.title = 'Cheese run'
+    shopping_list.save()
+    assert search('cheese') == [shopping_list]
+    assert search('milk') == [shopping_list]  # still one of its items
+    shopping_list.items = []
+    shopping_list.save()
+    assert search('milk') == []
+    shopping_list.delete()
+    assert search('cheese') == []
+
+
+@pytest.mark.django_db
+def test_search_covers_structured_item_names(make_list, client_user, auth_client):
+    row = import_row('Party', items=[], items_data=[{'name': 'Prosecco', 'quantity': 6}])
+    response = auth_client(client_user).post('/api/lists/', row, format='json')
+    assert response.status_code == 201, response.content
+    imported = auth_client(client_user).post('/api/lists/bulk/', [
+        import_row('Picnic', items=[], items_data=[{'name': 'Lemonade', 'quantity': 2}]),
+    ], format='json')
+    assert imported.status_code == 201, imported.content
+    assert [row.title for row in search('prosecco')] == ['Party']
+    assert [row.title for row in search('lemon')] == ['Picnic']
+
+    # Edits to the items themselves, as from the admin
+    item = ShoppingListItem.objects.get(name='Lemonade')
+    item.name = 'Iced tea'
+    item.save()
+    assert search('lemon') == []
+    assert [row.title for row in search('iced')] == ['Picnic']
+    item.delete()
+    assert search('iced') == []
+
+
+@pytest.mark.parametrize('term,indexed', [
+    ('milk', True), ('egg', True), ('of', False), ('the', False), ('xl', False),
+])
+def test_mysql_search_checks_unindexed_terms_outside_the_index(term, indexed):
+    assert mysql_indexes(term) is indexed
+
+
+def aggregates(shopping_list):
+    shopping_list.refresh_from_db(fields=['active_bid_count', 'lowest_active_bid_amount', 'last_bid_at'])
+    return shopping_list.active_bid_count, shopping_list.lowest_active_bid_amount
+
+
+@pytest.mark.django_db
+def test_bid_aggregates_follow_every_bid_write(shopping_list, shopper_user, other_shopper, auth_client):
+    shopper_api, other_api = auth_client(shopper_user), auth_client(other_shopper)
+    assert aggregates(shopping_list) == (0, None)
+
+    def place(api, amount):
+        response = api.post('/api/bids/', {
+            'shopping_list': shopping_list.pk, 'amount': amount, 'estimated_time': 30, 'distance_to_store': '1.00',
+        }, format='json')
+        assert response.status_code == 201, response.content
+        return Bid.objects.get(shopping_list=shopping_list, amount=amount).pk
+
+    mine = place(shopper_api, '12.00')
+    assert aggregates(shopping_list) == (1, Decimal('12.00'))
+    first_bid_at = shopping_list.last_bid_at
+    theirs = place(other_api, '15.00')
+    assert aggregates(shopping_list) == (2, Decimal('12.00'))
+    assert shopping_list.last_bid_at >= first_bid_at
+
+    response = other_api.patch(f'/api/bids/{theirs}/update/', {'amount': '9.50'}, format='json')
+    assert response.status_code == 200, response.content
+    assert aggregates(shopping_list) == (2, Decimal('9.50'))
+
+    assert other_api.post(f'/api/bids/{theirs}/withdraw/').status_code == 200
+    assert aggregates(shopping_list) == (1, Decimal('12.00'))
+    assert shopper_api.post(f'/api/bids/{mine}/withdraw/').status_code == 200
+    assert aggregates(shopping_list) == (0, None)
+
+
+@pytest.mark.django_db
+def test_list_saves_leave_the_bid_aggregates_alone(shopping_list, shopper_user):
+    stale = ShoppingList.objects.get(pk=shopping_list.pk)
+    Bid.objects.create(
+        shopper=shopper_user, shopping_list=shopping_list, amount=Decimal('9.99'),
+        estimated_time=30, distance_to_store=Decimal('1.50'),
+    )
+    shopping_list.refresh_bid_aggregates()
+    # Loaded before the bid: saving it must not write the old counts back
+    stale.title = 'Renamed'
+    stale.save()
+    assert aggregates(shopping_list) == (1, Decimal('9.99'))
+
+    # A copy saved with pk=None is a new row
+    stale.pk = None
+    stale.save()
+    assert ShoppingList.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_reconcile_bid_aggregates_repairs_drift(make_list, shopper_user, capsys):
+    lists = [make_list(), make_list(), make_list(status='cancelled')]
+    for shopping_list, amount in zip(lists, ('5.00', '7.00', '9.00')):
+        Bid.objects.create(
+            shopper=shopper_user, shopping_list=shopping_list, amount=Decimal(amount),
+            estimated_time=30, distance_to_store=Decimal('1.00'),
+        )
+    # Written without the aggregates, then one bid removed behind their back
+    ShoppingList.objects.update(active_bid_count=5, lowest_active_bid_amount=Decimal('1.00'))
+    Bid.objects.filter(shopping_list=lists[1]).delete()
+
+    call_command('reconcile_bid_aggregates', '--batch-size', '1', '--status', 'open')
+    assert 'Reconciled bid aggregates on 2 lists.' in capsys.readouterr().out
+    assert [aggregates(row) for row in lists] == [(1, Decimal('5.00')), (0, None), (5, Decimal('1.00'))]
+
+
+@pytest.fixture
+def due_lists(make_list, shopper_user):
+    now = timezone.now()
+    past, future = now - timedelta(minutes=1), now + timedelta(hours=1)
+    rows = {
+        'due': [make_list(bidding_deadline=past) for _ in range(5)],
+        'not_due': make_list(bidding_deadline=future),
+        'expired_open': make_list(bidding_deadline=past, expires_at=past),
+        'expired_closed': make_list(bidding_deadline=past, status='bidding_closed', expires_at=past),
+        'assigned': make_list(bidding_deadline=past, status='assigned', expires_at=past),
+    }
+    Bid.objects.create(
+        shopper=shopper_user, shopping_list=rows['expired_closed'], amount=Decimal('8.00'),
+        estimated_time=30, distance_to_store=Decimal('1.00'),
+    )
+    ShoppingList.objects.refresh_bid_aggregates()
+    return rows
+
+
+def statuses(rows):
+    return [ShoppingList.objects.get(pk=row.pk).status for row in rows]
+
+
+@pytest.mark.django_db
+def test_close_due_bidding_closes_open_lists_past_their_deadline(due_lists):
+    # In batches of two, each its own transaction
+    assert ShoppingList.objects.close_due_bidding(batch_size=2) == 6
+    assert statuses(due_lists['due']) == ['bidding_closed'] * 5
+    assert statuses([due_lists['not_due'], due_lists['assigned']]) == ['open', 'assigned']
+    # Nothing is due twice
+    assert ShoppingList.objects.close_due_bidding() == 0
+
+
+@pytest.mark.django_db
+def test_expire_due_expires_unassigned_lists_and_their_bids(due_lists):
+    expired = [due_lists['expired_open'], due_lists['expired_closed']]
+    assert ShoppingList.objects.expire_due() == 2
+    assert statuses(expired) == ['expired', 'expired']
+    assert statuses([due_lists['assigned']]) == ['assigned']
+
+    bid = Bid.objects.get()
+    assert (bid.status, bid.is_active) == ('lost', False)
+    shopping_list = ShoppingList.objects.get(pk=due_lists['expired_closed'].pk)
+    assert (shopping_list.active_bid_count, shopping_list.lowest_active_bid_amount) == (0, None)
+    assert ShoppingList.objects.expire_due() == 0
+
+
+@pytest.mark.django_db
+def test_next_deadline_is_the_earliest_pending_one(due_lists):
+    assert ShoppingList.objects.next_deadline() == min(row.bidding_deadline for row in due_lists['due'])
+    ShoppingList.objects.close_due_bidding()
+    ShoppingList.objects.expire_due()
+    # The open list due in an hour; the closed ones expire in a month
+    assert ShoppingList.objects.next_deadline() == due_lists['not_due'].bidding_deadline
+    ShoppingList.objects.update(status='bidding_closed')
+    assert ShoppingList.objects.next_deadline() == min(
+        ShoppingList.objects.values_list('expires_at', flat=True)
+    )
+
+
+@pytest.mark.skipif(
+    not connection.features.has_select_for_update_skip_locked,
+    reason='needs SELECT ... FOR UPDATE SKIP LOCKED',
+)
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_sweeps_process_each_list_once(make_list):
+    past = timezone.now() - timedelta(minutes=1)
+    for _ in range(200):
+        make_list(bidding_deadline=past)
+    start = threading.Barrier(4)
+
+    def sweep():
+        start.wait()
+        try:
+            return ShoppingList.objects.close_due_bidding(batch_size=10)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(4) as pool:
+        totals = list(pool.map(lambda _: sweep(), range(4)))
+    assert sum(totals) == 200
+    assert not ShoppingList.objects.filter(status='open').exists()
+
+
+@pytest.mark.django_db
+def test_list_writes_retire_the_feed_and_the_lists_detail(
+    bumped, make_list, shopping_list, client_user, shopper_user, auth_client,
+):
+    namespaces = [FEED_NAMESPACE, list_namespace(shopping_list.pk)]
+    everything = set(namespaces)
+    shopper_api, client_api = auth_client(shopper_user), auth_client(client_user)
+    other = make_list()
+
+    def place_bid():
+        response = shopper_api.post('/api/bids/', {
+            'shopping_list': shopping_list.pk, 'amount': '12.00', 'estimated_time': 30, 'distance_to_store': '1.00',
+        }, format='json')
+        assert response.status_code == 201
+
+    def withdraw_bid():
+        bid = Bid.objects.get(shopping_list=shopping_list)
+        assert shopper_api.post(f'/api/bids/{bid.pk}/withdraw/').status_code == 200
+
+    def place_batch():
+        response = shopper_api.post('/api/bids/batch/', [{
+            'shopping_list': other.pk, 'amount': '8.00', 'estimated_time': 30, 'distance_to_store': '1.00',
+        }], format='json')
+        assert response.status_code in (200, 201), response.content
+
+    def item():
+        return ShoppingListItem.objects.create(shopping_list=shopping_list, name='tea', quantity=1)
+
+    writes = [
+        ('save', shopping_list.save, everything),
+        ('add item', item, everything),
+        ('edit item', lambda: ShoppingListItem.objects.get().save(), everything),
+        ('delete item', lambda: ShoppingListItem.objects.get().delete(), everything),
+        ('place bid', place_bid, everything),
+        ('withdraw bid', withdraw_bid, everything),
+        ('reconcile', lambda: call_command('reconcile_bid_aggregates', stdout=io.StringIO()), everything),
+        # Another list: the feed only
+        ('batch bid on another list', place_batch, {FEED_NAMESPACE}),
+        ('create', lambda: client_api.post('/api/lists/', import_row('New'), format='json'), {FEED_NAMESPACE}),
+        ('import', lambda: client_api.post('/api/lists/bulk/', [import_row('Bulk')], format='json'), {FEED_NAMESPACE}),
+        ('close bidding', lambda: ShoppingList.objects.close_due_bidding(timezone.now() + timedelta(days=1, hours=1)),
+         everything),
+        ('expire', lambda: ShoppingList.objects.expire_due(timezone.now() + timedelta(days=40)), everything),
+        ('delete', shopping_list.delete, everything),
+    ]
+    for label, write, expected in writes:
+        assert bumped(namespaces, write) == expected, label
+
+
+@pytest.mark.django_db
+def test_cached_feed_and_detail_are_served_until_a_write(shopping_list, api_client, django_capture_on_commit_callbacks):
+    urls = ['/api/lists/open/', f'/api/lists/public/{shopping_list.pk}/']
+    for url in urls:
+        assert api_client.get(url)['X-Cache'] == 'MISS'
+        assert api_client.get(url)['X-Cache'] == 'HIT'
+
+    ShoppingList.objects.filter(pk=shopping_list.pk).update(title='Stale')
+    # An UPDATE behind the ORM's back: still served from the cache
+    assert api_client.get(urls[1]).json()['title'] == 'Milk run'
+
+    shopping_list.refresh_from_db()
+    shopping_list.title = 'Renamed'
+    with django_capture_on_commit_callbacks(execute=True):
+        shopping_list.save()
+    for url in urls:
+        response = api_client.get(url)
+        assert response['X-Cache'] == 'MISS'
+    assert response.json()['title'] == 'Renamed'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('path', ['/api/lists/{pk}/', '/api/lists/{pk}/bids/', '/api/lists/my-lists/'])
+def test_conditional_get_answers_304_until_a_bid_changes_the_list(
+    path, shopping_list, client_user, shopper_user, auth_client, django_assert_max_num_queries,
+):
+    api, url = auth_client(client_user), path.format(pk=shopping_list.pk)
+    response = api.get(url)
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert response['Cache-Control'] == 'private, no-cache'
+    assert response['Last-Modified']
+
+    # Only the validator query: nothing is serialized
+    with django_assert_max_num_queries(1):
+        response = api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert not response.content
+    assert api.get(url, HTTP_IF_NONE_MATCH='"something-else"').status_code == 200
+
+    response = auth_client(shopper_user).post('/api/bids/', {
+        'shopping_list': shopping_list.pk, 'amount': '12.00', 'estimated_time': 30, 'distance_to_store': '1.00',
+    }, format='json')
+    assert response.status_code == 201
+    response = api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert api.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+
+@pytest.mark.django_db
+def test_empty_collection_has_an_etag_that_changes_with_the_first_list(make_list, client_user, auth_client):
+    api = auth_client(client_user)
+    etag = api.get('/api/lists/my-lists/')['ETag']
+    assert api.get('/api/lists/my-lists/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+    make_list()
+    assert api.get('/api/lists/my-lists/', HTTP_IF_NONE_MATCH=etag).status_code == 200
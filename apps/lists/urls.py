@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     # Client endpoints
     path('', views.ClientShoppingListCreateView.as_view(), name='create-list'),
+    path('bulk/', views.ClientShoppingListBulkCreateView.as_view(), name='bulk-create-lists'),
     path('my-lists/', views.ClientShoppingListView.as_view(), name='my-lists'),
     path('<int:pk>/', views.ClientShoppingListDetailView.as_view(), name='list-detail'),
     path('<int:pk>/bids/', views.ClientShoppingListBidsView.as_view(), name='list-bids'),
@@ -14,4 +15,5 @@ urlpatterns = [
     # Public endpoints
     path('open/', views.OpenShoppingListsView.as_view(), name='open-lists'),
     path('nearby/', views.NearbyShoppingListsView.as_view(), name='nearby-lists'),
+    path('search/', views.SearchShoppingListsView.as_view(), name='search-lists'),
 ]
\ No newline at end of file
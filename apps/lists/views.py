@@ -1,18 +1,35 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from django.utils import timezone
 from django.db.models import Q
 from .models import ShoppingList
 from .serializers import (
     ShoppingListSerializer, CreateShoppingListSerializer,
-    ShoppingListStatusUpdateSerializer, BidOnShoppingListSerializer
+    ShoppingListStatusUpdateSerializer, BidOnShoppingListSerializer, SHOPPING_LIST_PLAN
 )
 from .permissions import IsClient, IsListOwner, IsListOpenForBids
+from .search import search_lists
+from .parsers import CSVParser, NDJSONParser, parse_upload
+from .cache import FEED_NAMESPACE, list_namespace
+from .conditional import ConditionalGetMixin
+from .geo import MAX_SEARCH_RADIUS_KM
+from shopper.cache import CachedResponseMixin
+from shopper.dynamic_fields import SPARSE_FIELDS_PARAMETERS, SparseFieldsMixin
+from shopper.fastserializers import ValuesListMixin
+from shopper.optimizer import OptimizedQuerysetMixin
+from shopper.parsers import ORJSONParser
+from shopper.pagination import NewestFirstCursorPagination
 from apps.bids.models import Bid
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample, extend_schema_view
 from drf_spectacular.types import OpenApiTypes
 
+DEFAULT_SEARCH_RADIUS_KM = 10
+BULK_IMPORT_MAX_ROWS = 1000
+MAX_TOP_BIDS = 50
+
 @extend_schema_view(
     post=extend_schema(
         tags=['Shopping Lists'],
@@ -34,57 +51,147 @@ class ClientShoppingListCreateView(generics.CreateAPIView):
     def perform_create(self, serializer):
         serializer.save()
 
+@extend_schema(
+    tags=['Shopping Lists'],
+    summary="Bulk import shopping lists",
+    description=(
+        "Create many shopping lists in one request. Send a JSON array, NDJSON "
+        "(application/x-ndjson), CSV (text/csv, `items`/`items_data` cells as JSON) "
+        "or a multipart upload with a `file` field. Every row is validated; valid rows "
+        "are created and the response reports the outcome of each row. Returns 201 when "
+        "every row was created and 207 when some rows were rejected."
+    ),
+    request=CreateShoppingListSerializer(many=True),
+    responses={201: OpenApiTypes.OBJECT, 207: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+)
+
+class ClientShoppingListBulkCreateView(APIView):
+    """
+    POST /api/lists/bulk/
+    Create many shopping lists at once (Client only)
+    """
+    permission_classes = [permissions.IsAuthenticated, IsClient]
+    parser_classes = [ORJSONParser, NDJSONParser, CSVParser, MultiPartParser]
+    
+    def post(self, request):
+        rows = request.data
+        if 'file' in request.FILES:
+            rows = parse_upload(request.FILES['file'])
+        
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {'error': 'Expected a non-empty list of shopping lists'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > BULK_IMPORT_MAX_ROWS:
+            return Response(
+                {'error': f'At most {BULK_IMPORT_MAX_ROWS} lists can be imported per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Validate every row up front, then write the valid ones in bulk
+        context = self.get_serializer_context()
+        report = []
+        valid_rows = []
+        for index, row in enumerate(rows):
+            serializer = CreateShoppingListSerializer(
+                data=row if isinstance(row, dict) else {}, context=context
+            )
+            if serializer.is_valid():
+                valid_rows.append(serializer.validated_data)
+                report.append({'row': index, 'status': 'created'})
+            else:
+                report.append({'row': index, 'status': 'invalid', 'errors': serializer.errors})
+        
+        created = CreateShoppingListSerializer.bulk_create(request.user, valid_rows)
+        created_reports = (entry for entry in report if entry['status'] == 'created')
+        for entry, shopping_list in zip(created_reports, created):
+            entry['id'] = shopping_list.id
+        
+        if not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(created) < len(rows):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        
+        return Response({
+            'created': len(created),
+            'failed': len(rows) - len(created),
+            'results': report,
+        }, status=response_status)
+    
+    def get_serializer_context(self):
+        return {'request': self.request, 'view': self}
+
 @extend_schema_view(
     get=extend_schema(
         tags=['Shopping Lists'],
         summary="Get my shopping lists",
         description="Get all shopping lists created by the authenticated client.",
+        parameters=SPARSE_FIELDS_PARAMETERS,
         responses={200: ShoppingListSerializer(many=True)},
     )
 )
 
-class ClientShoppingListView(generics.ListAPIView):
+class ClientShoppingListView(ConditionalGetMixin, SparseFieldsMixin, generics.ListAPIView):
     """
     GET /api/lists/
     Get all shopping lists created by the authenticated client
     """
     serializer_class = ShoppingListSerializer
+    values_plan = SHOPPING_LIST_PLAN
     permission_classes = [permissions.IsAuthenticated, IsClient]
+    query_budget = 4
+    pagination_class = NewestFirstCursorPagination
+    validate_empty = True
     
     def get_queryset(self):
-        return ShoppingList.objects.filter(
-            client=self.request.user
-        ).select_related('client').prefetch_related('bids').order_by('-created_at')
+        return ShoppingList.objects.filter(client=self.request.user).order_by('-created_at', '-id')
     
 @extend_schema_view(
     get=extend_schema(
         tags=['Shopping Lists'],
         summary="Get shopping list details",
         description="Get detailed information about a specific shopping list.",
+        parameters=SPARSE_FIELDS_PARAMETERS,
         responses={200: ShoppingListSerializer},
     )
 )
 
-class PublicShoppingListDetailView(generics.RetrieveAPIView):
+class PublicShoppingListDetailView(CachedResponseMixin, SparseFieldsMixin, generics.RetrieveAPIView):
     """
     Public endpoint for viewing any shopping list
     No authentication required
     """
     serializer_class = ShoppingListSerializer
+    values_plan = SHOPPING_LIST_PLAN
     permission_classes = [permissions.AllowAny]
+    query_budget = 4
     queryset = ShoppingList.objects.all()
     lookup_field = 'pk'
+    cache_name = 'public-list-detail'
+    
+    def get_cache_namespaces(self):
+        return [list_namespace(self.kwargs['pk'])]
 
-class ClientShoppingListDetailView(generics.RetrieveAPIView):
+class ClientShoppingListDetailView(ConditionalGetMixin, SparseFieldsMixin, generics.RetrieveAPIView):
     """
     GET /api/lists/{id}/
     Get detailed information about a specific shopping list
     """
     serializer_class = ShoppingListSerializer
+    values_plan = SHOPPING_LIST_PLAN
     permission_classes = [permissions.AllowAny]
+    query_budget = 4
     queryset = ShoppingList.objects.all()
     lookup_field = 'pk'
     
+    def get_validator_queryset(self):
+        if not self.request.user.is_authenticated:
+            return None
+        return ShoppingList.objects.filter(pk=self.kwargs['pk'], client=self.request.user)
+    
     def get_queryset(self):
         return ShoppingList.objects.filter(client=self.request.user)
     
@@ -98,32 +205,70 @@ class ClientShoppingListDetailView(generics.RetrieveAPIView):
     get=extend_schema(
         tags=['Shopping Lists'],
         summary="Get bids on a list",
-        description="Get all bids for a specific shopping list. Only the client who created the list can view bids.",
+        description="Get all bids for a specific shopping list. Only the client who created the list can view bids. Use `sort=score` to rank bids by best value (price, shopper rating and experience, distance and speed) and `top` to get only the N best.",
+        parameters=[
+            OpenApiParameter(name='sort', description='`amount` (default) or `score` (best value first)', required=False, type=str),
+            OpenApiParameter(name='top', description=f'Return only the first N bids, unpaginated (max {MAX_TOP_BIDS})', required=False, type=int),
+        ],
         responses={200: BidOnShoppingListSerializer(many=True)},
     )
 )
 
-class ClientShoppingListBidsView(generics.ListAPIView):
+class ClientShoppingListBidsView(ConditionalGetMixin, OptimizedQuerysetMixin, generics.ListAPIView):
     """
     GET /api/lists/{id}/bids/
     Get all bids for a specific shopping list (Client only)
     """
     serializer_class = BidOnShoppingListSerializer
     permission_classes = [permissions.IsAuthenticated, IsClient, IsListOwner]
+    query_budget = 4
+    
+    def get_validator_queryset(self):
+        return ShoppingList.objects.filter(pk=self.kwargs['pk'], client=self.request.user)
     
     def get_queryset(self):
         shopping_list_id = self.kwargs['pk']
-        return Bid.objects.filter(
+        queryset = Bid.objects.filter(
             shopping_list_id=shopping_list_id,
             is_active=True
-        ).select_related('shopper').order_by('amount')
+        )
+        
+        sort = self.request.query_params.get('sort', 'amount')
+        if sort == 'score':
+            # Served from the (shopping_list, score) index
+            queryset = queryset.order_by('score', 'id')
+        elif sort == 'amount':
+            queryset = queryset.order_by('amount')
+        else:
+            raise ValidationError({'error': "sort must be 'amount' or 'score'"})
+        
+        top = self.get_top()
+        return queryset[:top] if top else queryset
+    
+    def get_top(self):
+        top = self.request.query_params.get('top')
+        if top is None:
+            return None
+        try:
+            top = int(top)
+        except ValueError:
+            raise ValidationError({'error': 'top must be a whole number'})
+        if not 0 < top <= MAX_TOP_BIDS:
+            raise ValidationError({'error': f'top must be between 1 and {MAX_TOP_BIDS}'})
+        return top
+    
+    def paginate_queryset(self, queryset):
+        # A top-N request is already bounded
+        if self.get_top():
+            return None
+        return super().paginate_queryset(queryset)
     
 
 @extend_schema(
     tags=['Shopping Lists'],
     summary="Accept a bid",
-    description="Accept a bid and assign the shopper to the shopping list.",
-    responses={200: ShoppingListSerializer},
+    description="Accept a bid and assign the shopper to the shopping list. Accepting the already accepted bid again returns the list unchanged; accepting a different bid once one has won returns 409.",
+    responses={200: ShoppingListSerializer, 409: OpenApiTypes.OBJECT},
 )
 
 class ClientAcceptBidView(APIView):
@@ -135,15 +280,18 @@ class ClientAcceptBidView(APIView):
     
     def post(self, request, pk, bid_id):
         try:
-            shopping_list = ShoppingList.objects.get(id=pk, client=request.user)
-            bid = Bid.objects.get(id=bid_id, shopping_list=shopping_list, is_active=True)
+            shopping_list = ShoppingList.objects.select_related('client').get(id=pk, client=request.user)
+            # Lost and withdrawn bids too: accepting one is a conflict, not a 404
+            bid = Bid.objects.get(id=bid_id, shopping_list=shopping_list)
         except (ShoppingList.DoesNotExist, Bid.DoesNotExist):
             return Response(
                 {'error': 'Shopping list or bid not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Mark this bid as won and close other bids
+        # Mark this bid as won and close other bids. mark_as_won() updates
+        # this instance in place, so the response reflects the new state.
+        bid.shopping_list = shopping_list
         bid.mark_as_won()
         
         serializer = ShoppingListSerializer(shopping_list)
@@ -177,60 +325,109 @@ class ClientUpdateListStatusView(generics.UpdateAPIView):
     get=extend_schema(
         tags=['Public'],
         summary="Get open shopping lists",
-        description="Get all shopping lists that are currently open for bidding. Public endpoint - no authentication required.",
+        description="Get all shopping lists that are currently open for bidding, newest first. Results are cursor paginated: follow the `next` link to load more. Public endpoint - no authentication required.",
+        parameters=SPARSE_FIELDS_PARAMETERS,
         responses={200: ShoppingListSerializer(many=True)},
     )
 )
 
-class OpenShoppingListsView(generics.ListAPIView):
+class OpenShoppingListsView(CachedResponseMixin, SparseFieldsMixin, ValuesListMixin, generics.ListAPIView):
     """
     GET /api/lists/open/
     Get all open shopping lists (public, for shoppers to browse)
     """
     serializer_class = ShoppingListSerializer
+    values_plan = SHOPPING_LIST_PLAN
     permission_classes = [permissions.AllowAny]  # Anyone can browse open lists
+    query_budget = 4
+    pagination_class = NewestFirstCursorPagination
+    cache_name = 'open-lists'
+    cache_timeout = 60  # Bounds how long a list past its deadline can linger
+    
+    def get_cache_namespaces(self):
+        return [FEED_NAMESPACE]
     
     def get_queryset(self):
-        now = timezone.now()
-        return ShoppingList.objects.filter(
-            status='open',
-            bidding_deadline__gt=now
-        ).select_related('client').order_by('-created_at')[:50]  # Limit to 50 most recent
+        return ShoppingList.objects.open_for_bids().order_by('-created_at', '-id')
     
 @extend_schema_view(
     get=extend_schema(
         tags=['Public'],
         summary="Get nearby shopping lists",
-        description="Get open shopping lists near a specified location.",
+        description="Get open shopping lists within a radius of a location, sorted by distance.",
         parameters=[
             OpenApiParameter(name='lat', description='Latitude', required=True, type=float),
             OpenApiParameter(name='lng', description='Longitude', required=True, type=float),
-            OpenApiParameter(name='radius', description='Search radius in miles/km', required=False, type=float),
+            OpenApiParameter(name='radius', description='Search radius in km (default 10, max 200)', required=False, type=float),
+            *SPARSE_FIELDS_PARAMETERS,
         ],
         responses={200: ShoppingListSerializer(many=True)},
     )
 )
 
-class NearbyShoppingListsView(generics.ListAPIView):
+class NearbyShoppingListsView(SparseFieldsMixin, generics.ListAPIView):
     """
     GET /api/lists/nearby/?lat={lat}&lng={lng}&radius={radius}
-    Get open shopping lists near a location
+    Get open shopping lists near a location, closest first
     """
     serializer_class = ShoppingListSerializer
+    values_plan = SHOPPING_LIST_PLAN
     permission_classes = [permissions.AllowAny]
+    query_budget = 5
     
     def get_queryset(self):
         lat = self.request.query_params.get('lat')
         lng = self.request.query_params.get('lng')
-        radius = self.request.query_params.get('radius', 10)  # Default 10 miles/km
+        radius = self.request.query_params.get('radius', DEFAULT_SEARCH_RADIUS_KM)
         
         if not lat or not lng:
             return ShoppingList.objects.none()
         
-        # Note: In production, use PostGIS for proper distance calculations
-        # This is a simplified version
-        now = timezone.now()
-        return ShoppingList.objects.filter(
-            status='open',
-            bidding_deadline__gt=now
-        ).select_related('client').order_by('-created_at')[:50]
\ No newline at end of file
+        try:
+            lat, lng, radius = float(lat), float(lng), float(radius)
+        except ValueError:
+            raise ValidationError({'error': 'lat, lng and radius must be numbers'})
+        
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius <= 0:
+            raise ValidationError({'error': 'Coordinates or radius out of range'})
+        
+        return ShoppingList.objects.open_for_bids().nearby(
+            lat, lng, min(radius, MAX_SEARCH_RADIUS_KM)
+        )
+
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=['Public'],
+        summary="Search open shopping lists",
+        description="Full-text search over the title, description, store and items of open shopping lists. Every term must match (as a prefix); results are ordered by relevance.",
+        parameters=[
+            OpenApiParameter(name='q', description='Search terms, e.g. "milk costco"', required=True, type=str),
+            OpenApiParameter(name='city', description='Only lists in this store city', required=False, type=str),
+            *SPARSE_FIELDS_PARAMETERS,
+        ],
+        responses={200: ShoppingListSerializer(many=True)},
+    )
+)
+
+class SearchShoppingListsView(SparseFieldsMixin, generics.ListAPIView):
+    """
+    GET /api/lists/search/?q={terms}
+    Relevance-ranked full-text search over open shopping lists
+    """
+    serializer_class = ShoppingListSerializer
+    values_plan = SHOPPING_LIST_PLAN
+    permission_classes = [permissions.AllowAny]
+    query_budget = 5
+    
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            return ShoppingList.objects.none()
+        
+        queryset = ShoppingList.objects.open_for_bids()
+        city = self.request.query_params.get('city')
+        if city:
+            queryset = queryset.filter(store_city__iexact=city)
+        
+        return search_lists(queryset, query).order_by('-rank', 'id')
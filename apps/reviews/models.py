@@ -64,4 +64,8 @@ class Review(models.Model):
         from django.db.models import Avg
         avg_rating = Review.objects.filter(reviewee=self.reviewee).aggregate(Avg('rating'))
         self.reviewee.average_rating = avg_rating['rating__avg'] or 0
-        self.reviewee.save()
\ No newline at end of file
+        self.reviewee.save()
+        
+        # Bid ranking depends on the shopper's rating
+        from apps.bids.models import Bid
+        Bid.objects.filter(shopper=self.reviewee, is_active=True).refresh_scores()
\ No newline at end of file
@@ -1,3 +1,44 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+import pytest
+
+from apps.bids.models import Bid
+from apps.bids.scoring import bid_score
+from apps.lists.models import ShoppingList
+from apps.reviews.models import Review
+
+pytestmark = pytest.mark.django_db
+
+
+def bid(shopper, shopping_list, **fields):
+    return Bid.objects.create(
+        shopper=shopper, shopping_list=shopping_list, amount=Decimal('10.00'),
+        estimated_time=30, distance_to_store=Decimal('2.00'), **fields,
+    )
+
+
+def test_review_rescores_the_reviewees_active_bids_only(make_list, client_user, shopper_user, other_shopper):
+    reviewed_list = make_list(status='completed', selected_shopper=shopper_user)
+    open_list, closed_list = make_list(), make_list()
+    active = bid(shopper_user, open_list)
+    inactive = bid(shopper_user, closed_list, status='withdrawn', is_active=False)
+    others = bid(other_shopper, open_list)
+    before = {row.pk: row for row in Bid.objects.all()}
+    # Scored from the row as it is when the review lands
+    Bid.objects.filter(pk=active.pk).update(amount=Decimal('8.00'))
+
+    Review.objects.create(reviewer=client_user, reviewee=shopper_user, shopping_list=reviewed_list, rating=5)
+
+    active.refresh_from_db()
+    assert active.score == pytest.approx(bid_score(
+        Decimal('8.00'), open_list.estimated_total, 5.0, 0, active.distance_to_store, active.estimated_time,
+    ))
+    assert active.score != before[active.pk].score
+    assert active.updated_at > before[active.pk].updated_at
+    for untouched in (inactive, others):
+        untouched.refresh_from_db()
+        assert (untouched.score, untouched.updated_at) == (before[untouched.pk].score, before[untouched.pk].updated_at)
+
+    # Conditional GETs on the rescored list see a change; the other list does not
+    assert ShoppingList.objects.get(pk=open_list.pk).last_bid_at is not None
+    assert ShoppingList.objects.get(pk=closed_list.pk).last_bid_at is None
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class TransactionsConfig(AppConfig):
     name = 'apps.transactions'
+    
+    def ready(self):
+        from .ledger import post_on_payout_save, post_on_transaction_save
+        
+        # Keep the shopper ledger in step with money changing state
+        post_save.connect(post_on_transaction_save, sender='transactions.Transaction')
+        post_save.connect(post_on_payout_save, sender='transactions.Payout')
@@ -0,0 +1,207 @@
+"""
+Posting transactions and payouts to the shopper ledger.
+
+A completed transaction owes its shopper_payout to the bid's shopper and
+adds its bid_amount to their GMV; a completed payout pays its amount out.
+Whenever either row is saved, the entries already posted for it are
+compared with what it should contribute in its current state and the
+difference is appended as a new entry, so saving twice posts nothing and
+a refund or failed payout posts a reversal. Appends for one shopper are
+serialized by locking their ShopperBalance row.
+
+Posting and rebuild_ledger date entries by the same rule: a transaction
+or payout counts from when it completed (completed_at, else created_at).
+Reversals and corrections count from when they are posted. An entry is
+never dated before the shopper's previous one, so their running totals
+stay in date order.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from .models import LedgerEntry, Payout, ShopperBalance, Transaction
+
+ZERO = Decimal('0')
+
+
+def _lock_balance(shopper_id):
+    """Lock the shopper's balance row, creating it on their first entry"""
+    balance = ShopperBalance.objects.select_for_update().filter(shopper_id=shopper_id).first()
+    if balance is None:
+        try:
+            with transaction.atomic():
+                ShopperBalance.objects.create(shopper_id=shopper_id)
+        except IntegrityError:
+            # Created by a concurrent first entry
+            pass
+        balance = ShopperBalance.objects.select_for_update().get(shopper_id=shopper_id)
+    return balance
+
+
+def completion_time(completed_at, created_at):
+    """When a completed transaction or payout enters the ledger"""
+    return completed_at or created_at
+
+
+def _append(balance, kind, amount, gmv=ZERO, at=None, **source):
+    """Apply a change to the locked balance and record it as an entry dated `at` (default now)"""
+    at = at or timezone.now()
+    if balance.last_entry_id:
+        latest = LedgerEntry.objects.filter(pk=balance.last_entry_id).values_list('created_at', flat=True).first()
+        if latest is not None and at < latest:
+            at = latest
+    balance.balance += amount
+    if kind in LedgerEntry.EARNING_KINDS:
+        balance.total_earned += amount
+    else:
+        balance.total_paid_out -= amount
+    balance.total_gmv += gmv
+
+    entry = LedgerEntry.objects.create(
+        shopper_id=balance.shopper_id, kind=kind, amount=amount, gmv=gmv,
+        balance=balance.balance, total_earned=balance.total_earned,
+        total_paid_out=balance.total_paid_out, total_gmv=balance.total_gmv,
+        created_at=at, **source
+    )
+    balance.entry_count += 1
+    balance.last_entry = entry
+    balance.save()
+    return entry
+
+
+def _posted(source):
+    return LedgerEntry.objects.filter(**source).aggregate(
+        amount=Sum('amount', default=ZERO), gmv=Sum('gmv', default=ZERO)
+    )
+
+
+def post_transaction(txn):
+    """Bring the ledger in line with this transaction's current state"""
+    completed = txn.status == 'completed'
+    target_amount = txn.shopper_payout if completed else ZERO
+    target_gmv = txn.bid_amount if completed else ZERO
+
+    posted = _posted({'transaction': txn})
+    if posted['amount'] == target_amount and posted['gmv'] == target_gmv:
+        return None
+
+    from apps.bids.models import Bid
+
+    shopper_id = Bid.objects.filter(pk=txn.bid_id).values_list('shopper_id', flat=True).get()
+    with transaction.atomic():
+        balance = _lock_balance(shopper_id)
+        # Re-read under the lock: a concurrent save may have posted already
+        posted = _posted({'transaction': txn})
+        amount = Decimal(target_amount) - posted['amount']
+        gmv = Decimal(target_gmv) - posted['gmv']
+        if not amount and not gmv:
+            return None
+        kind = 'earning' if amount >= 0 else 'earning_reversal'
+        at = None
+        if completed and not posted['amount'] and not posted['gmv']:
+            at = completion_time(txn.completed_at, txn.created_at)
+        return _append(balance, kind, amount, gmv, at, transaction=txn)
+
+
+def post_payout(payout):
+    """Bring the ledger in line with this payout's current state"""
+    target_amount = -Decimal(payout.amount) if payout.status == 'completed' else ZERO
+
+    posted = _posted({'payout': payout})
+    if posted['amount'] == target_amount:
+        return None
+
+    with transaction.atomic():
+        balance = _lock_balance(payout.shopper_id)
+        posted = _posted({'payout': payout})
+        amount = target_amount - posted['amount']
+        if not amount:
+            return None
+        kind = 'payout' if amount < 0 else 'payout_reversal'
+        at = None
+        if payout.status == 'completed' and not posted['amount']:
+            at = completion_time(payout.completed_at, payout.created_at)
+        return _append(balance, kind, amount, at=at, payout=payout)
+
+
+def post_on_transaction_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        post_transaction(instance)
+
+
+def post_on_payout_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        post_payout(instance)
+
+
+def rebuild_ledger(shopper_ids):
+    """
+    Replace these shoppers' entries and balances with a replay of their
+    completed transactions and payouts, in the order they completed.
+    Returns the number of entries written.
+    """
+    from apps.bids.cache import invalidate_dashboards
+
+    shopper_ids = list(shopper_ids)
+    with transaction.atomic():
+        # Take the balance locks so live postings wait for the replay
+        list(ShopperBalance.objects.select_for_update().filter(shopper_id__in=shopper_ids).values_list('pk'))
+
+        events = {shopper_id: [] for shopper_id in shopper_ids}
+        transactions = Transaction.objects.filter(
+            status='completed', bid__shopper_id__in=shopper_ids
+        ).values('id', 'bid__shopper_id', 'shopper_payout', 'bid_amount', 'completed_at', 'created_at')
+        for row in transactions:
+            events[row['bid__shopper_id']].append((
+                completion_time(row['completed_at'], row['created_at']), 'earning',
+                row['shopper_payout'], row['bid_amount'], {'transaction_id': row['id']},
+            ))
+        payouts = Payout.objects.filter(
+            status='completed', shopper_id__in=shopper_ids
+        ).values('id', 'shopper_id', 'amount', 'completed_at', 'created_at')
+        for row in payouts:
+            events[row['shopper_id']].append((
+                completion_time(row['completed_at'], row['created_at']), 'payout',
+                -row['amount'], ZERO, {'payout_id': row['id']},
+            ))
+
+        ShopperBalance.objects.filter(shopper_id__in=shopper_ids).delete()
+        LedgerEntry.objects.filter(shopper_id__in=shopper_ids).delete()
+
+        entries = []
+        balances = []
+        for shopper_id, shopper_events in events.items():
+            if not shopper_events:
+                continue
+            balance = ShopperBalance(shopper_id=shopper_id)
+            for at, kind, amount, gmv, source in sorted(shopper_events, key=lambda event: event[0]):
+                balance.balance += amount
+                if kind == 'earning':
+                    balance.total_earned += amount
+                else:
+                    balance.total_paid_out -= amount
+                balance.total_gmv += gmv
+                balance.entry_count += 1
+                entries.append(LedgerEntry(
+                    shopper_id=shopper_id, kind=kind, amount=amount, gmv=gmv,
+                    balance=balance.balance, total_earned=balance.total_earned,
+                    total_paid_out=balance.total_paid_out, total_gmv=balance.total_gmv,
+                    created_at=at, **source
+                ))
+            balances.append(balance)
+
+        LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+        ShopperBalance.objects.bulk_create(balances, batch_size=1000)
+        # bulk_create cannot return ids on every backend, so link each
+        # balance to its newest entry afterwards
+        ShopperBalance.objects.filter(shopper_id__in=shopper_ids).update(
+            last_entry=Subquery(
+                LedgerEntry.objects.filter(
+                    shopper_id=OuterRef('shopper_id')
+                ).order_by('-created_at', '-id').values('id')[:1]
+            )
+        )
+        invalidate_dashboards(shopper_ids)
+    return len(entries)
@@ -0,0 +1,108 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q, Sum
+
+from apps.transactions.models import LedgerEntry, Payout, ShopperBalance, Transaction
+
+User = get_user_model()
+
+ZERO = Decimal('0')
+
+
+class Command(BaseCommand):
+    help = (
+        "Check shopper balances against their ledger entries and against the "
+        "raw transaction and payout rows. Exits with an error if any drifted; "
+        "fix drift with rebuild_ledger."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shopper', type=int, action='append', dest='shoppers',
+                            help='Only check this shopper (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Shoppers checked per round of queries')
+
+    def handle(self, *args, **options):
+        if options['shoppers']:
+            shopper_ids = sorted(set(options['shoppers']))
+        else:
+            shopper_ids = list(User.objects.filter(
+                Q(bids__transaction__isnull=False) | Q(payouts__isnull=False)
+                | Q(ledger_entries__isnull=False) | Q(balance__isnull=False)
+            ).order_by('id').values_list('id', flat=True).distinct())
+
+        batch_size = options['batch_size']
+        failures = []
+        for start in range(0, len(shopper_ids), batch_size):
+            failures += self.check_batch(shopper_ids[start:start + batch_size])
+
+        for failure in failures:
+            self.stdout.write(self.style.ERROR(f'FAIL: {failure}'))
+        if failures:
+            raise CommandError(f'{len(failures)} ledger inconsistencies; run rebuild_ledger to fix them.')
+        self.stdout.write(self.style.SUCCESS(f'Ledger consistent for {len(shopper_ids)} shoppers.'))
+
+    def check_batch(self, shopper_ids):
+        # What the raw rows say each shopper is owed
+        expected = defaultdict(lambda: {'total_earned': ZERO, 'total_paid_out': ZERO, 'total_gmv': ZERO})
+        for row in Transaction.objects.filter(status='completed', bid__shopper_id__in=shopper_ids).values(
+            'bid__shopper_id'
+        ).annotate(earned=Sum('shopper_payout'), gmv=Sum('bid_amount')).order_by():
+            expected[row['bid__shopper_id']]['total_earned'] = row['earned']
+            expected[row['bid__shopper_id']]['total_gmv'] = row['gmv']
+        for row in Payout.objects.filter(status='completed', shopper_id__in=shopper_ids).values(
+            'shopper_id'
+        ).annotate(paid=Sum('amount')).order_by():
+            expected[row['shopper_id']]['total_paid_out'] = row['paid']
+
+        # What the entries add up to
+        ledger = {
+            row['shopper_id']: row
+            for row in LedgerEntry.objects.filter(shopper_id__in=shopper_ids).values('shopper_id').annotate(
+                total_earned=Sum('amount', filter=Q(kind__in=LedgerEntry.EARNING_KINDS), default=ZERO),
+                total_paid_out=-Sum('amount', filter=Q(kind__in=LedgerEntry.PAYOUT_KINDS), default=ZERO),
+                total_gmv=Sum('gmv', default=ZERO),
+                entry_count=Count('id'),
+            ).order_by()
+        }
+
+        balances = {
+            balance.shopper_id: balance
+            for balance in ShopperBalance.objects.filter(shopper_id__in=shopper_ids).select_related('last_entry')
+        }
+
+        failures = []
+        for shopper_id in shopper_ids:
+            want = expected[shopper_id]
+            want['balance'] = want['total_earned'] - want['total_paid_out']
+            entries = ledger.get(shopper_id)
+            balance = balances.get(shopper_id)
+
+            if balance is None:
+                if entries or any(want.values()):
+                    failures.append(f'shopper {shopper_id} has no balance snapshot')
+                continue
+
+            for field, value in want.items():
+                if getattr(balance, field) != value:
+                    failures.append(
+                        f'shopper {shopper_id} {field} is {getattr(balance, field)} '
+                        f'but the transactions and payouts add up to {value}'
+                    )
+            for field in ('total_earned', 'total_paid_out', 'total_gmv', 'entry_count'):
+                value = entries[field] if entries else 0
+                if getattr(balance, field) != value:
+                    failures.append(
+                        f'shopper {shopper_id} {field} is {getattr(balance, field)} '
+                        f'but the ledger entries add up to {value}'
+                    )
+            last = balance.last_entry
+            if balance.entry_count and (last is None or any(
+                getattr(last, field) != getattr(balance, field)
+                for field in ('balance', 'total_earned', 'total_paid_out', 'total_gmv')
+            )):
+                failures.append(f'shopper {shopper_id} balance does not match their latest ledger entry')
+        return failures
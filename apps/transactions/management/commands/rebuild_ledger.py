@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.transactions.ledger import rebuild_ledger
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Replace shopper ledger entries and balances with a replay of their "
+        "completed transactions and payouts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shopper', type=int, action='append', dest='shoppers',
+                            help='Only rebuild this shopper (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Shoppers rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        if options['shoppers']:
+            shopper_ids = sorted(set(options['shoppers']))
+        else:
+            # Everyone with money rows or a ledger to clear
+            shopper_ids = list(User.objects.filter(
+                Q(bids__transaction__isnull=False) | Q(payouts__isnull=False)
+                | Q(ledger_entries__isnull=False)
+            ).order_by('id').values_list('id', flat=True).distinct())
+
+        batch_size = options['batch_size']
+        written = 0
+        for start in range(0, len(shopper_ids), batch_size):
+            written += rebuild_ledger(shopper_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the ledger of {len(shopper_ids)} shoppers ({written} entries).'
+        ))
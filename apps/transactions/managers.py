@@ -0,0 +1,28 @@
+from decimal import Decimal
+
+from django.db import models
+
+TOTAL_FIELDS = ('balance', 'total_earned', 'total_paid_out', 'total_gmv')
+
+
+class LedgerEntryQuerySet(models.QuerySet):
+    """
+    Ledger entries for one shopper at a time: filter by shopper first so the
+    (shopper, created_at, id) index serves every lookup below.
+    """
+
+    def snapshot_before(self, at):
+        """Running totals just before `at`: the latest earlier entry, or zeros"""
+        totals = self.filter(created_at__lt=at).order_by('-created_at', '-id').values(*TOTAL_FIELDS).first()
+        return totals or {field: Decimal('0') for field in TOTAL_FIELDS}
+
+    def period_totals(self, start, end):
+        """Earnings, payouts and GMV between start (inclusive) and end (exclusive)"""
+        before = self.snapshot_before(start)
+        after = self.snapshot_before(end)
+        return {
+            'earned': after['total_earned'] - before['total_earned'],
+            'paid_out': after['total_paid_out'] - before['total_paid_out'],
+            'gmv': after['total_gmv'] - before['total_gmv'],
+            'balance_change': after['balance'] - before['balance'],
+        }
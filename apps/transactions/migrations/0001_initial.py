@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('bids', '0003_bid_score'),
+        ('lists', '0007_deadline_sweep_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bid_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('platform_fee', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('shopper_payout', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_charged', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payment_method', models.CharField(max_length=50)),
+                ('payment_intent_id', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded'), ('disputed', 'Disputed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('bid', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='transaction', to='bids.bid')),
+                ('shopping_list', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='transaction', to='lists.shoppinglist')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Payout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('stripe_payout_id', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('shopper', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payouts', to=settings.AUTH_USER_MODEL)),
+                ('transaction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='payout', to='transactions.transaction')),
+            ],
+        ),
+    ]
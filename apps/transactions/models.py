@@ -1,6 +1,11 @@
+from decimal import Decimal
+
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator
+from django.utils import timezone
+
+from .managers import LedgerEntryQuerySet
 
 class Transaction(models.Model):
     STATUS_CHOICES = (
@@ -73,4 +78,90 @@ class Payout(models.Model):
     stripe_payout_id = models.CharField(max_length=255, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
-    completed_at = models.DateTimeField(null=True, blank=True)
\ No newline at end of file
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+class LedgerEntry(models.Model):
+    """
+    Append-only record of every change to a shopper's earnings and payouts.
+
+    Each entry carries the shopper's running totals after it was applied, so
+    the balance at any point in time is the latest entry before it.
+    """
+    KIND_CHOICES = (
+        ('earning', 'Earning'),
+        ('earning_reversal', 'Earning reversal'),
+        ('payout', 'Payout'),
+        ('payout_reversal', 'Payout reversal'),
+    )
+    EARNING_KINDS = ('earning', 'earning_reversal')
+    PAYOUT_KINDS = ('payout', 'payout_reversal')
+    
+    shopper = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='ledger_entries'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Entries outlive the rows that caused them
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='ledger_entries'
+    )
+    payout = models.ForeignKey(
+        Payout,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='ledger_entries'
+    )
+    
+    # Changes: amount to the balance owed to the shopper, gmv to the value of
+    # the bids they completed
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    gmv = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    
+    # Running totals after this entry
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    total_earned = models.DecimalField(max_digits=12, decimal_places=2)
+    total_paid_out = models.DecimalField(max_digits=12, decimal_places=2)
+    total_gmv = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    objects = LedgerEntryQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['created_at', 'id']
+        verbose_name_plural = 'ledger entries'
+        indexes = [
+            models.Index(fields=['shopper', 'created_at', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.amount} for shopper {self.shopper_id}"
+
+
+class ShopperBalance(models.Model):
+    """Running totals of a shopper's ledger, updated with every entry"""
+    shopper = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='balance'
+    )
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))  # earned, not yet paid out
+    total_earned = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total_paid_out = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total_gmv = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    entry_count = models.PositiveIntegerField(default=0)
+    last_entry = models.ForeignKey(
+        LedgerEntry,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='+'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Balance {self.balance} for shopper {self.shopper_id}"
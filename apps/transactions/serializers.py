@@ -0,0 +1,29 @@
+from rest_framework import serializers
+from .models import LedgerEntry, ShopperBalance
+
+
+class ShopperBalanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShopperBalance
+        fields = ['balance', 'total_earned', 'total_paid_out', 'total_gmv', 'entry_count', 'updated_at']
+        read_only_fields = fields
+
+
+class LedgerEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LedgerEntry
+        fields = [
+            'id', 'kind', 'amount', 'gmv', 'balance', 'total_earned', 'total_paid_out',
+            'total_gmv', 'transaction', 'payout', 'created_at',
+        ]
+        read_only_fields = fields
+
+
+class LedgerPeriodSerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+    def validate(self, attrs):
+        if attrs['start'] >= attrs['end']:
+            raise serializers.ValidationError({'error': 'start must be before end'})
+        return attrs
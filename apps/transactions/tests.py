@@ -1,3 +1,135 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from apps.bids.models import Bid
+from apps.transactions.ledger import rebuild_ledger
+from apps.transactions.models import LedgerEntry, Payout, ShopperBalance, Transaction
+
+pytestmark = pytest.mark.django_db
+
+ENTRY_FIELDS = ('kind', 'amount', 'gmv', 'balance', 'total_earned', 'total_paid_out', 'total_gmv', 'created_at')
+
+
+@pytest.fixture
+def make_transaction(make_list, shopper_user):
+    """A transaction for a new list and bid of shopper_user; fee 10%"""
+    def create(amount='50.00', **fields):
+        shopping_list = make_list(status='assigned', selected_shopper=shopper_user)
+        bid = Bid.objects.create(
+            shopper=shopper_user, shopping_list=shopping_list, amount=Decimal(amount),
+            estimated_time=30, distance_to_store=Decimal('1.00'), status='accepted',
+        )
+        amount = Decimal(amount)
+        return Transaction.objects.create(
+            shopping_list=shopping_list, bid=bid, bid_amount=amount, platform_fee=amount / 10,
+            shopper_payout=amount - amount / 10, total_charged=amount, payment_method='stripe', **fields,
+        )
+    return create
+
+
+def complete(row, at):
+    row.status = 'completed'
+    row.completed_at = at
+    row.save()
+
+
+def entries(shopper):
+    return list(LedgerEntry.objects.filter(shopper=shopper).order_by('created_at', 'id').values(*ENTRY_FIELDS))
+
+
+def test_completed_transaction_is_posted_once_from_when_it_completed(make_transaction, shopper_user):
+    txn = make_transaction()
+    assert not LedgerEntry.objects.exists()
+
+    completed_at = timezone.now() - timedelta(hours=3)
+    complete(txn, completed_at)
+    txn.save()
+    [entry] = entries(shopper_user)
+    assert entry == {
+        'kind': 'earning', 'amount': Decimal('45.00'), 'gmv': Decimal('50.00'), 'balance': Decimal('45.00'),
+        'total_earned': Decimal('45.00'), 'total_paid_out': Decimal('0.00'), 'total_gmv': Decimal('50.00'),
+        'created_at': completed_at,
+    }
+    balance = ShopperBalance.objects.get(shopper=shopper_user)
+    assert (balance.balance, balance.entry_count, balance.last_entry.created_at) == (Decimal('45.00'), 1, completed_at)
+
+
+def test_refund_and_failed_payout_post_reversals_as_of_now(make_transaction, shopper_user):
+    txn = make_transaction()
+    complete(txn, timezone.now() - timedelta(days=2))
+    payout = Payout.objects.create(shopper=shopper_user, transaction=txn, amount=Decimal('45.00'))
+    complete(payout, timezone.now() - timedelta(days=1))
+
+    started = timezone.now()
+    payout.status = 'failed'
+    payout.save()
+    txn.status = 'refunded'
+    txn.save()
+
+    rows = entries(shopper_user)
+    assert [(row['kind'], row['amount'], row['balance']) for row in rows] == [
+        ('earning', Decimal('45.00'), Decimal('45.00')),
+        ('payout', Decimal('-45.00'), Decimal('0.00')),
+        ('payout_reversal', Decimal('45.00'), Decimal('45.00')),
+        ('earning_reversal', Decimal('-45.00'), Decimal('0.00')),
+    ]
+    assert all(row['created_at'] >= started for row in rows[2:])
+    assert (rows[-1]['total_earned'], rows[-1]['total_paid_out'], rows[-1]['total_gmv']) == (0, 0, 0)
+
+
+def test_entries_are_never_dated_before_the_previous_one(make_transaction, shopper_user):
+    later, earlier = make_transaction(), make_transaction('20.00')
+    now = timezone.now()
+    complete(later, now - timedelta(hours=1))
+    # Completed earlier but posted afterwards: kept after the entry already posted
+    complete(earlier, now - timedelta(hours=2))
+    rows = entries(shopper_user)
+    assert [row['created_at'] for row in rows] == [now - timedelta(hours=1)] * 2
+    assert [row['balance'] for row in rows] == [Decimal('45.00'), Decimal('63.00')]
+
+
+def test_rebuild_replays_the_entries_posting_made(make_transaction, shopper_user):
+    now = timezone.now()
+    first, second = make_transaction(), make_transaction('20.00')
+    complete(first, now - timedelta(days=3))
+    payout = Payout.objects.create(shopper=shopper_user, transaction=first, amount=Decimal('45.00'))
+    complete(payout, now - timedelta(days=2))
+    complete(second, now - timedelta(days=1))
+    posted = entries(shopper_user)
+
+    assert rebuild_ledger([shopper_user.pk]) == 3
+    assert entries(shopper_user) == posted
+
+
+def test_period_totals_include_the_start_and_exclude_the_end(make_transaction, shopper_user):
+    now = timezone.now()
+    days = [now - timedelta(days=3), now - timedelta(days=2), now - timedelta(days=1)]
+    for at, amount in zip(days, ('10.00', '20.00', '40.00')):
+        complete(make_transaction(amount), at)
+
+    ledger = LedgerEntry.objects.filter(shopper=shopper_user)
+    assert ledger.period_totals(days[0], days[2]) == {
+        'earned': Decimal('27.00'), 'paid_out': Decimal('0.00'), 'gmv': Decimal('30.00'),
+        'balance_change': Decimal('27.00'),
+    }
+    assert ledger.period_totals(days[0], days[0])['earned'] == 0
+    assert ledger.period_totals(days[2], now)['gmv'] == Decimal('40.00')
+    assert ledger.period_totals(now - timedelta(days=30), days[0])['earned'] == 0
+
+
+def test_check_ledger_passes_and_reports_drift(make_transaction, shopper_user, capsys):
+    complete(make_transaction(), timezone.now())
+    call_command('check_ledger')
+    assert 'Ledger consistent for 1 shoppers.' in capsys.readouterr().out
+
+    ShopperBalance.objects.filter(shopper=shopper_user).update(total_earned=Decimal('99.00'))
+    with pytest.raises(CommandError):
+        call_command('check_ledger')
+    assert 'total_earned is 99.00' in capsys.readouterr().out
+
+    rebuild_ledger([shopper_user.pk])
+    call_command('check_ledger')
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # Shopper earnings
+    path('balance/', views.ShopperBalanceView.as_view(), name='shopper-balance'),
+    path('ledger/', views.ShopperLedgerView.as_view(), name='shopper-ledger'),
+]
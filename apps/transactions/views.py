@@ -1,3 +1,78 @@
-from django.shortcuts import render
+from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from apps.bids.permissions import IsShopper
+from shopper.optimizer import OptimizedQuerysetMixin
+from shopper.pagination import NewestFirstCursorPagination
+from .models import LedgerEntry, ShopperBalance
+from .serializers import LedgerEntrySerializer, LedgerPeriodSerializer, ShopperBalanceSerializer
+from drf_spectacular.utils import extend_schema, OpenApiParameter, extend_schema_view
+from drf_spectacular.types import OpenApiTypes
 
-# Create your views here.
+@extend_schema_view(
+    get=extend_schema(
+        tags=['Earnings'],
+        summary="Get my balance",
+        description=(
+            "Get the shopper's current balance (earned but not yet paid out), lifetime "
+            "earnings, payouts and GMV. With start and end, also returns the totals "
+            "for that period."
+        ),
+        parameters=[
+            OpenApiParameter(name='start', description='Period start (ISO 8601, inclusive)', required=False, type=OpenApiTypes.DATETIME),
+            OpenApiParameter(name='end', description='Period end (ISO 8601, exclusive)', required=False, type=OpenApiTypes.DATETIME),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+)
+
+class ShopperBalanceView(generics.GenericAPIView):
+    """
+    GET /api/transactions/balance/
+    Get the shopper's running balance, read from one snapshot row. Period
+    totals are the difference between two ledger entries found by index.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsShopper]
+    query_budget = 3
+    
+    def get(self, request):
+        user = request.user
+        balance = ShopperBalance.objects.filter(shopper=user).first() or ShopperBalance(shopper=user)
+        data = ShopperBalanceSerializer(balance).data
+        
+        params = request.query_params
+        if 'start' in params or 'end' in params:
+            period = LedgerPeriodSerializer(data={'start': params.get('start'), 'end': params.get('end')})
+            if not period.is_valid():
+                raise ValidationError({'error': 'start and end must both be valid datetimes, start before end'})
+            totals = LedgerEntry.objects.filter(shopper=user).period_totals(
+                period.validated_data['start'], period.validated_data['end']
+            )
+            data['period'] = {
+                'start': period.data['start'],
+                'end': period.data['end'],
+                **{key: str(value) for key, value in totals.items()},
+            }
+        return Response(data)
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=['Earnings'],
+        summary="Get my ledger",
+        description="Get the shopper's earnings and payout entries, newest first.",
+        responses={200: LedgerEntrySerializer(many=True)},
+    )
+)
+
+class ShopperLedgerView(OptimizedQuerysetMixin, generics.ListAPIView):
+    """
+    GET /api/transactions/ledger/
+    Get the shopper's ledger entries, newest first
+    """
+    serializer_class = LedgerEntrySerializer
+    permission_classes = [permissions.IsAuthenticated, IsShopper]
+    query_budget = 2
+    pagination_class = NewestFirstCursorPagination
+    
+    def get_queryset(self):
+        return LedgerEntry.objects.filter(shopper=self.request.user).order_by('-created_at', '-id')
@@ -0,0 +1,132 @@
+"""
+Buffered UserActivity and User.last_active writes.
+
+ActivityMiddleware appends one tuple per authenticated request to an
+in-process buffer; the request never waits on the database. A background
+thread writes the buffer out every ACTIVITY_FLUSH_INTERVAL seconds, or as
+soon as it holds ACTIVITY_BUFFER_SIZE entries:
+
+- the activity rows in one bulk_create,
+- each user's latest request time in one bulk UPDATE of last_active.
+
+Whatever is still buffered is written when the process exits. A flush
+that fails is logged and its entries dropped: activity is best effort and
+must not pile up while the database is away.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.functional import empty
+
+from .models import User, UserActivity
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer:
+    def __init__(self):
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        # Once per process: a forked worker must not share its parent's buffer
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._lock = threading.Lock()
+            self._flush_lock = threading.Lock()
+            self._entries = []
+            self._last_active = {}
+            self._wake = threading.Event()
+            threading.Thread(target=self._run, name='activity-flush', daemon=True).start()
+            atexit.register(self.flush)
+            self._pid = os.getpid()
+
+    def add(self, user_id, action, ip_address, user_agent):
+        if self._pid != os.getpid():
+            self._start()
+        now = timezone.now()
+        with self._lock:
+            self._entries.append((user_id, action, ip_address, user_agent, now))
+            self._last_active[user_id] = now
+            full = len(self._entries) >= getattr(settings, 'ACTIVITY_BUFFER_SIZE', 500)
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wait()
+            self.flush()
+
+    def _wait(self):
+        """Until the buffer fills up or ACTIVITY_FLUSH_INTERVAL seconds pass"""
+        self._wake.wait(getattr(settings, 'ACTIVITY_FLUSH_INTERVAL', 5))
+        self._wake.clear()
+
+    def flush(self):
+        """Write out everything buffered so far; returns the number of entries written"""
+        if self._pid != os.getpid():
+            return 0
+        # One flush at a time: the thread's and the one at exit
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            entries, self._entries = self._entries, []
+            last_active, self._last_active = self._last_active, {}
+        if not entries:
+            return 0
+
+        try:
+            close_old_connections()
+            with transaction.atomic():
+                # A user deleted since their request would fail the whole batch
+                existing = set(User.objects.filter(pk__in=last_active).values_list('pk', flat=True))
+                entries = [entry for entry in entries if entry[0] in existing]
+                UserActivity.objects.bulk_create([
+                    UserActivity(user_id=user_id, action=action, ip_address=ip_address,
+                                 user_agent=user_agent, timestamp=timestamp)
+                    for user_id, action, ip_address, user_agent, timestamp in entries
+                ], batch_size=1000)
+                User.objects.bulk_update(
+                    [User(pk=pk, last_active=timestamp) for pk, timestamp in last_active.items()
+                     if pk in existing],
+                    ['last_active'],
+                )
+        except Exception:
+            logger.exception('Dropped %d buffered user activities', len(entries))
+            return 0
+        return len(entries)
+
+
+buffer = ActivityBuffer()
+
+
+class ActivityMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not getattr(settings, 'ACTIVITY_TRACKING_ENABLED', True):
+            return response
+
+        user = getattr(request, 'user', None)
+        if user is None or getattr(user, '_wrapped', None) is empty:
+            # Nothing authenticated this request; don't look up a session for it
+            return response
+        if user.is_authenticated:
+            match = request.resolver_match
+            action = f'{request.method} {match.route if match else request.path}'
+            buffer.add(
+                user.pk, action[:255],
+                request.META.get('REMOTE_ADDR') or None,
+                request.META.get('HTTP_USER_AGENT', '')[:512],
+            )
+        return response
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import User, UserActivity
+from .models import RevokedToken, User, UserActivity
 
 admin.site.register(User)
-admin.site.register(UserActivity)
\ No newline at end of file
+admin.site.register(UserActivity)
+admin.site.register(RevokedToken)
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.users'
\ No newline at end of file
+    name = 'apps.users'
+
+    def ready(self):
+        from .cache import forget_on_user_change
+
+        # Token-authenticated requests must not see a stale row from this process
+        for signal in (post_save, post_delete):
+            signal.connect(forget_on_user_change, sender='users.User')
@@ -0,0 +1,55 @@
+"""
+Short-lived, per-process cache of user rows for token-authenticated users.
+
+Requests authenticated from access token claims (see
+shopper.authentication) only load the rest of the user's row when a view
+reads a field the token does not carry. The row is kept here for
+USER_CACHE_TIMEOUT seconds, so a client making a burst of calls loads it
+once. Saving a user drops its entry in this process; other processes see
+the change when their entry expires.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+# Entries kept before the oldest are dropped
+MAX_USERS = 1024
+
+_rows = {}
+
+
+def get_user_row(pk):
+    """The user's column values by attname, from the cache or the database"""
+    timeout = getattr(settings, 'USER_CACHE_TIMEOUT', 30)
+    entry = _rows.get(pk)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    model = get_user_model()
+    try:
+        row = model._base_manager.filter(pk=pk).values(
+            *(field.attname for field in model._meta.concrete_fields)
+        ).get()
+    except model.DoesNotExist:
+        # A valid token for a deleted user, as simplejwt's get_user reports it
+        raise AuthenticationFailed(_('User not found'), code='user_not_found')
+    if timeout:
+        if len(_rows) >= MAX_USERS:
+            _rows.pop(next(iter(_rows)), None)
+        _rows[pk] = (time.monotonic() + timeout, row)
+    return row
+
+
+def forget_user(pk):
+    _rows.pop(pk, None)
+
+
+def forget_all():
+    _rows.clear()
+
+
+def forget_on_user_change(sender, instance, **kwargs):
+    forget_user(instance.pk)
@@ -0,0 +1,76 @@
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.lists.management.seed import Rollback
+from apps.users.models import RevokedToken
+from apps.users.revocation import SNAPSHOT_KEY, revoked
+from shopper.cache import get_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Revoke --revoked tokens, then time the revocation check for tokens "
+        "that were and were not revoked, against a plain database lookup. "
+        "Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--revoked', type=int, default=1_000_000, help='Revoked tokens seeded')
+        parser.add_argument('--checks', type=int, default=100_000, help='Checks of tokens never revoked')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['revoked'], options['checks'])
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            # Neither the snapshot nor this process's filter may outlive the rollback
+            get_cache().delete(SNAPSHOT_KEY)
+            revoked.reset()
+
+    def run(self, count, checks):
+        expires_at = timezone.now() + timedelta(days=1)
+        jtis = [uuid.uuid4().hex for _ in range(count)]
+        RevokedToken.objects.bulk_create(
+            (RevokedToken(jti=jti, expires_at=expires_at) for jti in jtis), batch_size=10000
+        )
+
+        get_cache().delete(SNAPSHOT_KEY)
+        revoked.reset()
+        start = time.perf_counter()
+        revoked.sync()
+        build = time.perf_counter() - start
+        self.stdout.write(
+            f'{count} revoked: filter of {len(revoked.bloom.bits) / 1024 / 1024:.1f} MiB '
+            f'({revoked.bloom.hashes} hashes), '
+            f'built in {build:.2f}s'
+        )
+
+        fresh = [uuid.uuid4().hex for _ in range(checks)]
+        sample = jtis[::max(1, count // 1000)]
+        self.stdout.write(f"{'check':<24} {'tokens':>8} {'queries':>8} {'refused':>8} {'us/check':>10}")
+        for label, tokens, check in (
+            ('filter, not revoked', fresh, lambda jti: jti in revoked),
+            ('filter, revoked', sample, lambda jti: jti in revoked),
+            ('database, not revoked', fresh[:len(sample)],
+             lambda jti: RevokedToken.objects.active().filter(jti=jti).exists()),
+        ):
+            timings = []
+            with CaptureQueriesContext(connection) as queries:
+                refused = 0
+                for jti in tokens:
+                    start = time.perf_counter()
+                    refused += check(jti)
+                    timings.append((time.perf_counter() - start) * 1_000_000)
+            self.stdout.write(
+                f'{label:<24} {len(tokens):>8} {len(queries):>8} {refused:>8} {statistics.mean(timings):>10.2f}'
+            )
@@ -1,4 +1,6 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class CustomUserManager(BaseUserManager):
@@ -32,4 +34,14 @@ class CustomUserManager(BaseUserManager):
         if extra_fields.get('is_superuser') is not True:
             raise ValueError(_('Superuser must have is_superuser=True.'))
         
-        return self.create_user(email, password, **extra_fields)
\ No newline at end of file
+        return self.create_user(email, password, **extra_fields)
+
+
+class RevokedTokenQuerySet(models.QuerySet):
+    def active(self):
+        """Revocations of tokens that have not expired yet"""
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        """Revocations of tokens simplejwt rejects anyway"""
+        return self.filter(expires_at__lte=timezone.now())
@@ -1,7 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
-from .managers import CustomUserManager  # Add this import
+from .cache import get_user_row
+from .managers import CustomUserManager, RevokedTokenQuerySet  # Add this import
 
 class User(AbstractUser):
     username = None
@@ -58,6 +59,34 @@ class User(AbstractUser):
     
     def __str__(self):
          return f"{self.email} ({self.get_user_type_display()})"
+
+    # Fields CustomTokenObtainPairSerializer puts in the token
+    CLAIM_FIELDS = ('email', 'user_type', 'first_name', 'last_name')
+
+    @classmethod
+    def from_claims(cls, pk, claims):
+        """
+        A user holding only its primary key and CLAIM_FIELDS, taken from an
+        access token. Every other field is deferred: reading one loads the
+        rest of the row at once, through apps.users.cache.
+        """
+        # Claims may carry the id as a string; equality and the user cache
+        # need the field's own type
+        pk = cls._meta.pk.to_python(pk)
+        values = {cls._meta.pk.attname: pk, **{name: claims[name] for name in cls.CLAIM_FIELDS}}
+        # from_db takes the values in field order
+        names = [field.attname for field in cls._meta.concrete_fields if field.attname in values]
+        user = cls.from_db(None, names, [values[name] for name in names])
+        user._from_claims = True
+        return user
+
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if not getattr(self, '_from_claims', False) or fields is None or not deferred.issuperset(fields):
+            return super().refresh_from_db(using, fields)
+        for attname, value in get_user_row(self.pk).items():
+            if attname in deferred:
+                setattr(self, attname, value)
     
     class Meta:
         indexes = [
@@ -72,8 +101,23 @@ class UserActivity(models.Model):
     action = models.CharField(max_length=255)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # When the request was made; rows are written later, in batches
+    timestamp = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['-timestamp']
-        db_table = 'user_activities'  # Optional: specify table name
\ No newline at end of file
+        db_table = 'user_activities'  # Optional: specify table name
+
+
+class RevokedToken(models.Model):
+    """A refresh or access token, by jti, that must no longer be accepted"""
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='revoked_tokens', null=True, blank=True)
+    # The token's own exp: past it simplejwt rejects the token anyway
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = RevokedTokenQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'revoked_tokens'
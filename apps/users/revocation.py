@@ -0,0 +1,171 @@
+"""
+Revoked-token checks without a query per request.
+
+Revocations are rows of RevokedToken, keyed on the token's jti. Each
+process keeps a bloom filter of the jtis still inside their exp, so a
+token that was never revoked (nearly every request) is cleared with a few
+hash probes and no I/O. Only a filter hit, a revoked token or a rare false
+positive, is confirmed in the database.
+
+The filter is kept in step through the cache:
+
+- a snapshot of the filter is stored for REVOCATION_REBUILD_INTERVAL
+  seconds; a process starting up, or whose copy is older than that, loads
+  it, or rebuilds it from the table (dropping expired rows) when there is
+  none; one process rebuilds at a time, the others keep their copy,
+- every revocation bumps a generation counter; at most every
+  REVOCATION_SYNC_INTERVAL seconds a process reads it and, when it moved,
+  adds the jtis revoked since its last sync.
+
+A token revoked in this process is refused at once, elsewhere within
+REVOCATION_SYNC_INTERVAL seconds. Bloom filters cannot forget, so expired
+jtis stay in a filter until the next rebuild; they only cost a lookup.
+"""
+import hashlib
+import math
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from shopper.cache import get_cache
+
+from .models import RevokedToken
+
+SNAPSHOT_KEY = 'revocation:filter'
+REBUILD_LOCK_KEY = 'revocation:rebuilding'
+GENERATION_KEY = 'revocation:generation'
+# Rows committed out of order are caught by re-reading this far back
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+class BloomFilter:
+    """Fixed-size set of strings: no false negatives, `error_rate` false positives"""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * step) % self.size for index in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def build_filter():
+    """A filter of every active revocation, after deleting expired ones"""
+    started = timezone.now()
+    RevokedToken.objects.expired().delete()
+    bloom = BloomFilter(
+        getattr(settings, 'REVOCATION_CAPACITY', 1_000_000),
+        getattr(settings, 'REVOCATION_ERROR_RATE', 0.001),
+    )
+    for jti in RevokedToken.objects.active().values_list('jti', flat=True).iterator(chunk_size=10000):
+        bloom.add(jti)
+    return started, bloom
+
+
+class RevocationList:
+    """This process's view of the revoked jtis"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.bloom = None
+        self.synced_to = None
+        self.generation = None
+        self.loaded_at = 0.0
+        self.checked_at = 0.0
+
+    def sync(self):
+        now = time.monotonic()
+        if self.bloom is not None and now - self.checked_at < getattr(settings, 'REVOCATION_SYNC_INTERVAL', 5):
+            return
+        self.checked_at = now
+        cache = get_cache()
+        generation = cache.get(GENERATION_KEY)
+        if self.bloom is None or now - self.loaded_at >= getattr(settings, 'REVOCATION_REBUILD_INTERVAL', 3600):
+            self.load()
+        elif generation != self.generation:
+            self.catch_up()
+        self.generation = generation
+
+    def load(self):
+        cache = get_cache()
+        snapshot = cache.get(SNAPSHOT_KEY)
+        if snapshot is None:
+            locked = cache.add(REBUILD_LOCK_KEY, 1, timeout=300)
+            if not locked and self.bloom is not None:
+                # Another process is rebuilding; keep this copy meanwhile
+                self.catch_up()
+                return
+            # Without a copy of its own, a process builds one even while
+            # another holds the lock, but leaves that lock alone
+            try:
+                snapshot = build_filter()
+                cache.set(SNAPSHOT_KEY, snapshot, timeout=getattr(settings, 'REVOCATION_REBUILD_INTERVAL', 3600))
+            finally:
+                if locked:
+                    cache.delete(REBUILD_LOCK_KEY)
+        self.synced_to, self.bloom = snapshot
+        self.loaded_at = time.monotonic()
+        self.catch_up()
+
+    def catch_up(self):
+        started = timezone.now()
+        for jti in RevokedToken.objects.filter(
+            revoked_at__gte=self.synced_to - SYNC_OVERLAP
+        ).values_list('jti', flat=True):
+            self.bloom.add(jti)
+        self.synced_to = started
+
+    def add(self, jti):
+        if self.bloom is not None:
+            self.bloom.add(jti)
+
+    def __contains__(self, jti):
+        self.sync()
+        if jti not in self.bloom:
+            return False
+        return RevokedToken.objects.active().filter(jti=jti).exists()
+
+
+revoked = RevocationList()
+
+
+def _bump_generation():
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        if not cache.add(GENERATION_KEY, 1, timeout=None):
+            cache.incr(GENERATION_KEY)
+
+
+def revoke(token, user=None):
+    """Refuse `token` (a simplejwt Token) from now until its exp"""
+    jti = token[api_settings.JTI_CLAIM]
+    RevokedToken.objects.bulk_create([
+        RevokedToken(jti=jti, user=user, expires_at=datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)),
+    ], ignore_conflicts=True)
+    revoked.add(jti)
+    transaction.on_commit(_bump_generation)
+
+
+def is_revoked(token):
+    jti = token.get(api_settings.JTI_CLAIM)
+    return jti is not None and jti in revoked
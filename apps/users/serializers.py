@@ -1,8 +1,14 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.validators import UniqueValidator
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .revocation import is_revoked
 
 User = get_user_model()
 
@@ -16,6 +22,14 @@ class UserSerializer(serializers.ModelSerializer):
                  'average_rating', 'completed_jobs')
         read_only_fields = ('id', 'date_joined', 'average_rating', 'completed_jobs')
 
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Only the submitted fields: ratings, password, last_active and the
+        # like may be changed concurrently by other writers
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
 class RegisterSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(
         required=True,
@@ -82,4 +96,31 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             'phone_number': self.user.phone_number,
         }
         
-        return data
\ No newline at end of file
+        return data
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """TokenRefreshSerializer refusing revoked refresh tokens"""
+
+    def validate(self, attrs):
+        if is_revoked(self.token_class(attrs['refresh'])):
+            raise InvalidToken('Token has been revoked')
+        return super().validate(attrs)
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(write_only=True)
+
+    def validate_refresh(self, value):
+        try:
+            refresh = RefreshToken(value)
+        except TokenError as exc:
+            raise serializers.ValidationError(str(exc))
+        try:
+            # Claims may carry the id as a string, as in User.from_claims
+            user_id = User._meta.pk.to_python(refresh.get(api_settings.USER_ID_CLAIM))
+        except DjangoValidationError:
+            user_id = None
+        if user_id != self.context['request'].user.pk:
+            raise serializers.ValidationError('Token belongs to another user')
+        return refresh
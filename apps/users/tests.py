@@ -1,3 +1,249 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
 
-# Create your tests here.
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.bids.permissions import IsShopper
+from apps.lists.permissions import IsClient, IsListOwner
+from apps.users.activity import ActivityBuffer
+from apps.users.models import RevokedToken, User, UserActivity
+from apps.users.revocation import GENERATION_KEY, REBUILD_LOCK_KEY, SNAPSHOT_KEY, is_revoked, revoked
+from apps.users.serializers import CustomTokenObtainPairSerializer
+from apps.users.views import UserDetailView
+from shopper.authentication import ClaimsJWTAuthentication
+from shopper.querybudget import QueryBudgetExceeded
+
+pytestmark = pytest.mark.django_db
+
+
+def login(user):
+    refresh = RefreshToken.for_user(user)
+    # As issued by this deployment: the user id claim as a string
+    refresh['user_id'] = str(user.pk)
+    return refresh
+
+
+def bearer(token):
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+def test_logout_revokes_the_refresh_and_access_tokens(api_client, shopper_user):
+    refresh = login(shopper_user)
+    access = refresh.access_token
+    response = api_client.post('/api/users/logout/', {'refresh': str(refresh)}, format='json', **bearer(access))
+    assert response.status_code == 204
+
+    assert api_client.get('/api/users/profile/', **bearer(access)).status_code == 401
+    response = api_client.post('/api/users/token/refresh/', {'refresh': str(refresh)}, format='json')
+    assert response.status_code == 401
+
+
+def test_logout_refuses_another_users_refresh_token(api_client, shopper_user, client_user):
+    access = login(shopper_user).access_token
+    response = api_client.post(
+        '/api/users/logout/', {'refresh': str(login(client_user))}, format='json', **bearer(access),
+    )
+    assert response.status_code == 400
+    assert response.json() == {'refresh': ['Token belongs to another user']}
+
+
+def test_tokens_that_were_not_revoked_still_work(api_client, shopper_user, client_user):
+    refresh = login(shopper_user)
+    other = login(client_user)
+    api_client.post('/api/users/logout/', {'refresh': str(other)}, format='json', **bearer(other.access_token))
+
+    assert api_client.get('/api/users/profile/', **bearer(refresh.access_token)).status_code == 200
+    response = api_client.post('/api/users/token/refresh/', {'refresh': str(refresh)}, format='json')
+    assert response.status_code == 200
+
+
+def revoked_elsewhere(token):
+    """A revocation made by another process: in the table, not in this filter"""
+    RevokedToken.objects.create(
+        jti=token['jti'], expires_at=timezone.now() + timedelta(hours=1),
+    )
+
+
+def test_catch_up_after_a_restart_loads_revocations_newer_than_the_snapshot(shopper_user):
+    token = login(shopper_user).access_token
+    revoked.sync()
+    assert cache.get(SNAPSHOT_KEY) is not None
+
+    revoked_elsewhere(token)
+    # A restarted process starts from the cached snapshot, taken before the revocation
+    revoked.reset()
+    assert is_revoked(token)
+
+
+def test_generation_bump_makes_other_processes_catch_up(settings, shopper_user):
+    settings.REVOCATION_SYNC_INTERVAL = 0
+    token = login(shopper_user).access_token
+    assert not is_revoked(token)
+
+    revoked_elsewhere(token)
+    cache.set(GENERATION_KEY, 1, timeout=None)
+    assert is_revoked(token)
+
+
+def test_load_leaves_another_processes_rebuild_lock_alone(shopper_user):
+    cache.add(REBUILD_LOCK_KEY, 'other process', timeout=300)
+    revoked.sync()
+    assert revoked.bloom is not None
+    assert cache.get(REBUILD_LOCK_KEY) == 'other process'
+
+
+def test_load_releases_its_own_rebuild_lock(shopper_user):
+    revoked.sync()
+    assert cache.get(REBUILD_LOCK_KEY) is None
+
+
+def test_query_budgets_raise_on_reads_only(monkeypatch, shopper_user, auth_client):
+    monkeypatch.setattr(UserDetailView, 'query_budget', 0)
+    api = auth_client(shopper_user)
+    with pytest.raises(QueryBudgetExceeded):
+        api.get('/api/users/profile/')
+    response = api.patch('/api/users/profile/', {'bio': 'Fast and careful'}, format='json')
+    assert response.status_code == 200
+
+
+def authenticate(token):
+    request = Request(APIRequestFactory().get('/', **bearer(token)), authenticators=[ClaimsJWTAuthentication()])
+    return request, request.user
+
+
+def test_permission_checks_run_without_queries(django_assert_num_queries, client_user, shopper_user, access_token):
+    client_token, shopper_token = access_token(client_user), access_token(shopper_user)
+    with django_assert_num_queries(0):
+        request, user = authenticate(client_token)
+        assert (user.pk, user.email, user.user_type) == (client_user.pk, client_user.email, 'client')
+        assert IsClient().has_permission(request, None)
+        assert not IsShopper().has_permission(request, None)
+        request, user = authenticate(shopper_token)
+        assert IsShopper().has_permission(request, None)
+        assert not IsClient().has_permission(request, None)
+
+
+def test_string_user_id_claim_is_the_users_primary_key(django_assert_num_queries, shopping_list, client_user):
+    token = CustomTokenObtainPairSerializer.get_token(client_user).access_token
+    token['user_id'] = str(client_user.pk)
+    revoked.sync()
+    with django_assert_num_queries(0):
+        request, user = authenticate(token)
+        assert user.pk == client_user.pk
+        assert IsListOwner().has_object_permission(request, None, shopping_list)
+
+    token['user_id'] = 'not-an-id'
+    with pytest.raises(InvalidToken):
+        authenticate(token)
+
+
+def test_token_of_a_deleted_user_is_unauthorized(shopper_user, auth_client):
+    api = auth_client(shopper_user)
+    shopper_user.delete()
+    response = api.get('/api/users/profile/')
+    assert response.status_code == 401
+    assert response.json()['code'] == 'user_not_found'
+
+
+def test_profile_update_does_not_write_back_the_cached_row(shopper_user, auth_client):
+    api = auth_client(shopper_user)
+    assert api.get('/api/users/profile/').json()['average_rating'] == 0
+    # Another process updates the row; this one still has it cached
+    User.objects.filter(pk=shopper_user.pk).update(average_rating=4.5)
+
+    response = api.patch('/api/users/profile/', {'bio': 'Fast and careful'}, format='json')
+    assert response.status_code == 200
+    shopper_user.refresh_from_db()
+    assert (shopper_user.bio, shopper_user.average_rating) == ('Fast and careful', 4.5)
+    # Saving dropped this process's cached row
+    assert api.get('/api/users/profile/').json()['bio'] == 'Fast and careful'
+
+
+class ManualBuffer(ActivityBuffer):
+    """An activity buffer without a flush thread: the test flushes it"""
+    def _run(self):
+        pass
+
+
+# flush() runs as on the flush thread: outside any transaction
+activity_db = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def activity(settings):
+    settings.ACTIVITY_BUFFER_SIZE = 3
+    settings.ACTIVITY_FLUSH_INTERVAL = 60
+    return ManualBuffer()
+
+
+def track(activity, user, count=1):
+    for _ in range(count):
+        activity.add(user.pk, 'GET api/users/profile/', '127.0.0.1', 'pytest')
+
+
+@activity_db
+def test_activity_is_flushed_when_the_buffer_fills_up(activity, shopper_user):
+    track(activity, shopper_user, 2)
+    assert not activity._wake.is_set()
+    track(activity, shopper_user)
+    started = time.monotonic()
+    activity._wait()
+    assert time.monotonic() - started < 1
+    assert activity.flush() == 3
+    assert UserActivity.objects.count() == 3
+
+
+@activity_db
+def test_activity_is_flushed_every_interval(settings, activity, shopper_user):
+    settings.ACTIVITY_FLUSH_INTERVAL = 0.05
+    track(activity, shopper_user)
+    started = time.monotonic()
+    activity._wait()
+    assert time.monotonic() - started >= 0.05
+    assert activity.flush() == 1
+    assert activity.flush() == 0
+
+
+@activity_db
+def test_activity_flush_writes_each_users_latest_request_once(settings, activity, shopper_user, client_user):
+    settings.ACTIVITY_BUFFER_SIZE = 100
+    track(activity, shopper_user, 5)
+    track(activity, client_user, 2)
+    with CaptureQueriesContext(connection) as queries:
+        assert activity.flush() == 7
+    assert sum(query['sql'].startswith('UPDATE') for query in queries) == 1
+
+    for user in (shopper_user, client_user):
+        user.refresh_from_db()
+        assert user.last_active == UserActivity.objects.filter(user=user).latest('timestamp').timestamp
+
+
+@activity_db
+def test_activity_flush_skips_users_deleted_since_their_request(activity, shopper_user, other_shopper):
+    track(activity, shopper_user)
+    track(activity, other_shopper)
+    other_shopper.delete()
+    assert activity.flush() == 1
+    assert list(UserActivity.objects.values_list('user_id', flat=True)) == [shopper_user.pk]
+    shopper_user.refresh_from_db()
+    assert shopper_user.last_active is not None
+
+
+@activity_db
+def test_requests_are_tracked_inside_transactions(settings, monkeypatch, activity, shopper_user, auth_client):
+    settings.ACTIVITY_TRACKING_ENABLED = True
+    monkeypatch.setattr('apps.users.activity.buffer', activity)
+    api = auth_client(shopper_user)
+    # As with ATOMIC_REQUESTS
+    with transaction.atomic():
+        assert api.get('/api/users/profile/').status_code == 200
+    assert activity.flush() == 1
+    assert UserActivity.objects.get().action == 'GET api/users/profile/'
@@ -7,4 +7,5 @@ urlpatterns = [
     path('profile/', views.UserDetailView.as_view(), name='profile'),
     path('login/', views.CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('logout/', views.LogoutView.as_view(), name='logout'),
 ]
\ No newline at end of file
@@ -2,7 +2,8 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
-from .serializers import UserSerializer, RegisterSerializer, CustomTokenObtainPairSerializer
+from .revocation import revoke
+from .serializers import UserSerializer, RegisterSerializer, CustomTokenObtainPairSerializer, LogoutSerializer
 
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample, extend_schema_view
 from drf_spectacular.types import OpenApiTypes
@@ -72,9 +73,14 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    query_budget = 3
     
     def get_object(self):
-        return self.request.user
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        # The request user may come from token claims and a cached row;
+        # never write that back over newer values
+        return User.objects.get(pk=self.request.user.pk)
     
 @extend_schema_view(
     post=extend_schema(
@@ -108,4 +114,29 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
-    serializer_class = CustomTokenObtainPairSerializer
\ No newline at end of file
+    serializer_class = CustomTokenObtainPairSerializer
+
+
+@extend_schema_view(
+    post=extend_schema(
+        tags=['Authentication'],
+        summary="Logout",
+        description=(
+            "Revoke the given refresh token and the access token used for this "
+            "request. Both are refused from then on, until they would have expired."
+        ),
+        request=LogoutSerializer,
+        responses={204: None, 400: OpenApiTypes.OBJECT},
+    )
+)
+class LogoutView(generics.GenericAPIView):
+    serializer_class = LogoutSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        revoke(serializer.validated_data['refresh'], user=request.user)
+        if request.auth is not None:
+            revoke(request.auth, user=request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
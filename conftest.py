@@ -0,0 +1,148 @@
+"""
+Shared pytest fixtures.
+
+Every test gets a local-memory cache and channel layer, so the suite needs
+no Redis and no test sees another's cached responses, cache versions or
+group memberships.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.lists.models import ShoppingList
+from apps.users.models import User
+from apps.users.cache import forget_all
+from apps.users.revocation import revoked
+from apps.users.serializers import CustomTokenObtainPairSerializer
+from shopper.cache import get_versions
+from shopper.dynamic_fields import parse_spec
+from shopper.renderers import ORJSONRenderer
+
+
+@pytest.fixture(autouse=True)
+def local_backends(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    settings.CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    # Views over their query_budget, or running a query per row, fail the test
+    settings.QUERY_BUDGET_RAISE = True
+    # The flush thread has its own connection and cannot see test rows
+    settings.ACTIVITY_TRACKING_ENABLED = False
+    cache.clear()
+    # The process-wide revocation filter and user rows come from this test's database
+    revoked.reset()
+    forget_all()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def access_token():
+    """Issue an access token for a user, with the claims login puts in it"""
+    def issue(user):
+        # Loaded once per process, not per request: keep it out of query budgets
+        revoked.sync()
+        return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+    return issue
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def auth_client(access_token):
+    """An APIClient sending a bearer token for `user`"""
+    def build(user):
+        return APIClient(HTTP_AUTHORIZATION=f'Bearer {access_token(user)}')
+    return build
+
+
+@pytest.fixture
+def client_user(db):
+    return User.objects.create_user(
+        email='client@example.com', password='test-pass-123', user_type='client',
+        first_name='Ada', last_name='Client',
+    )
+
+
+@pytest.fixture
+def shopper_user(db):
+    return User.objects.create_user(
+        email='shopper@example.com', password='test-pass-123', user_type='shopper',
+        first_name='Sam', last_name='Shopper',
+        latitude=Decimal('40.000000'), longitude=Decimal('-100.000000'), max_bid_distance=25,
+    )
+
+
+@pytest.fixture
+def other_shopper(db):
+    return User.objects.create_user(
+        email='other-shopper@example.com', password='test-pass-123', user_type='shopper',
+    )
+
+
+@pytest.fixture
+def make_list(client_user):
+    """Create an open shopping list for client_user; keyword arguments override its fields"""
+    def create(**fields):
+        now = timezone.now()
+        defaults = dict(
+            client=client_user,
+            title='Milk run',
+            description='milk and eggs',
+            store_name='Costco',
+            store_address='1 Main St',
+            store_city='Denver',
+            items=[{'name': 'milk', 'quantity': 2}, {'name': 'eggs', 'quantity': 1}],
+            estimated_total=Decimal('50.00'),
+            preferred_delivery_time=now + timedelta(days=2),
+            bidding_deadline=now + timedelta(days=1),
+            delivery_latitude=Decimal('40.010000'),
+            delivery_longitude=Decimal('-100.010000'),
+        )
+        return ShoppingList.objects.create(**{**defaults, **fields})
+    return create
+
+
+@pytest.fixture
+def shopping_list(make_list):
+    return make_list()
+
+
+@pytest.fixture
+def bumped(django_capture_on_commit_callbacks):
+    """
+    Run `write` as if it committed and return those of `namespaces` whose
+    cache version it moved.
+    """
+    def run(namespaces, write):
+        before = get_versions(namespaces)
+        with django_capture_on_commit_callbacks(execute=True):
+            write()
+        after = get_versions(namespaces)
+        return {namespace for namespace, old, new in zip(namespaces, before, after) if new != old}
+    return run
+
+
+@pytest.fixture
+def assert_plan_parity():
+    """
+    Check that a ValuesPlan, or its variant for `fields` and `expand` (as
+    in the query string), renders `queryset` to the same JSON bytes as its
+    serializer with many=True.
+    """
+    def check(plan, queryset, fields='', expand=''):
+        fields = parse_spec(fields) if fields else None
+        expand = parse_spec(expand) if expand else {}
+        variant = plan.variant(fields, expand)
+        fast = variant.render(variant.values(queryset))
+        slow = plan.serializer_class(queryset, many=True, fields=fields, expand=expand).data
+        renderer = ORJSONRenderer()
+        assert renderer.render(fast) == renderer.render(slow)
+    return check
@@ -0,0 +1,55 @@
+"""
+JWT authentication without the per-request user query.
+
+simplejwt's JWTAuthentication loads the User row on every API call.
+ClaimsJWTAuthentication builds the user from the claims
+CustomTokenObtainPairSerializer puts in the token instead (id, email,
+user_type and names), so IsAuthenticated, IsClient, IsShopper and the
+ownership checks run without touching the database. The rest of the row
+is loaded, from a short-lived local cache, only if a view reads it (see
+User.from_claims).
+
+As with any stateless token, changes to a user's type or active flag
+reach requests when the user's access token is next refreshed. Tokens
+revoked at logout are refused at once (see apps.users.revocation).
+Tokens without the claims, and CHECK_REVOKE_TOKEN, fall back to the
+database lookup.
+"""
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.users.revocation import is_revoked
+
+
+class RevocableJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication refusing revoked access tokens"""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if is_revoked(validated_token):
+            raise InvalidToken(_('Token has been revoked'))
+        return validated_token
+
+
+class ClaimsJWTAuthentication(RevocableJWTAuthentication):
+    def get_user(self, validated_token):
+        model = self.user_model
+        if api_settings.CHECK_REVOKE_TOKEN or any(name not in validated_token for name in model.CLAIM_FIELDS):
+            # Needs the stored password hash, or a token issued without the claims
+            return super().get_user(validated_token)
+        try:
+            pk = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        try:
+            return model.from_claims(pk, validated_token)
+        except ValidationError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    target_class = ClaimsJWTAuthentication
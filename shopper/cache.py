@@ -0,0 +1,138 @@
+"""
+Versioned response caching.
+
+Every cached response is stored under the current version of each namespace
+it depends on. Invalidating a namespace is a single INCR of its version:
+older entries become unreachable at once and age out through their TTL.
+Works on any Django cache backend (django-redis in production, locmem in
+tests).
+"""
+import hashlib
+import time
+
+from django.core.cache import caches
+from rest_framework.response import Response
+
+CACHE_ALIAS = 'default'
+DEFAULT_TIMEOUT = 300
+CACHE_HEADER = 'X-Cache'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return f'cache-version:{namespace}'
+
+
+def _initial_version():
+    # Start from the clock rather than 1, so a version key that was evicted
+    # never comes back with a number older entries were stored under.
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces):
+    """Current version of each namespace, in one cache round trip"""
+    cache = get_cache()
+    keys = [_version_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_version(), timeout=None)
+            found[key] = cache.get(key)
+        versions.append(found[key])
+    return versions
+
+
+def bump_versions(namespaces):
+    """Invalidate every response cached under these namespaces"""
+    cache = get_cache()
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Never read (or evicted): nothing reachable is cached under it,
+            # and the next read starts from a fresh clock-based version.
+            pass
+
+
+def _counter_key(namespace, outcome):
+    return f'cache-stats:{namespace}:{outcome}'
+
+
+def record(namespace, hit):
+    """Count a cache hit or miss for `namespace`"""
+    cache = get_cache()
+    key = _counter_key(namespace, 'hits' if hit else 'misses')
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_stats(namespace):
+    cache = get_cache()
+    keys = {outcome: _counter_key(namespace, outcome) for outcome in ('hits', 'misses')}
+    found = cache.get_many(keys.values())
+    stats = {outcome: found.get(key, 0) for outcome, key in keys.items()}
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / total if total else None
+    return stats
+
+
+def reset_stats(namespace):
+    get_cache().delete_many([_counter_key(namespace, outcome) for outcome in ('hits', 'misses')])
+
+
+class CachedResponseMixin:
+    """
+    Cache successful GET responses of a DRF view.
+
+    The key covers the absolute URL with its query string, the negotiated
+    media type, `get_cache_variant()` and the versions of
+    `get_cache_namespaces()`. Hits and misses are counted per `cache_name`
+    and reported in the X-Cache response header.
+    """
+    cache_name = None
+    cache_timeout = DEFAULT_TIMEOUT
+
+    def get_cache_namespaces(self):
+        return [self.cache_name]
+
+    def get_cache_variant(self):
+        """Anything besides the URL that changes the response"""
+        return ''
+
+    def get_cache_key(self, request):
+        namespaces = self.get_cache_namespaces()
+        versions = get_versions(namespaces)
+        parts = [
+            # Absolute, since paginated responses embed absolute links
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+            self.get_cache_variant(),
+            *(f'{namespace}@{version}' for namespace, version in zip(namespaces, versions)),
+        ]
+        digest = hashlib.md5('|'.join(map(str, parts)).encode('utf-8')).hexdigest()
+        return f'response:{self.cache_name}:{digest}'
+
+    def get(self, request, *args, **kwargs):
+        cache = get_cache()
+        # Versions are read before the database, so a write that commits
+        # meanwhile leaves this response under a version it then retires.
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            record(self.cache_name, hit=True)
+            return Response(data, headers={CACHE_HEADER: 'HIT'})
+
+        record(self.cache_name, hit=False)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        response[CACHE_HEADER] = 'MISS'
+        return response
@@ -0,0 +1,148 @@
+"""
+Sparse fieldsets and opt-in expansions for read serializers.
+
+    ?fields=id,amount,shopper_details.email
+    ?expand=shopping_list
+
+`fields` keeps only the named fields, in the serializer's own order; a
+dotted name keeps only those fields of a nested serializer. `expand`
+adds the serializer's Meta.expandable_fields, replacing a plain value
+(usually a primary key) with a nested object. Unknown names are a 400.
+
+Views add SparseFieldsMixin, which restricts the queryset to what the
+requested form of the serializer reads: a dropped nested serializer
+drops its join, a dropped many=True relation its prefetch, and dropped
+columns are deferred. On ValuesListMixin views the same applies to the
+.values() query.
+"""
+from django.utils.module_loading import import_string
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .optimizer import OptimizedQuerysetMixin
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        name=FIELDS_PARAM, required=False, type=str,
+        description='Comma separated fields to return; use dots for nested fields, e.g. id,shopper_details.email',
+    ),
+    OpenApiParameter(
+        name=EXPAND_PARAM, required=False, type=str,
+        description='Comma separated related objects to embed in full',
+    ),
+]
+
+
+def parse_spec(value):
+    """'id,client.email,client.id' -> {'id': {}, 'client': {'email': {}, 'id': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        for part in path.split('.'):
+            node = node.setdefault(part.strip(), {})
+    return tree
+
+
+def requested_fields(request):
+    """(fields, expand) trees from the query string; fields is None when not given"""
+    if request is None:
+        return None, {}
+    params = request.query_params
+    fields = params.get(FIELDS_PARAM)
+    expand = params.get(EXPAND_PARAM)
+    return (parse_spec(fields) if fields else None), (parse_spec(expand) if expand else {})
+
+
+def _prune(serializer, spec, path):
+    """Keep only the fields of a nested serializer named in `spec`"""
+    target = serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer
+    if isinstance(target, DynamicFieldsMixin):
+        target._requested = (spec, target._requested[1])
+        return
+    if not isinstance(target, serializers.Serializer):
+        raise ValidationError({'error': f'{path} has no fields to select'})
+    unknown = set(spec) - set(target.fields)
+    if unknown:
+        raise ValidationError({'error': f"Unknown fields: {', '.join(f'{path}.{name}' for name in sorted(unknown))}"})
+    for name in list(target.fields):
+        if name not in spec:
+            del target.fields[name]
+        elif spec[name]:
+            _prune(target.fields[name], spec[name], f'{path}.{name}')
+
+
+class DynamicFieldsMixin:
+    """
+    ModelSerializer mixin for ?fields= and ?expand=. The top-level
+    serializer reads them from the request in its context; `fields` and
+    `expand` arguments (parsed trees) take precedence.
+
+    Meta.expandable_fields maps a field name to (serializer class or
+    dotted path, keyword arguments).
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        self._requested = (fields, expand)
+        super().__init__(*args, **kwargs)
+
+    def _is_top_level(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self._requested
+        if requested is None and expand is None and self._is_top_level():
+            requested, expand = requested_fields(self.context.get('request'))
+        expand = expand or {}
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        unknown = set(expand) - set(expandable)
+        if unknown:
+            raise ValidationError({'error': f"Cannot expand: {', '.join(sorted(unknown))}"})
+        for name, nested in expand.items():
+            serializer_class, kwargs = expandable[name]
+            if isinstance(serializer_class, str):
+                serializer_class = import_string(serializer_class)
+            if issubclass(serializer_class, DynamicFieldsMixin):
+                kwargs = {**kwargs, 'expand': nested}
+            fields[name] = serializer_class(**kwargs)
+
+        if requested is None:
+            return fields
+        unknown = set(requested) - set(fields)
+        if unknown:
+            raise ValidationError({'error': f"Unknown fields: {', '.join(sorted(unknown))}"})
+        for name, nested in requested.items():
+            if nested:
+                _prune(fields[name], nested, name)
+        # Expanded fields need not be listed again
+        return {name: field for name, field in fields.items() if name in requested or name in expand}
+
+
+class SparseFieldsMixin(OptimizedQuerysetMixin):
+    """
+    View mixin for DynamicFieldsMixin serializers. `values_plan` is the
+    serializer's ValuesPlan; with ?fields= or ?expand= the queryset is
+    restricted to what the requested variant of it reads, otherwise it
+    is optimized for the full serializer.
+    """
+    values_plan = None
+
+    def get_values_plan(self):
+        return self.values_plan.variant(*requested_fields(self.request))
+
+    def optimize_queryset(self, queryset):
+        plan = self.get_values_plan()
+        if plan is self.values_plan:
+            return super().optimize_queryset(queryset)
+        return plan.restrict(queryset)
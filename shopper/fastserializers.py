@@ -0,0 +1,262 @@
+"""
+Model-free read path for list endpoints.
+
+A ValuesPlan is compiled once from a ModelSerializer class. It records the
+columns the serializer reads, as `.values()` lookups across foreign keys,
+and one output step per field. Rendering a page then costs one `.values()`
+query (plus one per nested many=True relation) and a loop of plain
+function calls. No model instances are built and DRF does not walk its
+fields for each row.
+
+Plain columns still go through the bound DRF field's to_representation,
+so decimals, datetimes and choices come out exactly as the serializer
+writes them. Fields the plan cannot derive (method fields, model methods
+other than get_FOO_display) are supplied as overrides:
+`{name: (columns, function(row, context))}`.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import FileField as ModelFileField
+from rest_framework import serializers
+from rest_framework.relations import RelatedField
+from rest_framework.response import Response
+
+
+def _lookup(prefix, source_attrs):
+    return prefix + '__'.join(source_attrs)
+
+
+def _freeze(tree):
+    if tree is None:
+        return None
+    return tuple(sorted((name, _freeze(subtree)) for name, subtree in tree.items()))
+
+
+class ValuesPlan:
+    # Sparse/expanded variants kept per plan before the oldest are dropped
+    max_variants = 256
+
+    def __init__(self, serializer_class, overrides=None, serializer_kwargs=None):
+        self.serializer_class = serializer_class
+        self.overrides = overrides or {}
+        self.serializer_kwargs = serializer_kwargs or {}
+        self._compiled = None
+        self._variants = {}
+
+    @property
+    def compiled(self):
+        # Compiled on first use: serializer fields need the app registry
+        if self._compiled is None:
+            self._build(self.serializer_class(**self.serializer_kwargs))
+        return self._compiled
+
+    def _build(self, serializer):
+        self.columns = []
+        self.related = []
+        self._compiled = self._compile(serializer, serializer.Meta.model, '')
+
+    def variant(self, fields=None, expand=None):
+        """
+        The plan for the serializer with only `fields` and with `expand`
+        expanded (see shopper.dynamic_fields), or this plan for neither.
+        """
+        if fields is None and not expand:
+            return self
+        key = (_freeze(fields), _freeze(expand))
+        plan = self._variants.get(key)
+        if plan is None:
+            plan = ValuesPlan(self.serializer_class, self.overrides, {'fields': fields, 'expand': expand})
+            plan.compiled
+            if len(self._variants) >= self.max_variants:
+                self._variants.pop(next(iter(self._variants)))
+            self._variants[key] = plan
+        return plan
+
+    def _column(self, lookup):
+        if lookup not in self.columns:
+            self.columns.append(lookup)
+        return lookup
+
+    def _compile(self, serializer, model, prefix):
+        steps = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if not prefix and name in self.overrides:
+                columns, function = self.overrides[name]
+                for column in columns:
+                    self._column(column)
+                steps.append((name, function))
+            elif isinstance(field, serializers.ListSerializer):
+                steps.append((name, self._compile_many(field, model, prefix)))
+            elif isinstance(field, serializers.BaseSerializer):
+                steps.append((name, self._compile_nested(field, model, prefix)))
+            else:
+                steps.append((name, self._compile_field(name, field, model, prefix)))
+        return steps
+
+    def _compile_nested(self, field, model, prefix):
+        related = model._meta.get_field(field.source_attrs[0]).related_model
+        nested_prefix = _lookup(prefix, field.source_attrs) + '__'
+        key = self._column(nested_prefix + 'pk')
+        steps = self._compile(field, related, nested_prefix)
+
+        def nested(row, context):
+            if row[key] is None:
+                return None
+            return {name: step(row, context) for name, step in steps}
+        return nested
+
+    def _compile_many(self, field, model, prefix):
+        if prefix:
+            raise ImproperlyConfigured('Nested many=True fields are only supported at the top level')
+        relation = model._meta.get_field(field.source_attrs[0])
+        child_plan = ValuesPlan(type(field.child))
+        # From the bound child, which may have had fields dropped
+        child_plan._build(field.child)
+        parent_key = relation.field.attname
+        self._column('pk')
+        self.related.append((field.source_attrs[0], relation.related_model, parent_key, child_plan))
+        index = len(self.related) - 1
+
+        def many(row, context):
+            return row['_related'][index].get(row['pk'], [])
+        return many
+
+    @staticmethod
+    def _resolve(model, attrs):
+        """The model field at the end of a dotted source, or None"""
+        field = None
+        for attr in attrs:
+            if model is None:
+                return None
+            try:
+                field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            model = field.related_model
+        return field
+
+    def _compile_field(self, name, field, model, prefix):
+        attrs = field.source_attrs
+        if len(attrs) == 1 and attrs[0].startswith('get_') and attrs[0].endswith('_display'):
+            # get_FOO_display(): map the stored value through the choices
+            choices = {
+                str(value): str(label)
+                for value, label in model._meta.get_field(attrs[0][4:-8]).flatchoices
+            }
+            column = self._column(_lookup(prefix, [attrs[0][4:-8]]))
+            return lambda row, context: choices.get(str(row[column]), row[column])
+
+        if isinstance(field, serializers.SerializerMethodField):
+            raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{name} needs an override')
+        model_field = self._resolve(model, attrs)
+        if model_field is None and (prefix or len(attrs) > 1):
+            raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{name} needs an override')
+        # Otherwise a single unknown name is a queryset annotation
+
+        column = self._column(_lookup(prefix, attrs))
+        if isinstance(field, RelatedField):
+            # values() already returns the primary key
+            return lambda row, context: row[column]
+        if isinstance(model_field, ModelFileField):
+            storage = model_field.storage
+
+            def file_url(row, context):
+                if not row[column]:
+                    return None
+                url = storage.url(row[column])
+                request = context.get('request')
+                return request.build_absolute_uri(url) if request else url
+            return file_url
+
+        to_representation = field.to_representation
+        return lambda row, context: None if row[column] is None else to_representation(row[column])
+
+    def values(self, queryset, extra=()):
+        """The queryset narrowed to the plan's columns (and any extra ones)"""
+        self.compiled
+        columns = list(self.columns) + [column for column in extra if column not in self.columns]
+        return queryset.prefetch_related(None).values(*columns)
+
+    def restrict(self, queryset):
+        """
+        The queryset loading only what the plan reads: its columns, joins
+        for the foreign keys it follows and prefetches for its many=True
+        relations. For the ORM path, where rows become model instances.
+        """
+        self.compiled
+        model = queryset.model
+        only = []
+        joins = set()
+        for column in self.columns:
+            parts = column.split('__')
+            if parts[-1] == 'pk':
+                target = self._resolve(model, parts[:-1]).related_model if len(parts) > 1 else model
+                parts[-1] = target._meta.pk.name
+            elif self._resolve(model, parts) is None:
+                # A queryset annotation
+                continue
+            for depth in range(1, len(parts)):
+                joins.add('__'.join(parts[:depth]))
+            only.append('__'.join(parts))
+        # A followed foreign key cannot itself be deferred
+        only.extend(join for join in joins if join not in only)
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if joins:
+            queryset = queryset.select_related(*joins)
+        if self.related:
+            queryset = queryset.prefetch_related(*(name for name, _, _, _ in self.related))
+        return queryset.only(*only)
+
+    def render(self, rows, context=None):
+        """Output dicts for `.values()` rows, as the serializer would write them"""
+        steps = self.compiled
+        context = context or {}
+        rows = list(rows)
+        if self.related:
+            ids = [row['pk'] for row in rows]
+            related = []
+            for _, model, parent_key, child_plan in self.related:
+                grouped = {}
+                children = list(child_plan.values(
+                    model.objects.filter(**{f'{parent_key}__in': ids}).order_by(parent_key, 'pk'),
+                    extra=[parent_key]
+                ))
+                for child, data in zip(children, child_plan.render(children, context)):
+                    grouped.setdefault(child[parent_key], []).append(data)
+                related.append(grouped)
+            for row in rows:
+                row['_related'] = related
+        return [{name: step(row, context) for name, step in steps} for row in rows]
+
+
+class ValuesListMixin:
+    """
+    Serve a ListAPIView's pages through `values_plan` instead of its
+    serializer, with identical output. FAST_READ_PATHS = False in settings
+    switches every view back to the serializers.
+    """
+    values_plan = None
+
+    def get_values_plan(self):
+        return self.values_plan
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, 'FAST_READ_PATHS', True) or self.values_plan is None:
+            return super().list(request, *args, **kwargs)
+
+        plan = self.get_values_plan()
+
+        queryset = self.filter_queryset(self.get_queryset())
+        extra = []
+        if self.paginator is not None and hasattr(self.paginator, 'get_ordering'):
+            # Keyset cursors are built from the ordering values of the last row
+            extra = [field.lstrip('-') for field in self.paginator.get_ordering(self)]
+        rows = plan.values(queryset, extra)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(plan.render(page, self.get_serializer_context()))
+        return Response(plan.render(rows, self.get_serializer_context()))
+
@@ -0,0 +1,171 @@
+"""
+select_related / prefetch_related / only() derived from a serializer.
+
+The serializer's readable fields are walked once per (serializer class,
+model) and their sources resolved against the model:
+
+- a column is loaded with only(),
+- a forward foreign key followed by a dotted source or a nested
+  serializer is joined with select_related,
+- a reverse foreign key or many-to-many relation is prefetched, with its
+  own queryset shaped by the nested serializer.
+
+Anything the walk cannot see through (SerializerMethodField, source='*',
+model methods and properties such as get_full_name) makes it load every
+column of that model, so a serializer never triggers a deferred-field
+query. Serializers can say what such fields read instead, as dotted
+sources in Meta.query_sources:
+
+    query_sources = {'client_name': ['client.first_name', 'client.last_name']}
+
+Top-level names that are not model fields are assumed to be queryset
+annotations when the queryset has them.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+class QueryShape:
+    """What a serializer reads from one model"""
+
+    def __init__(self, model):
+        self.model = model
+        self.columns = {model._meta.pk.name}
+        # Set when something reads attributes the walk cannot resolve
+        self.complete = False
+        # Unresolved top-level names: annotations, or else properties
+        self.names = set()
+        self.joins = {}
+        self.prefetches = {}
+
+    def follow(self, attrs, field, top_level=False, declared=False):
+        """
+        Record a source; returns the shape a nested serializer reads from,
+        if any. Unknown names in `declared` sources are optional attributes.
+        """
+        shape = self
+        for index, attr in enumerate(attrs):
+            last = index == len(attrs) - 1
+            try:
+                model_field = shape.model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                if last and attr.startswith('get_') and attr.endswith('_display'):
+                    try:
+                        shape.columns.add(shape.model._meta.get_field(attr[4:-8]).name)
+                        return None
+                    except FieldDoesNotExist:
+                        pass
+                if top_level and shape is self and last:
+                    if not declared:
+                        shape.names.add(attr)
+                elif not declared:
+                    shape.complete = True
+                return None
+
+            if not model_field.is_relation:
+                shape.columns.add(model_field.name)
+                return None
+
+            if model_field.many_to_many or model_field.one_to_many:
+                child = shape.prefetches.get(attr)
+                if child is None:
+                    child = shape.prefetches[attr] = QueryShape(model_field.related_model)
+                    if model_field.one_to_many:
+                        # The prefetch matches children to parents on this column
+                        child.columns.add(model_field.field.name)
+                if not last:
+                    # e.g. items.count: a manager method
+                    child.complete = True
+                return child
+
+            # Forward foreign key or one-to-one (either side)
+            if model_field.concrete:
+                shape.columns.add(model_field.name)
+                if last and isinstance(field, (RelatedField, ManyRelatedField)):
+                    # Rendered as the primary key, already on this row
+                    return None
+            shape = shape.joins.setdefault(attr, QueryShape(model_field.related_model))
+            if last and not isinstance(field, serializers.BaseSerializer):
+                # str(related object) or similar
+                shape.complete = True
+        return shape
+
+    def walk(self, serializer, top_level=True):
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+        declared = getattr(getattr(serializer, 'Meta', None), 'query_sources', {})
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in declared:
+                for source in declared[name]:
+                    self.follow(source.split('.'), None, top_level, declared=True)
+                continue
+            attrs = field.source_attrs
+            if not attrs:
+                # source='*': the whole object
+                if isinstance(field, serializers.BaseSerializer):
+                    self.walk(field, top_level)
+                else:
+                    self.complete = True
+                continue
+            shape = self.follow(attrs, field, top_level)
+            if shape is not None and isinstance(field, serializers.BaseSerializer):
+                shape.walk(field, top_level=False)
+        return self
+
+    def apply(self, queryset):
+        only = []
+        select = []
+        prefetch = []
+        complete = self.complete or bool(self.names - set(queryset.query.annotations))
+        self._collect(queryset.model, '', complete, only, select, prefetch)
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*only)
+
+    def _collect(self, model, prefix, complete, only, select, prefetch):
+        if complete:
+            only.extend(prefix + field.name for field in model._meta.concrete_fields)
+        else:
+            only.extend(prefix + column for column in sorted(self.columns))
+        for name, shape in self.joins.items():
+            select.append(prefix + name)
+            if prefix + name not in only:
+                # A joined foreign key cannot itself be deferred
+                only.append(prefix + name)
+            shape._collect(shape.model, f'{prefix}{name}__', shape.complete, only, select, prefetch)
+        for name, shape in self.prefetches.items():
+            prefetch.append(Prefetch(prefix + name, queryset=shape.apply(shape.model._default_manager.all())))
+
+
+@lru_cache(maxsize=None)
+def query_shape(serializer_class, model):
+    """The QueryShape of `serializer_class` over `model`, computed once"""
+    return QueryShape(model).walk(serializer_class())
+
+
+def optimize(queryset, serializer_class):
+    """`queryset` loading exactly what `serializer_class` reads"""
+    return query_shape(serializer_class, queryset.model).apply(queryset)
+
+
+class OptimizedQuerysetMixin:
+    """
+    Shape a generic view's queryset to its serializer: joins, prefetches
+    and columns follow the serializer's fields instead of hand-written
+    select_related/prefetch_related calls.
+    """
+
+    def optimize_queryset(self, queryset):
+        return optimize(queryset, self.get_serializer_class())
+
+    def filter_queryset(self, queryset):
+        return self.optimize_queryset(super().filter_queryset(queryset))
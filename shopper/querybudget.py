@@ -0,0 +1,160 @@
+"""
+Per-request query budgets and N+1 detection.
+
+QueryBudgetMiddleware counts the queries each request runs, on every
+database connection, and groups them by shape: the SQL with literals and
+IN lists stripped, so `WHERE id = 1` and `WHERE id = 2` are the same
+shape. A request is flagged when
+
+- it is a read (GET, HEAD, OPTIONS) and runs more queries than its
+  view's `query_budget`; writes validate, lock and invalidate, and their
+  count depends on the payload rather than the data behind the view, or
+- one shape repeats more than QUERY_BUDGET_DUPLICATES times, the
+  signature of a query per row, on any method.
+
+Flagged requests are logged with their worst shapes and counted per view
+in the cache (see query_budget_stats). With QUERY_BUDGET_RAISE they
+raise QueryBudgetExceeded instead, which is how check_query_scaling and
+local development use it.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from rest_framework.permissions import SAFE_METHODS
+
+from .cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \([^()]*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+def sql_shape(sql):
+    """The SQL with its literal values taken out"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (?)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """Counts queries by shape while active, on every connection"""
+
+    def __init__(self):
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[sql_shape(sql)] += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def total(self):
+        return sum(self.shapes.values())
+
+    def repeated(self, limit):
+        """Shapes run more than `limit` times, most repeated first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > limit]
+
+
+def _overrun_key(view_name):
+    return f'query-budget:{view_name}:overruns'
+
+
+def record_overrun(view_name):
+    cache = get_cache()
+    key = _overrun_key(view_name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_overruns(view_names):
+    cache = get_cache()
+    found = cache.get_many([_overrun_key(name) for name in view_names])
+    return {name: found.get(_overrun_key(name), 0) for name in view_names}
+
+
+def reset_overruns(view_names):
+    get_cache().delete_many([_overrun_key(name) for name in view_names])
+
+
+def view_budget(view_class):
+    return getattr(view_class, 'query_budget', getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+
+
+def read_views():
+    """View classes answering GET under /api/ in the root URLconf"""
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            route = prefix + str(pattern.pattern)
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns, route)
+                continue
+            view_class = getattr(pattern.callback, 'view_class', None)
+            if (route.startswith('api/') and view_class is not None and hasattr(view_class, 'get')
+                    and view_class.__module__.startswith('apps.')):
+                yield view_class
+    return set(walk(get_resolver().url_patterns, ''))
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', True):
+            return self.get_response(request)
+
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+
+        if settings.DEBUG:
+            response[QUERY_COUNT_HEADER] = str(counter.total)
+
+        match = request.resolver_match
+        view_class = getattr(match.func, 'view_class', None) if match else None
+        if view_class is None:
+            return response
+
+        problems = []
+        budget = view_budget(view_class) if request.method in SAFE_METHODS else None
+        if budget is not None and counter.total > budget:
+            problems.append(f'{counter.total} queries, budget {budget}')
+        for shape, count in counter.repeated(getattr(settings, 'QUERY_BUDGET_DUPLICATES', 3)):
+            problems.append(f'{count}x {shape[:200]}')
+        if not problems:
+            return response
+
+        message = f'{view_class.__name__} {request.method} {request.path}: ' + '; '.join(problems)
+        if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded(message)
+        record_overrun(view_class.__name__)
+        logger.warning(message, extra={
+            'view': view_class.__name__, 'queries': counter.total, 'budget': budget,
+        })
+        return response
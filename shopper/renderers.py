@@ -0,0 +1,69 @@
+"""
+Faster renderers for API responses.
+
+ORJSONRenderer produces the same bytes as DRF's JSONRenderer with the
+project's settings (compact, UTF-8, strict), several times faster. orjson
+encodes the native types itself; everything else goes through DRF's own
+JSONEncoder.default. That includes datetimes, so '+00:00' still becomes
+'Z', and Decimals, which still become numbers. (Serializer DecimalFields
+are already strings by then.) Pretty-printing with `; indent=N`, or
+settings that differ from the defaults, fall back to DRF's renderer.
+
+The one visible difference is in floats with an exponent: orjson writes
+1e-5 where json writes 1e-05. Both are the same number.
+
+MessagePackRenderer offers application/msgpack through content
+negotiation, for clients that prefer a compact binary body. Values are
+converted the same way, so with string keys a decoded msgpack body equals
+the decoded JSON.
+"""
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def encode_default(obj):
+    """Everything orjson and msgpack do not encode natively, the way DRF does"""
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renderer which serializes to JSON with orjson.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if (self.get_indent(accepted_media_type, renderer_context) is not None
+                or not self.compact or self.ensure_ascii or not self.strict):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        # Escape the two separators that are valid JSON but not valid
+        # JavaScript, as DRF does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer which serializes to MessagePack.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
@@ -12,8 +12,32 @@ CACHES = {
         }
     }
 }
+# Seconds a shopper's dashboard snapshot stays cached (0 disables the cache)
+DASHBOARD_CACHE_TIMEOUT = 300
+# Seconds precomputed "lists for you" recommendations stay cached; run
+# precompute_recommendations more often than this to keep them warm
+RECOMMENDATIONS_CACHE_TIMEOUT = 600
+# Record UserActivity and User.last_active per authenticated request,
+# written in batches of up to ACTIVITY_BUFFER_SIZE or every
+# ACTIVITY_FLUSH_INTERVAL seconds
+ACTIVITY_TRACKING_ENABLED = True
+ACTIVITY_BUFFER_SIZE = 500
+ACTIVITY_FLUSH_INTERVAL = 5
+# Seconds a token-authenticated user's row stays in each process's memory
+USER_CACHE_TIMEOUT = 30
+# Serve hot list endpoints from .values() rows instead of their serializers
+FAST_READ_PATHS = True
 # Load environment variables
 load_dotenv()
+# Query budgets (views' query_budget) and N+1 detection per request. Over
+# budget requests are logged, or raise with QUERY_BUDGET_RAISE=True
+QUERY_BUDGET_ENABLED = True
+QUERY_BUDGET_RAISE = os.getenv('QUERY_BUDGET_RAISE', 'False') == 'True'
+# A SQL shape run more often than this in one request is reported as an N+1
+QUERY_BUDGET_DUPLICATES = 3
+# Database NAME the bulk-seeding benchmarks (bench_nearby, bench_pagination)
+# may write to, besides test_* databases; they refuse to run anywhere else
+BENCHMARK_DATABASE = os.getenv('BENCHMARK_DATABASE', '')
 
 # Build paths
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -69,12 +93,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'shopper.querybudget.QueryBudgetMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.users.activity.ActivityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'silk.middleware.SilkyMiddleware',
@@ -152,11 +178,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'shopper.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'shopper.renderers.ORJSONRenderer',
+        'shopper.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'shopper.parsers.ORJSONParser',
+        'shopper.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
@@ -206,6 +243,7 @@ SPECTACULAR_SETTINGS = {
         {'name': 'Shopping Lists', 'description': 'Create and manage shopping lists'},
         {'name': 'Bids', 'description': 'Place and manage bids'},
         {'name': 'Dashboard', 'description': 'Shopper dashboard and statistics'},
+        {'name': 'Earnings', 'description': 'Shopper balance and earnings ledger'},
         {'name': 'Public', 'description': 'Public endpoints (no authentication required)'},
     ],
 }
@@ -237,8 +275,16 @@ from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_REFRESH_SERIALIZER': 'apps.users.serializers.RevocableTokenRefreshSerializer',
 }
 
+# Revoked tokens (apps.users.revocation): size of each process's bloom
+# filter, seconds between syncs with other processes and between rebuilds
+REVOCATION_CAPACITY = 1_000_000
+REVOCATION_ERROR_RATE = 0.001
+REVOCATION_SYNC_INTERVAL = 5
+REVOCATION_REBUILD_INTERVAL = 3600
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -271,10 +317,12 @@ CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 
 # Channels settings
+# The pub/sub layer publishes a group message once per group; each worker
+# fans it out to its own sockets, instead of one Redis write per socket.
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'shopper': {
+        'BACKEND': 'channels_redis.pubsub.RedisPubSubChannelLayer',
+        'CONFIG': {
             "hosts": [('127.0.0.1', 6379)],
         },
     },
@@ -37,6 +37,7 @@ urlpatterns = [
     # App-specific API endpoints
     path('api/lists/', include('apps.lists.urls')),
     path('api/bids/', include('apps.bids.urls')),
+    path('api/transactions/', include('apps.transactions.urls')),
     
     # Health check
     path('health/', lambda request: HttpResponse("OK"), name='health_check'),
@@ -0,0 +1,47 @@
+"""
+JWT authentication for WebSocket connections.
+
+Browsers cannot set headers on a WebSocket handshake, so the access token
+is read from the `token` query parameter, falling back to an
+`Authorization: Bearer` header for other clients.
+"""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .authentication import RevocableJWTAuthentication
+
+
+def get_token(scope):
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if query.get('token'):
+        return query['token'][0]
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            scheme, _, token = value.decode('latin-1').partition(' ')
+            if scheme.lower() == 'bearer' and token:
+                return token
+    return None
+
+
+@database_sync_to_async
+def get_user(raw_token):
+    # The full user: consumers are async and cannot load deferred fields
+    authentication = RevocableJWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Populate scope['user'] from a simplejwt access token"""
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        token = get_token(scope)
+        scope['user'] = await get_user(token) if token else AnonymousUser()
+        return await super().__call__(scope, receive, send)